@@ -0,0 +1,9 @@
+"""
+Bluesky ingestion / embedding / search pipeline.
+
+Every stage is a module with a ``main(argv=None)`` and reusable functions;
+``bluesky-pipeline <command>`` (see cli.py) dispatches to them.  Heavy
+dependencies (torch, sentence-transformers, faiss, pandas, duckdb) are
+imported inside the functions that need them.
+"""
+__version__ = "0.1.0"
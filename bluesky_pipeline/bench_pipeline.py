@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark against the local Jetstream replayer.
+
+Stages, each run as its own process exactly as in production (or, with
+--in-process, the batch stages called through their main() in this one):
+  1. stream  replay -> stream          (swept over --rates)
+  2. import  file_to_db.py             (NDJSON -> day DBs)
+  3. embed   store_embeddings.py per day DB (needs the torch env)
+  4. faiss   build_faiss.py over the day DBs
+
+The stream stage is driven at each target rate; its saturation point is the
+first rate it can no longer sustain (achieved < --sustain of target).  The
+batch stages run unthrottled, so their throughput is their capacity.  The
+stage with the lowest capacity is reported as the bottleneck.
+"""
+import argparse
+import contextlib
+import glob
+import importlib.util
+import io
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def command(name):
+    """argv prefix running a pipeline subcommand, e.g. command("import")."""
+    return ["-m", "bluesky_pipeline", name]
+
+
+def child_env():
+    # lets a --torch-python venv without the package installed find it
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"replayer did not start listening on port {port}")
+
+
+def count_lines(paths):
+    n = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            n += sum(1 for _ in f)
+    return n
+
+
+def count_rows(db_paths, where="1"):
+    n = 0
+    for db_path in db_paths:
+        conn = sqlite3.connect(db_path)
+        try:
+            n += conn.execute(f"SELECT COUNT(*) FROM posts WHERE {where}").fetchone()[0]
+        finally:
+            conn.close()
+    return n
+
+# ---- stages ----------------------------------------------------------------
+
+def bench_stream(workdir, rate, messages, replay_args, python):
+    """One replayer -> stream_to_file run; returns (posts written, stats)."""
+    outdir = os.path.join(workdir, f"spool-{int(rate)}")
+    os.makedirs(outdir)
+    port = free_port()
+    replay = subprocess.Popen(
+        [python, *command("replay"), "--port", str(port), "--rate", str(rate),
+         "--count", str(messages), "--once", *replay_args],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=child_env())
+    try:
+        wait_for_port(port)
+        t0 = time.perf_counter()
+        subprocess.run(
+            [python, *command("stream"), "--outdir", outdir,
+             "--url", f"ws://127.0.0.1:{port}/subscribe",
+             "--metrics-file", os.path.join(outdir, "state", "stream.prom")],
+            check=True, stdout=subprocess.DEVNULL, env=child_env())
+        wall = time.perf_counter() - t0
+        out, _ = replay.communicate(timeout=30)
+    finally:
+        if replay.poll() is None:
+            replay.kill()
+    summary = json.loads(out.strip().splitlines()[-1])
+    posts = count_lines(glob.glob(os.path.join(outdir, "*.ndjson*")))
+    return outdir, {
+        "target_rate": rate or None,
+        "messages": summary["sent"],
+        "seconds": summary["seconds"],
+        "achieved_rate": summary["rate"],
+        "posts_written": posts,
+        "posts_per_second": round(posts / summary["seconds"], 1) if summary["seconds"] else None,
+        "wall_seconds": round(wall, 3),
+    }
+
+
+def run_stage(name, args, python, in_process=False):
+    """Seconds to run one subcommand, as a child process or via its main() here."""
+    t0 = time.perf_counter()
+    if in_process:
+        from .cli import run
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(name, args)
+    else:
+        subprocess.run([python, *command(name), *args], check=True, stdout=subprocess.DEVNULL, env=child_env())
+    return time.perf_counter() - t0
+
+
+def bench_import(spool, dbdir, python, batch, in_process=False):
+    seconds = run_stage("import", ["--indir", spool, "--outdir", dbdir, "--batch", str(batch)],
+                        python, in_process)
+    dbs = sorted(glob.glob(os.path.join(dbdir, "posts_*.db")))
+    rows = count_rows(dbs)
+    return dbs, {"rows": rows, "seconds": round(seconds, 3),
+                 "rows_per_second": round(rows / seconds, 1)}
+
+
+def bench_embed(dbs, python, in_process=False):
+    t0 = time.perf_counter()
+    for db in dbs:
+        # no idle sleep: a day with nothing pending would add a minute of waiting
+        run_stage("embed", ["--db-path", db, "--idle-sleep", "0"], python, in_process)
+    seconds = time.perf_counter() - t0
+    embedded = count_rows(dbs, "has_embedding = 1")
+    # includes model load; store_embeddings.py embeds at most 30k rows per run
+    return {"posts": embedded, "seconds": round(seconds, 3),
+            "posts_per_second": round(embedded / seconds, 1)}
+
+
+def bench_faiss(dbs, workdir, python, in_process=False):
+    index_dir = os.path.join(workdir, "faiss_index")
+    seconds = run_stage("build-index", ["--db-path", *dbs, "--index-dir", index_dir], python, in_process)
+    vectors = count_rows(dbs, "has_embedding = 1")
+    return {"vectors": vectors, "seconds": round(seconds, 3),
+            "vectors_per_second": round(vectors / seconds, 1)}
+
+# ---- report ----------------------------------------------------------------
+
+def report(results, sustain):
+    print("\nstream stage (replayer -> stream_to_file.py)")
+    print(f"  {'target/s':>10} {'achieved/s':>11} {'posts/s':>9} {'messages':>9}")
+    saturation = None
+    for r in results["stream"]:
+        target = r["target_rate"]
+        print(f"  {target or 'max':>10} {r['achieved_rate']:>11} {r['posts_per_second']:>9} {r['messages']:>9}")
+        if saturation is None and target and r["achieved_rate"] < sustain * target:
+            saturation = target
+    capacity = max(r["achieved_rate"] for r in results["stream"])
+    results["stream_saturation_rate"] = saturation
+    if saturation:
+        print(f"  saturates at ~{saturation}/s target (best sustained {capacity}/s)")
+    else:
+        print(f"  not saturated by the swept rates (best sustained {capacity}/s)")
+
+    # per-stage capacity in posts/sec, to pick the bottleneck
+    post_share = results["stream"][-1]["posts_written"] / max(1, results["stream"][-1]["messages"])
+    capacities = {"stream": round(capacity * post_share, 1)}
+    for stage, key in (("import", "rows_per_second"), ("embed", "posts_per_second"),
+                       ("faiss", "vectors_per_second")):
+        if stage in results:
+            print(f"\n{stage} stage: {results[stage]}")
+            capacities[stage] = results[stage][key]
+    bottleneck = min(capacities, key=capacities.get)
+    results["bottleneck"] = bottleneck
+    print(f"\nposts/sec capacity by stage: {capacities}")
+    print(f"bottleneck: {bottleneck}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Benchmark the ingest -> import -> embed -> FAISS pipeline offline")
+    p.add_argument("--rates", default="1000,5000,20000,0",
+                   help="Comma-separated replay rates in messages/sec; 0 = unthrottled (default 1000,5000,20000,0)")
+    p.add_argument("--messages", type=int, default=50_000, help="Messages per stream run (default 50000)")
+    p.add_argument("--sustain", type=float, default=0.95,
+                   help="A rate is sustained if achieved >= this fraction of target (default 0.95)")
+    p.add_argument("--batch", type=int, default=2000, help="file_to_db.py --batch")
+    p.add_argument("--python", default=sys.executable, help="Interpreter for the core scripts")
+    p.add_argument("--torch-python", help="Interpreter with sentence-transformers/faiss (default: --python)")
+    p.add_argument("--skip-embed", action="store_true", help="Skip the embedding and FAISS stages")
+    p.add_argument("--in-process", action="store_true",
+                   help="Run the import/embed/FAISS stages via their main() in this process "
+                        "(excludes interpreter and import startup; embed needs torch here)")
+    p.add_argument("--workdir", help="Keep artefacts here instead of a temp dir")
+    p.add_argument("--json", help="Write raw results to this file")
+    p.add_argument("replay_args", nargs=argparse.REMAINDER,
+                   help="Extra jetstream_replay.py args after '--' (e.g. -- --noise 0.8)")
+    args = p.parse_args(argv)
+    replay_args = [a for a in args.replay_args if a != "--"]
+    torch_python = args.torch_python or args.python
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bsky-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    results = {"stream": []}
+    try:
+        spool = None
+        for rate in (float(r) for r in args.rates.split(",")):
+            spool, stats = bench_stream(workdir, rate, args.messages, replay_args, args.python)
+            print(f"[stream] {stats}", flush=True)
+            results["stream"].append(stats)
+
+        # downstream stages consume the last (usually unthrottled) spool
+        dbs, results["import"] = bench_import(spool, os.path.join(workdir, "db"), args.python, args.batch,
+                                          args.in_process)
+        print(f"[import] {results['import']}", flush=True)
+
+        have_torch = importlib.util.find_spec("sentence_transformers") if args.in_process else (
+            args.torch_python or importlib.util.find_spec("sentence_transformers"))
+        if args.skip_embed or not have_torch:
+            print("[embed] skipped (use --torch-python or run in the torch env)", flush=True)
+        else:
+            results["embed"] = bench_embed(dbs, torch_python, args.in_process)
+            print(f"[embed] {results['embed']}", flush=True)
+            results["faiss"] = bench_faiss(dbs, workdir, torch_python, args.in_process)
+            print(f"[faiss] {results['faiss']}", flush=True)
+
+        report(results, args.sustain)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from .posts_db import connect_readonly, is_day_schema
+from .vectors import normalize_rows
+
+# ----------------------------------------
+# Config
+# ----------------------------------------
+DB_PATH = "bluesky_posts.db"
+INDEX_DIR = "faiss_index"
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+EMBEDDING_DIM = 384  # for MiniLM
+
+# ip: inner product over L2-normalised vectors, i.e. cosine similarity
+# (higher is better).  l2: squared Euclidean distance on the stored vectors.
+METRICS = ("ip", "l2")
+
+LEGACY_QUERY = """
+    SELECT uri, embedding_blob, text
+    FROM posts
+    WHERE embedding_blob IS NOT NULL
+"""
+
+DAY_QUERY = """
+    SELECT uri, emb_vec, text
+    FROM posts
+    WHERE has_embedding = 1 AND emb_vec IS NOT NULL
+    ORDER BY time_us
+"""
+
+
+def load_embeddings(db_paths):
+    """Read (uri, vector, text) from every DB; either schema is accepted."""
+    embeddings = []
+    metadata = []
+    for db_path in db_paths:
+        conn = connect_readonly(db_path)
+        try:
+            query = DAY_QUERY if is_day_schema(conn) else LEGACY_QUERY
+            before = len(metadata)
+            for uri, embedding_blob, text in conn.execute(query):
+                embeddings.append(np.frombuffer(embedding_blob, dtype=np.float32))
+                metadata.append({"uri": uri, "text": text})
+            print(f"Loaded {len(metadata) - before} embeddings from {db_path}.")
+        finally:
+            conn.close()
+    return embeddings, metadata
+
+
+def build_index(embeddings, metric="ip"):
+    import faiss
+    if metric == "ip":
+        # vectors stored before emb_norm are normalised here, so the
+        # index is correct with or without normalize_embeddings.py
+        index = faiss.IndexFlatIP(EMBEDDING_DIM)
+        index.add(normalize_rows(embeddings))
+    else:
+        index = faiss.IndexFlatL2(EMBEDDING_DIM)
+        index.add(embeddings)
+    return index
+
+
+def write_index_info(index_dir, db_paths, count, metric="ip"):
+    """
+    Sidecar describing what the index was built from.  search.py uses
+    ``sources`` to resolve metadata filters against SQLite.
+    """
+    info = {
+        "sources": [os.path.abspath(p) for p in db_paths],
+        "count": count,
+        "dim": EMBEDDING_DIM,
+        "metric": metric,
+        "normalized": metric == "ip",
+        "model": MODEL_NAME,
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "version": time.time_ns(),
+    }
+    info_path = index_dir / "index_info.json"
+    tmp = str(info_path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp, info_path)
+    return info_path
+
+
+def main(argv=None):
+    # ----------------------------------------
+    # Parse command line
+    # ----------------------------------------
+    parser = argparse.ArgumentParser(
+        description="Build search index of Bluesky posts from embeddings."
+    )
+
+    parser.add_argument(
+        "--db-path",
+        type=str,
+        nargs="+",
+        default=[DB_PATH],
+        help="Path(s) to the SQLite database file(s); legacy or per-day posts_{day}.db."
+    )
+    parser.add_argument(
+        "--index-dir",
+        type=str,
+        default=INDEX_DIR,
+        help="Directory to put search index files into."
+    )
+    parser.add_argument(
+        "--metric",
+        choices=METRICS,
+        default="ip",
+        help="ip: cosine similarity via inner product on normalised vectors.  "
+             "l2: Euclidean distance (the pre-emb_norm index)."
+    )
+
+    args = parser.parse_args(argv)
+    index_dir = Path(args.index_dir)
+    index_dir.mkdir(exist_ok=True)
+    index_path = index_dir / "index.faiss"
+    meta_path = index_dir / "metadata.json"
+
+    # ----------------------------------------
+    # Build NumPy matrix
+    # ----------------------------------------
+    embeddings, metadata = load_embeddings(args.db_path)
+    if not embeddings:
+        print("No embeddings found; nothing to index.")
+        return
+
+    embeddings = np.vstack(embeddings)
+    print(f"Embeddings shape: {embeddings.shape}")
+
+    # ----------------------------------------
+    # Build FAISS index
+    # ----------------------------------------
+    import faiss
+    index = build_index(embeddings, args.metric)
+
+    faiss.write_index(index, str(index_path))
+    print(f"Saved FAISS index to {index_path}")
+
+    # Save URI lookup
+    with open(meta_path, "w") as f:
+        json.dump(metadata, f, indent=2)
+    print(f"Saved metadata to {meta_path}")
+
+    info_path = write_index_info(index_dir, args.db_path, len(metadata), args.metric)
+    print(f"Saved index info to {info_path}")
+
+
+if __name__ == "__main__":
+    main()
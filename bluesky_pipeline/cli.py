@@ -0,0 +1,64 @@
+"""
+``bluesky-pipeline <command> [options]`` — one entry point for every stage.
+
+Subcommand modules are imported only when their command runs, so
+``bluesky-pipeline --help`` (and any command that doesn't embed or search)
+never pays for torch, sentence-transformers, faiss or pandas.
+"""
+import importlib
+import sys
+
+# command -> (module in this package, summary)
+COMMANDS = {
+    "stream": ("stream_to_file", "Jetstream websocket -> hourly NDJSON files"),
+    "import": ("file_to_db", "NDJSON -> per-day SQLite DBs"),
+    "embed": ("store_embeddings", "Embed posts still missing vectors (torch env)"),
+    "build-index": ("build_faiss", "Build the FAISS index from stored embeddings (torch env)"),
+    "normalize": ("normalize_embeddings", "L2-normalise embeddings stored before emb_norm"),
+    "search": ("search", "Vector / lexical / hybrid search (torch env)"),
+    "query": ("query_days", "Query and aggregate across the per-day DBs"),
+    "threads": ("threads", "Thread trees and quote fan-out"),
+    "cluster": ("cluster_day", "Daily k-means topic clustering of embeddings"),
+    "retire": ("retire_days", "Compact old per-day DBs into Parquet"),
+    "export": ("export_embeddings", "Export embeddings to Parquet / Arrow"),
+    "consolidate": ("consolidate_exports", "Merge hourly Parquet exports per day (not needed for parquet-day)"),
+    "ingest": ("bluesky_ingest", "Legacy Jetstream -> bluesky_posts.db ingester"),
+    "replay": ("jetstream_replay", "Local Jetstream replayer for load tests"),
+    "bench": ("bench_pipeline", "End-to-end pipeline throughput benchmark"),
+}
+
+
+def usage():
+    width = max(map(len, COMMANDS))
+    lines = ["usage: bluesky-pipeline <command> [options]", "", "commands:"]
+    lines += [f"  {name:<{width}}  {summary}" for name, (_, summary) in COMMANDS.items()]
+    lines += ["", "Run 'bluesky-pipeline <command> --help' for a command's options."]
+    return "\n".join(lines)
+
+
+def run(command, argv=()):
+    """Run one subcommand's main() in this process."""
+    module_name, _ = COMMANDS[command]
+    module = importlib.import_module(f"{__package__}.{module_name}")
+    prog = sys.argv[0]
+    sys.argv[0] = f"bluesky-pipeline {command}"  # argparse usage lines
+    try:
+        return module.main(list(argv))
+    finally:
+        sys.argv[0] = prog
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0 if argv else 2
+    command, *rest = argv
+    if command not in COMMANDS:
+        print(f"bluesky-pipeline: unknown command {command!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    return run(command, rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Daily topic clustering of post embeddings.
+
+Streams one day's vectors from its ``posts_{day}.db`` (emb_vec blobs) or,
+once retired, its cold ``posts_{day}.parquet``, and runs spherical k-means
+(cosine similarity on L2-normalised vectors) in three passes:
+
+  1. reservoir-sample --sample vectors and train on them: k-means++ seeding
+     plus vectorised Lloyd iterations (or faiss.Kmeans from the same seeds
+     with --backend faiss)
+  2. --epochs mini-batch passes over the full day, --batch rows at a time,
+     each center moving towards its points with a 1/count learning rate
+  3. assign every post to its nearest center, keeping the --reps posts
+     closest to each center as its representatives
+
+Only the sample and one batch are ever held as vectors, so memory stays flat
+for a full day.  Results are written back:
+
+  * day DB: ``topic_clusters`` (centroid, size, representative URIs) and
+    ``post_clusters`` (cluster id + similarity per post, keyed by rowid)
+  * Parquet: ``posts_{day}.clusters.parquet`` (uri, cluster_id, similarity)
+    and ``posts_{day}.centroids.npy`` next to the Parquet file
+
+and a JSON summary (clusters with sizes and representative texts) goes to
+--summary or stdout.
+
+    python scripts/cluster_day.py --dbdir /mnt/ingestion/database --day 2025-08-01 -k 200
+"""
+import argparse
+import datetime
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from .posts_db import connect_readonly, db_day, partition_paths
+from .vectors import EMBEDDING_DIM, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_DDL = """
+CREATE TABLE IF NOT EXISTS topic_clusters (
+  cluster_id      INTEGER PRIMARY KEY,
+  size            INTEGER NOT NULL,
+  centroid        BLOB NOT NULL,
+  representatives TEXT,
+  built_at        TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS post_clusters (
+  post_rowid  INTEGER PRIMARY KEY,
+  cluster_id  INTEGER NOT NULL,
+  similarity  REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_post_clusters_cluster ON post_clusters(cluster_id, similarity);
+"""
+
+# ---- vector sources --------------------------------------------------------
+
+def iter_db_vectors(db_path, batch):
+    """(rowids, unit vectors) chunks of the day's embedded posts."""
+    conn = connect_readonly(db_path)
+    try:
+        cur = conn.execute("SELECT rowid, emb_vec FROM posts WHERE has_embedding = 1")
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            rows = [r for r in rows if r[1] is not None and len(r[1]) == EMBEDDING_DIM * 4]
+            if not rows:
+                continue
+            keys = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+            vecs = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+            yield keys, normalize_rows(vecs)
+    finally:
+        conn.close()
+
+
+def iter_parquet_vectors(parquet_path, batch):
+    """(row numbers, unit vectors) chunks from a retired day's ``embedding`` column."""
+    import pyarrow.parquet as pq
+    offset = 0
+    for rb in pq.ParquetFile(parquet_path).iter_batches(batch_size=batch, columns=["embedding"]):
+        col = rb.column(0)
+        n = len(col)
+        valid = ~np.asarray(col.is_null())
+        vecs = col.values.to_numpy(zero_copy_only=False).reshape(-1, EMBEDDING_DIM)
+        vecs = vecs[col.offset:col.offset + n]  # .values ignores the slice offset
+        keys = np.arange(offset, offset + n, dtype=np.int64)
+        offset += n
+        if valid.any():
+            yield keys[valid], normalize_rows(vecs[valid])
+
+
+def iter_vectors(path, batch):
+    if path.endswith(".parquet"):
+        return iter_parquet_vectors(path, batch)
+    return iter_db_vectors(path, batch)
+
+
+def reservoir_sample(path, size, batch, rng):
+    """Uniform sample of ``size`` vectors in one streaming pass; also returns the total count."""
+    sample = np.empty((size, EMBEDDING_DIM), dtype=np.float32)
+    seen = 0
+    for _, x in iter_vectors(path, batch):
+        n = len(x)
+        fill = max(0, min(size - seen, n))
+        sample[seen:seen + fill] = x[:fill]
+        if fill < n:
+            # Algorithm R, vectorised: row i (global index seen+i) replaces slot j < size
+            idx = np.arange(seen + fill, seen + n)
+            j = (rng.random(len(idx)) * (idx + 1)).astype(np.int64)
+            keep = j < size
+            sample[j[keep]] = x[fill:][keep]
+        seen += n
+    return sample[:min(seen, size)], seen
+
+# ---- k-means ---------------------------------------------------------------
+
+def kmeans_pp(x, k, rng):
+    """
+    Greedy k-means++ seeding under cosine distance (1 - dot): each step draws
+    2 + log(k) candidates by D^2 and keeps the one that lowers the total
+    distance most, which rarely puts two seeds in one topic.
+    """
+    n_trials = 2 + int(np.log(k))
+    centers = np.empty((k, x.shape[1]), dtype=np.float32)
+    centers[0] = x[rng.integers(len(x))]
+    dist = np.maximum(1.0 - x @ centers[0], 0.0)
+    for i in range(1, k):
+        total = dist.sum()
+        if total > 0:
+            candidates = rng.choice(len(x), size=n_trials, p=dist / total)
+        else:
+            candidates = rng.integers(len(x), size=n_trials)
+        trial = np.minimum(dist[:, None], np.maximum(1.0 - x @ x[candidates].T, 0.0))
+        best = int(trial.sum(axis=0).argmin())
+        centers[i] = x[candidates[best]]
+        dist = trial[:, best]
+    return centers
+
+
+def cluster_sums(x, labels, k):
+    """Per-cluster vector sums and counts; one-hot matmul beats np.add.at by far."""
+    onehot = np.zeros((len(x), k), dtype=np.float32)
+    onehot[np.arange(len(x)), labels] = 1.0
+    return onehot.T @ x, np.bincount(labels, minlength=k)
+
+
+def assign(x, centers):
+    sims = x @ centers.T
+    labels = sims.argmax(axis=1)
+    return labels, sims[np.arange(len(x)), labels]
+
+
+def lloyd(x, centers, iters, rng):
+    for _ in range(iters):
+        labels, _ = assign(x, centers)
+        sums, counts = cluster_sums(x, labels, len(centers))
+        empty = counts == 0
+        if empty.any():  # reseed empty clusters from random points
+            sums[empty] = x[rng.integers(len(x), size=int(empty.sum()))]
+        centers = normalize_rows(sums)
+    return centers
+
+
+def train_faiss(x, centers, iters, seed):
+    import faiss
+    km = faiss.Kmeans(x.shape[1], len(centers), niter=iters, spherical=True, seed=seed, verbose=False)
+    km.train(np.ascontiguousarray(x), init_centroids=centers)
+    return normalize_rows(km.centroids.astype(np.float32))
+
+
+def minibatch_epoch(path, centers, counts, batch, rng):
+    """One streaming mini-batch k-means pass (Sculley 2010) over the day."""
+    for _, x in iter_vectors(path, batch):
+        x = x[rng.permutation(len(x))]
+        labels, _ = assign(x, centers)
+        sums, batch_counts = cluster_sums(x, labels, len(centers))
+        hit = batch_counts > 0
+        counts[hit] += batch_counts[hit]
+        eta = (batch_counts[hit] / counts[hit])[:, None]
+        centers[hit] = (1 - eta) * centers[hit] + eta * (sums[hit] / batch_counts[hit, None])
+        centers[hit] = normalize_rows(centers[hit])
+    return centers
+
+
+def assign_all(path, centers, batch, n_reps):
+    """Labels for every post plus the ``n_reps`` most central posts per cluster."""
+    keys, labels, sims = [], [], []
+    reps = [[] for _ in range(len(centers))]  # min-heaps of (similarity, key)
+    for chunk_keys, x in iter_vectors(path, batch):
+        lab, sim = assign(x, centers)
+        keys.append(chunk_keys)
+        labels.append(lab)
+        sims.append(sim)
+        order = np.lexsort((-sim, lab))  # by cluster, most similar first
+        starts = np.searchsorted(lab[order], np.arange(len(centers) + 1))
+        for c in np.flatnonzero(np.diff(starts)):
+            for i in order[starts[c]:min(starts[c + 1], starts[c] + n_reps)]:
+                item = (float(sim[i]), int(chunk_keys[i]))
+                if len(reps[c]) < n_reps:
+                    heapq.heappush(reps[c], item)
+                elif item > reps[c][0]:
+                    heapq.heapreplace(reps[c], item)
+    if not keys:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32), reps
+    reps = [sorted(r, reverse=True) for r in reps]
+    return np.concatenate(keys), np.concatenate(labels), np.concatenate(sims), reps
+
+# ---- output ----------------------------------------------------------------
+
+def rep_posts(path, reps):
+    """{key: (uri, text)} for every representative key."""
+    wanted = sorted({key for r in reps for _, key in r})
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=["uri", "text"]).take(wanted)
+        return dict(zip(wanted, zip(table.column("uri").to_pylist(), table.column("text").to_pylist())))
+    conn = connect_readonly(path)
+    try:
+        found = {}
+        for i in range(0, len(wanted), 500):
+            part = wanted[i:i + 500]
+            marks = ",".join("?" * len(part))
+            for rowid, uri, text in conn.execute(
+                    f"SELECT rowid, uri, text FROM posts WHERE rowid IN ({marks})", part):
+                found[rowid] = (uri, text)
+        return found
+    finally:
+        conn.close()
+
+
+def write_db(db_path, centers, sizes, keys, labels, sims, rep_uris, built_at):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA busy_timeout=5000;")
+        conn.executescript(CLUSTER_DDL)
+        with conn:  # replace the previous run atomically
+            conn.execute("DELETE FROM topic_clusters")
+            conn.execute("DELETE FROM post_clusters")
+            conn.executemany(
+                "INSERT INTO topic_clusters (cluster_id, size, centroid, representatives, built_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(c, int(sizes[c]), centers[c].tobytes(), json.dumps(rep_uris[c]), built_at)
+                 for c in range(len(centers))])
+            conn.executemany(
+                "INSERT INTO post_clusters (post_rowid, cluster_id, similarity) VALUES (?, ?, ?)",
+                zip(keys.tolist(), labels.tolist(), sims.tolist()))
+    finally:
+        conn.close()
+
+
+def write_parquet_sidecars(parquet_path, centers, keys, labels, sims):
+    import pyarrow.parquet as pq
+    uris = pq.read_table(parquet_path, columns=["uri"]).column("uri").take(keys)
+    write_cluster_sidecars(parquet_path, centers, uris, labels, sims)
+
+
+def write_cluster_sidecars(parquet_path, centers, uris, labels, sims):
+    """
+    ``{day}.clusters.parquet`` (uri, cluster_id, similarity) and
+    ``{day}.centroids.npy`` next to a cold partition; ``uris`` is an Arrow
+    string array.  retire_days.py writes the same files for a day DB's clusters.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    base = parquet_path[:-len(".parquet")]
+    table = pa.table({"uri": uris,
+                      "cluster_id": pa.array(labels, type=pa.int32()),
+                      "similarity": pa.array(sims, type=pa.float32())})
+    pq.write_table(table, base + ".clusters.parquet.tmp", compression="zstd")
+    os.replace(base + ".clusters.parquet.tmp", base + ".clusters.parquet")
+    with open(base + ".centroids.npy.tmp", "wb") as f:
+        np.save(f, centers)
+    os.replace(base + ".centroids.npy.tmp", base + ".centroids.npy")
+
+# ---- main ------------------------------------------------------------------
+
+def cluster_day(path, k, sample_size=200_000, iters=20, epochs=1, batch=50_000, n_reps=5,
+                backend="numpy", seed=0):
+    """Cluster one partition and write the results back; returns the summary dict."""
+    rng = np.random.default_rng(seed)
+    t0 = time.perf_counter()
+    sample, total = reservoir_sample(path, sample_size, batch, rng)
+    if total == 0:
+        raise ValueError(f"{path}: no embedded posts")
+    k = min(k, len(sample))
+    logger.info(f"{total} vectors, training k={k} on a sample of {len(sample)} ({backend})")
+
+    # both backends start from k-means++ seeds; faiss's own random init can
+    # merge well-separated topics
+    centers = kmeans_pp(sample, k, rng)
+    if backend == "faiss":
+        centers = train_faiss(sample, centers, iters, seed)
+    else:
+        centers = lloyd(sample, centers, iters, rng)
+    t_train = time.perf_counter()
+
+    counts = np.bincount(assign(sample, centers)[0], minlength=k).astype(np.float64)
+    for _ in range(epochs):
+        centers = minibatch_epoch(path, centers, counts, batch, rng)
+    t_refine = time.perf_counter()
+
+    keys, labels, sims, reps = assign_all(path, centers, batch, n_reps)
+    sizes = np.bincount(labels, minlength=k)
+    posts = rep_posts(path, reps)
+    t_assign = time.perf_counter()
+
+    built_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    if path.endswith(".parquet"):
+        write_parquet_sidecars(path, centers, keys, labels, sims)
+    else:
+        rep_uris = [[posts[key][0] for _, key in r if key in posts] for r in reps]
+        write_db(path, centers, sizes, keys, labels, sims, rep_uris, built_at)
+    t_write = time.perf_counter()
+
+    logger.info(f"train {t_train - t0:.1f}s, mini-batch {t_refine - t_train:.1f}s, "
+                f"assign {t_assign - t_refine:.1f}s, write {t_write - t_assign:.1f}s")
+    clusters = [{
+        "cluster_id": c,
+        "size": int(sizes[c]),
+        "representatives": [{"uri": posts[key][0], "text": posts[key][1], "similarity": round(s, 4)}
+                            for s, key in reps[c] if key in posts],
+    } for c in np.argsort(-sizes).tolist()]
+    return {
+        "day": db_day(path),
+        "source": os.path.abspath(path),
+        "posts": int(total),
+        "k": k,
+        "backend": backend,
+        "mean_similarity": round(float(sims.mean()), 4),
+        "seconds": round(t_write - t0, 1),
+        "built_at": built_at,
+        "clusters": clusters,
+    }
+
+
+def main(argv=None):
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    yesterday = (datetime.datetime.now(datetime.timezone.utc).date() - datetime.timedelta(days=1)).isoformat()
+    ap = argparse.ArgumentParser(description="Cluster a day's post embeddings with mini-batch k-means")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--dbdir", help="Directory holding posts_{day}.db files (and the cold catalog)")
+    src.add_argument("--path", help="A posts_{day}.db or posts_{day}.parquet file")
+    ap.add_argument("--day", default=yesterday, help=f"Day to cluster with --dbdir (default yesterday, {yesterday})")
+    ap.add_argument("-k", type=int, default=200, help="Number of clusters (default 200)")
+    ap.add_argument("--sample", type=int, default=200_000, help="Vectors sampled for the initial fit (default 200000)")
+    ap.add_argument("--iters", type=int, default=20, help="Lloyd iterations on the sample (default 20)")
+    ap.add_argument("--epochs", type=int, default=1, help="Mini-batch passes over the full day (default 1)")
+    ap.add_argument("--batch", type=int, default=50_000, help="Rows per streamed batch (default 50000)")
+    ap.add_argument("--reps", type=int, default=5, help="Representative posts per cluster (default 5)")
+    ap.add_argument("--backend", choices=("numpy", "faiss"), default="numpy",
+                    help="Initial fit on the sample after k-means++ seeding: numpy Lloyd or faiss.Kmeans")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--summary", help="Write the JSON summary here instead of stdout")
+    args = ap.parse_args(argv)
+
+    if args.path:
+        path = args.path
+    elif args.dbdir:
+        by_day = {db_day(p): p for p in partition_paths(args.dbdir)}
+        if args.day not in by_day:
+            ap.error(f"no partition for {args.day} in {args.dbdir}")
+        path = by_day[args.day]
+    else:
+        ap.error("one of --dbdir or --path is required")
+
+    summary = cluster_day(path, args.k, args.sample, args.iters, args.epochs, args.batch,
+                          args.reps, args.backend, args.seed)
+    if args.summary:
+        tmp = args.summary + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, args.summary)
+    else:
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
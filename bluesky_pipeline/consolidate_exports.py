@@ -0,0 +1,96 @@
+import argparse
+import datetime
+import glob
+import logging
+import os
+import sys
+
+from .dates import DATE_FORMAT_STRING, get_date_strings, parse_date
+
+logger = logging.getLogger(__name__)
+
+
+CONSOLIDATED_DIR = "consolidated"
+
+def consolidate_day(export_dir: str, output_subdir: str, date_str: str):
+    """
+    Consolidate all chunk parquet files for a given date into a single file,
+    skipping if the consolidated file is up to date.
+    """
+    pattern = os.path.join(export_dir, f"posts-{date_str}-*.parquet")
+    chunk_files = glob.glob(pattern)
+    if not chunk_files:
+        logging.info(f"No chunk files for {date_str}, pattern {pattern}")
+        return
+
+    if not os.path.exists(os.path.join(export_dir, f"{output_subdir}")):
+        logging.info(f"Target directory {output_subdir} does not exist")
+        return
+
+    consolidated_file = os.path.join(export_dir, f"{output_subdir}", f"posts-{date_str}.parquet")
+
+    if os.path.exists(consolidated_file):
+        consolidated_mtime = os.path.getmtime(consolidated_file)
+        if all(os.path.getmtime(f) <= consolidated_mtime for f in chunk_files):
+            logging.info(f"Skipping {date_str} (already consolidated and up to date)")
+            return
+
+    logging.info(f"Consolidating {len(chunk_files)} files for {date_str}")
+    import duckdb
+    con = duckdb.connect()
+    try:
+        con.execute(f"""
+            COPY (
+                SELECT * FROM read_parquet('{pattern}')
+            ) TO '{consolidated_file}' (FORMAT 'parquet');
+        """)
+        logging.info(f"Consolidated to {consolidated_file}")
+    except Exception as e:
+        logging.info(f"Error consolidating for {date_str}: {e}")
+    finally:
+        con.close()
+
+DAYS_BACK = 3
+EXPORT_DIR = "."
+CONSOLIDATE_SUBDIR = "consolidated"
+
+
+def main(argv=None):
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # ----------------------------------------
+    # Parse command line
+    # ----------------------------------------
+    parser = argparse.ArgumentParser(
+        description="Consolidate Bluesky embeddings."
+    )
+
+    parser.add_argument(
+        "--current-date",
+        type=str,
+        default=datetime.date.today().strftime(DATE_FORMAT_STRING),
+        help="Latest date to start export from.  ('YYYY-MM-DD')"
+    )
+    parser.add_argument(
+        "--export-dir",
+        type=str,
+        default= EXPORT_DIR,
+        help="Directory for export files.  Needs to already exist."
+    )
+    parser.add_argument(
+        "--consolidated-subdir",
+        type=str,
+        default= CONSOLIDATE_SUBDIR,
+        help="Subdirectory for consolidated files.  Needs to already exist."
+    )
+
+    args = parser.parse_args(argv)
+    days = get_date_strings(parse_date(args.current_date), DAYS_BACK)
+
+    for day in days:
+        logger.info(f"Consolidating {day} data in {args.export_dir} into {args.consolidated_subdir}")
+        consolidate_day(args.export_dir, args.consolidated_subdir, day)
+
+
+if __name__ == "__main__":
+    main()
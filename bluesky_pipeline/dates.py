@@ -0,0 +1,18 @@
+"""Date helpers shared by the export / consolidation jobs."""
+import datetime
+
+DATE_FORMAT_STRING = "%Y-%m-%d"
+
+
+def parse_date(value):
+    """'YYYY-MM-DD' -> datetime."""
+    return datetime.datetime.strptime(value, DATE_FORMAT_STRING)
+
+
+def get_date_strings(last_date, numDays):
+    """``numDays`` day strings, ``last_date`` first, going backwards."""
+    days = [last_date.strftime(DATE_FORMAT_STRING)]
+    while len(days) < numDays:
+        last_date -= datetime.timedelta(days=1)
+        days.append(last_date.strftime(DATE_FORMAT_STRING))
+    return days
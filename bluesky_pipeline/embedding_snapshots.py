@@ -0,0 +1,67 @@
+"""
+Arrow IPC (Feather v2) snapshots of a day's embeddings.
+
+``export_embeddings.py --format arrow`` writes one uncompressed
+``posts-{day}.arrow`` per day holding a single record batch, so the
+``embedding`` column is one contiguous FixedSizeList<float32>[384] buffer.
+Memory-mapping the file then gives the whole day as an ``(N, 384)`` float32
+array without reading or copying it:
+
+    from bluesky_pipeline.embedding_snapshots import load_embeddings
+    table, vectors = load_embeddings("/mnt/ingestion/exports/posts-2025-08-01.arrow")
+    vectors.shape        # (N, 384), backed by the mmap
+    table["uri"][0]      # other columns are mmapped Arrow arrays too
+
+The files also open with ``pyarrow.feather.read_table`` / ``pandas.read_feather``.
+"""
+import os
+
+import numpy as np
+import pyarrow as pa
+
+from .vectors import EMBEDDING_DIM
+
+
+def embedding_array(blobs):
+    """emb_vec blobs (or None) -> FixedSizeList<float32>[384], zero-copy from one buffer."""
+    n = len(blobs)
+    values = np.zeros((n, EMBEDDING_DIM), dtype=np.float32)
+    mask = np.ones(n, dtype=bool)
+    for i, blob in enumerate(blobs):
+        if blob is not None and len(blob) == EMBEDDING_DIM * 4:
+            values[i] = np.frombuffer(blob, dtype=np.float32)
+            mask[i] = False
+    return pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1)), EMBEDDING_DIM,
+                                             mask=pa.array(mask))
+
+
+def vectors_array(vectors):
+    """(N, 384) float32 array -> FixedSizeList column sharing its buffer."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1)), vectors.shape[1])
+
+
+def write_snapshot(path, batch):
+    """Write one uncompressed record batch (compression would defeat mmap)."""
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    os.replace(tmp, path)
+
+
+def as_matrix(column):
+    """FixedSizeList array/column -> (N, dim) NumPy view; copies only if chunked."""
+    if isinstance(column, pa.ChunkedArray):
+        if column.num_chunks != 1:
+            column = column.combine_chunks()  # multi-batch file: one copy
+        else:
+            column = column.chunk(0)
+    dim = column.type.list_size
+    values = column.values.to_numpy(zero_copy_only=True).reshape(-1, dim)
+    return values[column.offset:column.offset + len(column)]
+
+
+def load_embeddings(path, column="embedding"):
+    """Memory-map a snapshot; returns (pyarrow.Table, (N, dim) float32 view)."""
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table, as_matrix(table.column(column))
@@ -0,0 +1,300 @@
+import argparse
+import datetime
+import logging
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+from .dates import DATE_FORMAT_STRING, get_date_strings, parse_date
+from .posts_db import is_day_schema
+from .vectors import EMBEDDING_DIM
+
+logger = logging.getLogger(__name__)
+
+# Convert embedding_blob from binary to list of floats
+def decode_embedding(blob):
+    try:
+        return np.frombuffer(blob, dtype=np.float32).tolist()
+    except Exception:
+        return None
+
+def build_live_link(uri):
+    parts = uri.split('/')
+    handle = parts[2] if len(parts) > 2 else ''
+    post_id = parts[-1] if len(parts) > 3 else ''
+    return f"https://bsky.app/profile/{handle}/post/{post_id}"
+
+DB_PATH = "bluesky_posts.db"
+DAYS_BACK = 3
+OUTPUT_DIR = "."
+BATCH_SIZE = 10_000
+
+QUERY = """
+    SELECT uri, created_at, created_date, created_hour, text, embedding_blob
+    FROM posts
+    WHERE created_date = ?
+    AND created_hour = ?
+    AND embedding_blob IS NOT NULL
+"""
+
+# ----------------------------------------
+# Parquet chunks: one or more files per hour
+# ----------------------------------------
+def export_parquet_day(cursor, day, output_dir):
+    import pandas as pd
+
+    for hour in range(24):
+        logger.info(f"Starting sqlite query for {day} {hour:0>2}")
+        cursor.execute(QUERY, (day, hour))
+        rows = cursor.fetchall()
+        logger.info("Finished sqlite query")
+        logger.info(f"rows: {len(rows)}")
+
+        for i in range(0, len(rows), BATCH_SIZE):
+            chunk = rows[i:i + BATCH_SIZE]
+
+            df = pd.DataFrame(chunk, columns=[
+                "uri", "created_at", "created_date", "created_hour", "text", "embedding_blob"
+            ])
+            logger.info(f"Loaded {len(df)} rows from SQLite")
+
+            df["embedding"] = df["embedding_blob"].apply(decode_embedding)
+            df = df.drop(columns=["embedding_blob"])
+            df["post_url"] = df["uri"].apply(build_live_link)
+
+            # Export to Parquet
+            filename = f"{output_dir}/posts-{day}-{hour:0>2}.{i//BATCH_SIZE}.parquet"
+            df.to_parquet(filename, index=False)
+            logger.info(f"Wrote {len(df)} rows to {filename}")
+        logger.info(f"Export complete for {day} {hour:0>2}.")
+
+# ----------------------------------------
+# Single pass: one time-ordered Parquet file per day
+# ----------------------------------------
+# ~128 MiB of float64 embeddings per row group (384 * 8 bytes per row)
+ROW_GROUP_ROWS = 40_000
+FETCH_ROWS = 5_000
+
+# One index range scan per day, already in time order, so no sort step.
+# Per-day DBs walk idx_posts_timeus; the legacy DB has no time_us and walks
+# idx_posts_created_date_hour (rowid order within an hour = ingest order).
+DAY_SCAN = """
+    SELECT uri, created_at, created_day AS created_date,
+           CAST(substr(created_hour, 12, 2) AS INTEGER) AS created_hour,
+           text, emb_vec
+    FROM posts
+    WHERE time_us >= ? AND time_us < ?
+    AND +has_embedding = 1  -- unary + keeps the planner on idx_posts_timeus
+    ORDER BY time_us
+"""
+LEGACY_SCAN = """
+    SELECT uri, created_at, created_date, created_hour, text, embedding_blob
+    FROM posts
+    WHERE created_date = ?
+    AND embedding_blob IS NOT NULL
+    ORDER BY created_hour
+"""
+
+
+# Index-only upper bound on the rows a scan returns (embedded or not).
+DAY_BOUND = "SELECT COUNT(*) FROM posts WHERE time_us >= ? AND time_us < ?"
+LEGACY_BOUND = "SELECT COUNT(*) FROM posts WHERE created_date = ?"
+
+
+def day_range_us(day):
+    start = datetime.datetime.strptime(day, DATE_FORMAT_STRING).replace(tzinfo=datetime.timezone.utc)
+    start_us = int(start.timestamp()) * 1_000_000
+    return start_us, start_us + 86_400 * 1_000_000
+
+
+def day_scan(conn, day):
+    """Cursor over ``day``'s embedded posts in time order (not yet fetched)."""
+    if is_day_schema(conn):
+        return conn.execute(DAY_SCAN, day_range_us(day))
+    return conn.execute(LEGACY_SCAN, (day,))
+
+
+def day_row_bound(conn, day):
+    """At least as many rows as day_scan() returns, counted from the index alone."""
+    if is_day_schema(conn):
+        return conn.execute(DAY_BOUND, day_range_us(day)).fetchone()[0]
+    return conn.execute(LEGACY_BOUND, (day,)).fetchone()[0]
+
+
+def parquet_batch(rows):
+    """Rows from day_scan() -> a table with the consolidated export schema."""
+    import pyarrow as pa
+
+    rows = [r for r in rows if r[5] is not None and len(r[5]) == EMBEDDING_DIM * 4]
+    uris = [r[0] for r in rows]
+    matrix = np.frombuffer(b"".join(r[5] for r in rows), dtype=np.float32).astype(np.float64)
+    offsets = pa.array(np.arange(len(rows) + 1, dtype=np.int32) * EMBEDDING_DIM)
+    return pa.table({
+        "uri": pa.array(uris, type=pa.string()),
+        "created_at": pa.array([r[1] for r in rows], type=pa.string()),
+        "created_date": pa.array([r[2] for r in rows], type=pa.string()),
+        "created_hour": pa.array([r[3] for r in rows], type=pa.int64()),
+        "text": pa.array([r[4] for r in rows], type=pa.string()),
+        "embedding": pa.ListArray.from_arrays(offsets, pa.array(matrix)),
+        "post_url": pa.array([build_live_link(u) for u in uris], type=pa.string()),
+    })
+
+
+def export_parquet_single_pass(conn, day, output_dir, row_group_rows=ROW_GROUP_ROWS):
+    """
+    Stream one day with fetchmany() straight into ``posts-{day}.parquet``,
+    one row group per ``row_group_rows`` posts.  The file has the same schema
+    as consolidate_exports.py output, so no hourly chunks and no consolidation.
+    """
+    import pyarrow.parquet as pq
+
+    filename = f"{output_dir}/posts-{day}.parquet"
+    tmp = filename + ".tmp"
+    cursor = day_scan(conn, day)
+    writer = None
+    pending, total = [], 0
+    try:
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            pending.extend(rows)
+            # full row groups while streaming, then whatever is left at the end
+            while pending and (len(pending) >= row_group_rows or not rows):
+                table = parquet_batch(pending[:row_group_rows])
+                del pending[:row_group_rows]
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema, compression="zstd")
+                writer.write_table(table, row_group_size=row_group_rows)
+                total += table.num_rows
+                logger.info(f"{day}: {total} rows written")
+            if not rows:
+                break
+    finally:
+        cursor.close()
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        logger.info(f"No embedded posts for {day}; nothing written")
+        return
+    os.replace(tmp, filename)
+    logger.info(f"Wrote {total} rows to {filename}")
+
+
+# ----------------------------------------
+# Arrow snapshots: one file per day
+# ----------------------------------------
+def arrow_columns(rows):
+    """Every column but ``embedding`` for valid day_scan() rows, as Arrow arrays."""
+    import pyarrow as pa
+
+    uris = [r[0] for r in rows]
+    return {
+        "uri": pa.array(uris, type=pa.string()),
+        "created_at": pa.array([r[1] for r in rows], type=pa.string()),
+        "created_date": pa.array([r[2] for r in rows], type=pa.string()),
+        "created_hour": pa.array([r[3] for r in rows], type=pa.int32()),
+        "text": pa.array([r[4] for r in rows], type=pa.string()),
+        "post_url": pa.array([build_live_link(u) for u in uris], type=pa.string()),
+    }
+
+
+def export_arrow_day(conn, day, output_dir):
+    """
+    Stream one day with fetchmany(), in the same single ordered scan as
+    parquet-day, and write it as ``posts-{day}.arrow``.  Vectors are copied
+    straight from the blobs into one matrix sized by day_row_bound(), which
+    becomes the file's single record batch without a concatenation, so the
+    day's embeddings are only held once.
+    """
+    import pyarrow as pa
+    from .embedding_snapshots import vectors_array, write_snapshot
+
+    conn.execute("BEGIN")  # one read snapshot for the bound and the scan
+    try:
+        # np.empty: pages past the embedded rows are never touched
+        matrix = np.empty((day_row_bound(conn, day), EMBEDDING_DIM), dtype=np.float32)
+        chunks, n = [], 0
+        cursor = day_scan(conn, day)
+        try:
+            while True:
+                rows = cursor.fetchmany(FETCH_ROWS)
+                if not rows:
+                    break
+                rows = [r for r in rows if r[5] is not None and len(r[5]) == EMBEDDING_DIM * 4]
+                matrix[n:n + len(rows)] = np.frombuffer(
+                    b"".join(r[5] for r in rows), dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+                n += len(rows)
+                chunks.append(arrow_columns(rows))
+        finally:
+            cursor.close()
+    finally:
+        conn.execute("COMMIT")
+    if n == 0:
+        logger.info(f"No embedded posts for {day}; nothing written")
+        return
+    columns = {name: pa.concat_arrays([c[name] for c in chunks]) for name in chunks[0]}
+    columns["embedding"] = vectors_array(matrix[:n])  # a leading slice: no copy
+    filename = f"{output_dir}/posts-{day}.arrow"
+    write_snapshot(filename, pa.record_batch(columns))
+    logger.info(f"Wrote {n} rows to {filename}")
+
+
+def main(argv=None):
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # ----------------------------------------
+    # Parse command line
+    # ----------------------------------------
+    parser = argparse.ArgumentParser(
+        description="Ingest Bluesky posts or generate embeddings."
+    )
+
+    parser.add_argument(
+        "--db-path",
+        type=str,
+        default=DB_PATH,
+        help="Path to the SQLite database file."
+    )
+    parser.add_argument(
+        "--current-date",
+        type=str,
+        default=datetime.date.today().strftime(DATE_FORMAT_STRING),
+        help="Latest date to start export from.  ('YYYY-MM-DD')"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default= OUTPUT_DIR,
+        help="Directory for output files.  Needs to already exist."
+    )
+    parser.add_argument(
+        "--format",
+        choices=("parquet", "parquet-day", "arrow"),
+        default="parquet",
+        help="parquet: hourly chunk files.  parquet-day: one time-ordered file per day "
+             "written in a single indexed scan, already in consolidated form.  "
+             "arrow: one uncompressed Arrow IPC/Feather file per day with a contiguous "
+             "embedding column, for mmap loading (see embedding_snapshots.py)."
+    )
+
+    args = parser.parse_args(argv)
+    days = get_date_strings(parse_date(args.current_date), DAYS_BACK)
+
+    conn = sqlite3.connect(args.db_path)
+    try:
+        cursor = conn.cursor()
+        for day in days:
+            if args.format == "parquet-day":
+                export_parquet_single_pass(conn, day, args.output_dir)
+            elif args.format == "arrow":
+                export_arrow_day(conn, day, args.output_dir)
+            else:
+                export_parquet_day(cursor, day, args.output_dir)
+            logger.info(f"Finished with day {day}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+
+from .metrics import Registry, add_metrics_args
+from .posts_db import ensure_emb_norm, load_cold_catalog
+from .sketches import HyperLogLog
+
+METRICS = Registry()
+M_ROWS = METRICS.counter("bsky_import_rows_total", "Rows upserted into day DBs")
+M_ROWS_RATE = METRICS.rate("bsky_import_rows_per_second", "Rows upserted per second", M_ROWS)
+M_BACKLOG = METRICS.gauge("bsky_import_backlog_bytes", "NDJSON bytes not yet imported")
+M_BATCH = METRICS.histogram("bsky_import_batch_seconds", "Duration of one UPSERT batch + commit")
+
+DDL = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA busy_timeout=5000;
+PRAGMA wal_autocheckpoint=1000;
+
+CREATE TABLE IF NOT EXISTS posts (
+  uri            TEXT PRIMARY KEY,
+  author_did     TEXT NOT NULL,
+  rkey           TEXT NOT NULL,
+  cid            TEXT,
+  created_at     TEXT NOT NULL,
+  time_us        INTEGER NOT NULL,
+  indexed_first  INTEGER,
+  indexed_last   INTEGER,
+  text           TEXT,
+  reply_parent   TEXT,
+  reply_root     TEXT,
+  quote_uri      TEXT,
+  langs_json     TEXT,
+  lang_en        INTEGER NOT NULL DEFAULT 0,
+  has_embedding  INTEGER NOT NULL DEFAULT 0,
+  is_reply       INTEGER GENERATED ALWAYS AS (reply_parent IS NOT NULL) STORED,
+  is_quote       INTEGER GENERATED ALWAYS AS (quote_uri    IS NOT NULL) STORED,
+  created_day    TEXT GENERATED ALWAYS AS (substr(created_at,1,10)) STORED,
+  created_hour   TEXT GENERATED ALWAYS AS (substr(created_at,1,13)) STORED,
+  emb_model      TEXT,
+  emb_dims       INTEGER,
+  emb_vec        BLOB,
+  emb_norm       INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_posts_created           ON posts(created_at);
+CREATE INDEX IF NOT EXISTS idx_posts_author_created    ON posts(author_did, created_at);
+CREATE INDEX IF NOT EXISTS idx_posts_created_day       ON posts(created_day);
+CREATE INDEX IF NOT EXISTS idx_posts_created_hour      ON posts(created_hour);
+CREATE INDEX IF NOT EXISTS idx_posts_lang_en_day       ON posts(lang_en, created_day);
+CREATE INDEX IF NOT EXISTS idx_posts_timeus            ON posts(time_us);
+CREATE INDEX IF NOT EXISTS idx_posts_has_embedding_day ON posts(has_embedding, created_day);
+"""
+
+UPSERT = """
+INSERT INTO posts (uri, author_did, rkey, cid, created_at, time_us,
+                   indexed_first, indexed_last, text,
+                   reply_parent, reply_root, quote_uri,
+                   langs_json, lang_en,
+                   emb_model, emb_dims, emb_vec, has_embedding)
+VALUES (:uri, :author_did, :rkey, :cid, :created_at, :time_us,
+        :indexed_at, :indexed_at, :text,
+        :reply_parent, :reply_root, :quote_uri,
+        :langs_json, :lang_en,
+        :emb_model, :emb_dims, :emb_vec, :has_embedding)
+ON CONFLICT(uri) DO UPDATE SET
+  cid           = excluded.cid,
+  created_at    = COALESCE(excluded.created_at, posts.created_at),
+  time_us       = COALESCE(posts.time_us, excluded.time_us),
+  indexed_first = MIN(posts.indexed_first, excluded.indexed_first),
+  indexed_last  = MAX(posts.indexed_last,  excluded.indexed_last),
+  text          = excluded.text,
+  reply_parent  = excluded.reply_parent,
+  reply_root    = excluded.reply_root,
+  quote_uri     = excluded.quote_uri,
+  langs_json    = excluded.langs_json,
+  lang_en       = excluded.lang_en,
+  emb_model     = COALESCE(excluded.emb_model, posts.emb_model),
+  emb_dims      = COALESCE(excluded.emb_dims, posts.emb_dims),
+  emb_vec       = COALESCE(excluded.emb_vec, posts.emb_vec),
+  has_embedding = CASE WHEN excluded.emb_vec IS NOT NULL THEN 1 ELSE posts.has_embedding END;
+"""
+
+# Optional lexical index over post text.  External-content FTS5 keyed by the
+# posts rowid, kept in sync by triggers so it is maintained inside the same
+# import transaction as the UPSERT.
+FTS_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+  text,
+  content='posts',
+  content_rowid='rowid',
+  tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+  INSERT INTO posts_fts(rowid, text) VALUES (new.rowid, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+  INSERT INTO posts_fts(posts_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF text ON posts
+WHEN old.text IS NOT new.text BEGIN
+  INSERT INTO posts_fts(posts_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+  INSERT INTO posts_fts(rowid, text) VALUES (new.rowid, new.text);
+END;
+"""
+
+# Hourly rollups for dashboards, maintained in the import transaction:
+# post counts per created_hour x lang_en x is_reply x is_quote via triggers,
+# and a HyperLogLog of author DIDs per created_hour (see sketches.py),
+# merged in from each batch by update_author_sketches().
+ROLLUP_DDL = """
+CREATE TABLE IF NOT EXISTS hourly_counts (
+  created_hour TEXT    NOT NULL,
+  lang_en      INTEGER NOT NULL,
+  is_reply     INTEGER NOT NULL,
+  is_quote     INTEGER NOT NULL,
+  posts        INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (created_hour, lang_en, is_reply, is_quote)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS hourly_authors (
+  created_hour TEXT PRIMARY KEY,
+  hll          BLOB NOT NULL
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS posts_rollup_ai AFTER INSERT ON posts BEGIN
+  INSERT INTO hourly_counts (created_hour, lang_en, is_reply, is_quote, posts)
+  VALUES (new.created_hour, new.lang_en, new.is_reply, new.is_quote, 1)
+  ON CONFLICT (created_hour, lang_en, is_reply, is_quote) DO UPDATE SET posts = posts + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_rollup_ad AFTER DELETE ON posts BEGIN
+  UPDATE hourly_counts SET posts = posts - 1
+  WHERE created_hour = old.created_hour AND lang_en = old.lang_en
+    AND is_reply = old.is_reply AND is_quote = old.is_quote;
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_rollup_au
+AFTER UPDATE OF created_at, lang_en, reply_parent, quote_uri ON posts
+WHEN old.created_hour IS NOT new.created_hour OR old.lang_en IS NOT new.lang_en
+  OR old.is_reply IS NOT new.is_reply OR old.is_quote IS NOT new.is_quote
+BEGIN
+  UPDATE hourly_counts SET posts = posts - 1
+  WHERE created_hour = old.created_hour AND lang_en = old.lang_en
+    AND is_reply = old.is_reply AND is_quote = old.is_quote;
+  INSERT INTO hourly_counts (created_hour, lang_en, is_reply, is_quote, posts)
+  VALUES (new.created_hour, new.lang_en, new.is_reply, new.is_quote, 1)
+  ON CONFLICT (created_hour, lang_en, is_reply, is_quote) DO UPDATE SET posts = posts + 1;
+END;
+"""
+
+# Reply/quote graph.  Edge targets (parent, root, quoted post) are interned
+# in uri_ids since they may live in another day DB; the source is the
+# replying/quoting post's own posts.rowid.  edges.kind: 1 reply parent,
+# 2 thread root, 3 quote (EDGE_* in posts_db.py).  The primary key answers
+# "who replied to / quoted X" with one index range scan.  Targets are
+# interned with NOT EXISTS rather than INSERT OR IGNORE: inside a trigger
+# fired by the import UPSERT's DO UPDATE, SQLite applies the outer
+# statement's ABORT and the IGNORE would be dropped.
+GRAPH_DDL = """
+CREATE TABLE IF NOT EXISTS uri_ids (
+  id   INTEGER PRIMARY KEY,
+  uri  TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS edges (
+  dst  INTEGER NOT NULL,
+  kind INTEGER NOT NULL,
+  src  INTEGER NOT NULL,
+  PRIMARY KEY (dst, kind, src)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_edges_src ON edges(src);
+
+CREATE TRIGGER IF NOT EXISTS posts_graph_ai AFTER INSERT ON posts
+WHEN new.reply_parent IS NOT NULL OR new.reply_root IS NOT NULL OR new.quote_uri IS NOT NULL BEGIN
+  INSERT INTO uri_ids (uri)
+    SELECT t.uri FROM (SELECT new.reply_parent AS uri UNION SELECT new.reply_root UNION SELECT new.quote_uri) AS t
+    WHERE t.uri IS NOT NULL AND NOT EXISTS (SELECT 1 FROM uri_ids AS u WHERE u.uri = t.uri);
+  INSERT OR IGNORE INTO edges (dst, kind, src)
+    SELECT u.id, t.kind, new.rowid
+    FROM (SELECT new.reply_parent AS uri, 1 AS kind
+          UNION ALL SELECT new.reply_root, 2
+          UNION ALL SELECT new.quote_uri, 3) AS t
+    JOIN uri_ids AS u ON u.uri = t.uri;
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_graph_ad AFTER DELETE ON posts BEGIN
+  DELETE FROM edges WHERE src = old.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_graph_au AFTER UPDATE OF reply_parent, reply_root, quote_uri ON posts
+WHEN old.reply_parent IS NOT new.reply_parent OR old.reply_root IS NOT new.reply_root
+  OR old.quote_uri IS NOT new.quote_uri
+BEGIN
+  DELETE FROM edges WHERE src = old.rowid;
+  INSERT INTO uri_ids (uri)
+    SELECT t.uri FROM (SELECT new.reply_parent AS uri UNION SELECT new.reply_root UNION SELECT new.quote_uri) AS t
+    WHERE t.uri IS NOT NULL AND NOT EXISTS (SELECT 1 FROM uri_ids AS u WHERE u.uri = t.uri);
+  INSERT OR IGNORE INTO edges (dst, kind, src)
+    SELECT u.id, t.kind, new.rowid
+    FROM (SELECT new.reply_parent AS uri, 1 AS kind
+          UNION ALL SELECT new.reply_root, 2
+          UNION ALL SELECT new.quote_uri, 3) AS t
+    JOIN uri_ids AS u ON u.uri = t.uri;
+END;
+"""
+
+GRAPH_BACKFILL = """
+INSERT OR IGNORE INTO uri_ids (uri)
+  SELECT reply_parent FROM posts WHERE reply_parent IS NOT NULL
+  UNION SELECT reply_root FROM posts WHERE reply_root IS NOT NULL
+  UNION SELECT quote_uri FROM posts WHERE quote_uri IS NOT NULL;
+INSERT OR IGNORE INTO edges (dst, kind, src)
+  SELECT u.id, 1, p.rowid FROM posts p JOIN uri_ids u ON u.uri = p.reply_parent
+  UNION ALL SELECT u.id, 2, p.rowid FROM posts p JOIN uri_ids u ON u.uri = p.reply_root
+  UNION ALL SELECT u.id, 3, p.rowid FROM posts p JOIN uri_ids u ON u.uri = p.quote_uri;
+"""
+
+def ensure_db(db_path):
+    new = not os.path.exists(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys=ON;")
+    if new:
+        conn.executescript(DDL)
+        conn.commit()
+    else:
+        ensure_emb_norm(conn)
+    return conn
+
+def ensure_fts(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='posts_fts'"
+    ).fetchone()
+    conn.executescript(FTS_DDL)
+    if not exists:
+        # DB predates --fts: index the rows that are already there
+        conn.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild');")
+    conn.commit()
+
+def update_author_sketches(cur, rows):
+    """Merge the batch's author DIDs into hourly_authors (caller commits)."""
+    by_hour = {}
+    for rec in rows:
+        by_hour.setdefault(rec["created_at"][:13], set()).add(rec["author_did"])
+    for hour, dids in by_hour.items():
+        row = cur.execute("SELECT hll FROM hourly_authors WHERE created_hour = ?", (hour,)).fetchone()
+        hll = HyperLogLog.from_bytes(row[0]) if row else HyperLogLog()
+        hll.update(dids)
+        cur.execute("INSERT OR REPLACE INTO hourly_authors (created_hour, hll) VALUES (?, ?)",
+                    (hour, hll.to_bytes()))
+
+def ensure_rollups(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='hourly_counts'"
+    ).fetchone()
+    conn.executescript(ROLLUP_DDL)
+    if not exists:
+        # DB predates the rollups: seed them from the rows already there
+        conn.execute("DELETE FROM hourly_authors")
+        conn.execute("""
+            INSERT INTO hourly_counts (created_hour, lang_en, is_reply, is_quote, posts)
+            SELECT created_hour, lang_en, is_reply, is_quote, COUNT(*)
+            FROM posts GROUP BY created_hour, lang_en, is_reply, is_quote""")
+        cur = conn.execute("SELECT created_at, author_did FROM posts")
+        while True:
+            rows = cur.fetchmany(10_000)
+            if not rows:
+                break
+            update_author_sketches(conn.cursor(),
+                                   [{"created_at": c, "author_did": a} for c, a in rows])
+    conn.commit()
+
+def ensure_graph(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='edges'"
+    ).fetchone()
+    # recreated each time so DBs keep up with the trigger bodies
+    for name in ("posts_graph_ai", "posts_graph_ad", "posts_graph_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.executescript(GRAPH_DDL)
+    if not exists:
+        # DB predates the graph: link the rows that are already there
+        conn.executescript(GRAPH_BACKFILL)
+    conn.commit()
+
+def load_checkpoint(state_dir, path):
+    os.makedirs(state_dir, exist_ok=True)
+    ck_path = os.path.join(state_dir, "import_checkpoints.json")
+    try:
+        with open(ck_path, "r") as f:
+            data = json.load(f)
+    except Exception:
+        data = {}
+    return data.get(path, 0), ck_path, data
+
+def save_checkpoint(ck_path, data):
+    tmp = ck_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, ck_path)
+
+def iter_files_for_day(indir, day):
+    # day: YYYY-MM-DD
+    for h in range(24):
+        hh = f"{h:02d}"
+        base = f"{day}{hh}.ndjson"
+        for suffix in ("", ".part"):
+            path = os.path.join(indir, base + suffix)
+            if os.path.exists(path):
+                yield path
+
+def parse_line(line, indexed_at_us):
+    ev = json.loads(line)
+    # Expect flattened post records produced by your stream writer
+    # Required fields check (light)
+    if ev.get("kind") != "post" or "uri" not in ev:
+        return None
+    required = ["uri", "did", "rkey", "created_at", "time_us"]
+    if any(ev.get(k) in (None, "", 0) for k in required):
+        print(f"Error with line: {line}")  # append to dead-letter.ndjson?
+        return None
+    langs = ev.get("langs") or []
+    if isinstance(langs, str):
+        langs = [langs]
+    rec = {
+        "uri": ev["uri"],
+        "author_did": ev.get("did") or ev.get("repo"),
+        "rkey": ev.get("rkey"),
+        "cid": ev.get("cid"),
+        "created_at": ev.get("created_at") or "",
+        "time_us": int(ev.get("time_us") or 0),
+        "indexed_at": indexed_at_us,
+        "text": ev.get("text"),
+        "reply_parent": ev.get("reply_parent"),
+        "reply_root": ev.get("reply_root"),
+        "quote_uri": ev.get("quote_uri"),
+        "langs_json": json.dumps(langs, separators=(",", ":")),
+        "lang_en": 1 if "en" in langs else 0,
+        "emb_model": None,
+        "emb_dims": None,
+        "emb_vec": None,
+        "has_embedding": 0,
+    }
+    return rec
+
+def import_file(conn, path, start_byte, batch, ck_data, ck_path):
+    print(f"Importing {path}")
+    size = os.path.getsize(path)
+    if size <= start_byte:
+        return start_byte
+    cur = conn.cursor()
+    inserted = 0
+    with open(path, "r") as f:
+        f.seek(start_byte)
+        buf = []
+        indexed_at_us = int(time.time() * 1_000_000)
+        while True:
+            pos = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            rec = parse_line(line, indexed_at_us)
+            if not rec:
+                continue
+            buf.append(rec)
+            if len(buf) >= batch:
+                with M_BATCH.time():
+                    cur.executemany(UPSERT, buf)
+                    update_author_sketches(cur, buf)
+                    conn.commit()
+                inserted += len(buf)
+                M_ROWS.inc(len(buf))
+                buf.clear()
+                # checkpoint bytes so we can resume safely
+                M_BACKLOG.dec(f.tell() - ck_data.get(path, start_byte))
+                ck_data[path] = f.tell()
+                save_checkpoint(ck_path, ck_data)
+        if buf:
+            with M_BATCH.time():
+                cur.executemany(UPSERT, buf)
+                update_author_sketches(cur, buf)
+                conn.commit()
+            inserted += len(buf)
+            M_ROWS.inc(len(buf))
+            M_BACKLOG.dec(f.tell() - ck_data.get(path, start_byte))
+            ck_data[path] = f.tell()
+            save_checkpoint(ck_path, ck_data)
+    # Keep WAL trimmed
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    conn.commit()
+    print(f"[import] {os.path.basename(path)} +{inserted} rows")
+    return ck_data[path]
+
+def day_to_dbpath(outdir, day):
+    return os.path.join(outdir, f"posts_{day}.db")
+
+DAY_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}\.ndjson(?:\.part)?$')
+
+def files_grouped_by_day(indir):
+    by_day = {}
+    for name in os.listdir(indir):
+        if not DAY_RE.match(name):
+            continue
+        day = name[:10]  # YYYY-MM-DD from filename
+        by_day.setdefault(day, []).append(os.path.join(indir, name))
+    # sort hours within each day
+    for day in by_day:
+        by_day[day].sort()
+    return dict(sorted(by_day.items()))  # oldest day first
+
+def backlog_bytes(groups, state_dir):
+    _, _, ck_data = load_checkpoint(state_dir, None)
+    total = 0
+    for paths in groups.values():
+        for path in paths:
+            try:
+                total += max(0, os.path.getsize(path) - ck_data.get(path, 0))
+            except OSError:
+                pass
+    return total
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Import NDJSON into per-day SQLite DBs")
+    ap.add_argument("--indir", required=True)
+    ap.add_argument("--outdir", required=True)
+    ap.add_argument("--state", default="state")
+    ap.add_argument("--batch", type=int, default=2000)
+    ap.add_argument("--fts", action="store_true", help="Maintain the posts_fts full-text index")
+    add_metrics_args(ap, serve=False)
+    args = ap.parse_args(argv)
+
+    os.makedirs(args.outdir, exist_ok=True)
+    state_dir = args.state if os.path.isabs(args.state) else os.path.join(args.outdir, args.state)
+
+    groups = files_grouped_by_day(args.indir)
+    M_BACKLOG.set(backlog_bytes(groups, state_dir))
+    cold = load_cold_catalog(args.outdir)
+    for day, paths in groups.items():
+        if day in cold:
+            # retired to Parquet by retire_days.py; don't recreate the DB
+            continue
+        db_path = os.path.join(args.outdir, f"posts_{day}.db")
+        conn = ensure_db(db_path)
+        try:
+            ensure_rollups(conn)
+            ensure_graph(conn)
+            if args.fts:
+                ensure_fts(conn)
+            for path in paths:
+                start, ck_path, ck_data = load_checkpoint(state_dir, path)
+                import_file(conn, path, start, args.batch, ck_data, ck_path)
+                METRICS.maybe_write_textfile(args.metrics_file, args.metrics_interval)
+        finally:
+            conn.close()
+    if args.metrics_file:
+        METRICS.write_textfile(args.metrics_file)
+
+def old_main():
+    ap = argparse.ArgumentParser(description="Import hourly NDJSON into a per-day SQLite DB")
+    ap.add_argument("--indir", required=True, help="Input directory with *.ndjson / *.ndjson.part")
+    ap.add_argument("--outdir", required=True, help="Output directory for day DBs")
+    ap.add_argument("--state", default="state", help="Directory to store checkpoints.json")
+    ap.add_argument("--day", required=True, help="Day to import, YYYY-MM-DD (UTC)")
+    ap.add_argument("--batch", type=int, default=2000, help="Rows per transaction")
+    args = ap.parse_args()
+
+    os.makedirs(args.outdir, exist_ok=True)
+    state_dir = args.state if os.path.isabs(args.state) else os.path.join(args.outdir, args.state)
+
+    db_path = day_to_dbpath(args.outdir, args.day)
+    conn = ensure_db(db_path)
+
+    try:
+        for path in iter_files_for_day(args.indir, args.day):
+            start, ck_path, ck_data = load_checkpoint(state_dir, path)
+            newpos = import_file(conn, path, start, args.batch, ck_data, ck_path)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
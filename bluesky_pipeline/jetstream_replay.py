@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Jetstream websocket, for offline load tests.
+
+Serves either recorded Jetstream messages (--replay FILE, one raw JSON
+message per line) or synthetic ones at a configurable rate.  Synthetic
+traffic mixes posts, replies and quotes with non-post noise (likes, follows,
+deletes, identity/account events) and jitters ``time_us`` so events arrive
+slightly out of order, like the real feed.
+
+    python scripts/jetstream_replay.py --port 6008 --rate 2000
+    python scripts/stream_to_file.py --url ws://127.0.0.1:6008/subscribe ...
+
+``?cursor=`` is honoured: synthetic time starts at the cursor and runs ahead
+of wall clock until it catches up, which exercises restart/catch-up paths.
+"""
+import argparse
+import asyncio
+import json
+import random
+import string
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+WORDS = ("the bluesky feed post today news art photo vote game music code "
+         "python rust cats dogs coffee rain sun weekend city team love new").split()
+LANGS = (["en"], ["en"], ["en"], ["ja"], ["pt"], ["de"], ["es"], [], ["en", "es"])
+NOISE_COLLECTIONS = ("app.bsky.feed.like", "app.bsky.feed.repost", "app.bsky.graph.follow")
+
+# ---- event sources ---------------------------------------------------------
+
+def _tid(rng):
+    return "".join(rng.choice(string.ascii_lowercase + "234567") for _ in range(13))
+
+
+def _iso(time_us):
+    dt = datetime.fromtimestamp(time_us / 1_000_000, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+class SyntheticFirehose:
+    """
+    Deterministic (seeded) generator of Jetstream-shaped messages.
+
+    Synthetic time starts at ``start_us`` (default: now) and advances by
+    1/``virtual_rate`` seconds per event until it reaches wall clock, after
+    which events are stamped "now" minus jitter.
+    """
+
+    def __init__(self, seed=0, authors=5000, noise=0.6, reply_frac=0.3, quote_frac=0.1,
+                 jitter_ms=250, start_us=None, virtual_rate=500.0):
+        self.rng = random.Random(seed)
+        self.authors = [f"did:plc:{_tid(self.rng)}{i:06d}" for i in range(authors)]
+        self.noise = noise
+        self.reply_frac = reply_frac
+        self.quote_frac = quote_frac
+        self.jitter_us = int(jitter_ms * 1000)
+        self.clock_us = start_us
+        self.step_us = int(1_000_000 / virtual_rate)
+        self.recent = []  # (uri, thread root uri) of recent posts to reply to / quote
+
+    def _now_us(self):
+        wall = int(time.time() * 1_000_000)
+        if self.clock_us is None or self.clock_us >= wall:
+            self.clock_us = None
+            base = wall
+        else:
+            self.clock_us += self.step_us
+            base = self.clock_us
+        return base - self.rng.randint(0, self.jitter_us)
+
+    def _post_record(self, time_us):
+        rng = self.rng
+        record = {
+            "$type": "app.bsky.feed.post",
+            "createdAt": _iso(time_us),
+            "langs": rng.choice(LANGS),
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 40))),
+        }
+        if self.recent and rng.random() < self.reply_frac:
+            # replies to replies keep the thread's root, so threads get deep
+            parent, root = rng.choice(self.recent)
+            record["reply"] = {"parent": {"uri": parent, "cid": "bafy" + _tid(rng)},
+                               "root": {"uri": root, "cid": "bafy" + _tid(rng)}}
+        if self.recent and rng.random() < self.quote_frac:
+            record["embed"] = {"$type": "app.bsky.embed.record",
+                               "record": {"uri": rng.choice(self.recent)[0], "cid": "bafy" + _tid(rng)}}
+        return record
+
+    def __iter__(self):
+        rng = self.rng
+        while True:
+            time_us = self._now_us()
+            did = rng.choice(self.authors)
+            rkey = _tid(rng)
+            roll = rng.random()
+            if roll < self.noise * 0.9:
+                ev = {"did": did, "time_us": time_us, "kind": "commit",
+                      "commit": {"rev": _tid(rng), "operation": "create",
+                                 "collection": rng.choice(NOISE_COLLECTIONS), "rkey": rkey,
+                                 "record": {"createdAt": _iso(time_us)}, "cid": "bafy" + rkey}}
+            elif roll < self.noise * 0.95:
+                ev = {"did": did, "time_us": time_us, "kind": "commit",
+                      "commit": {"rev": _tid(rng), "operation": "delete",
+                                 "collection": "app.bsky.feed.post", "rkey": rkey}}
+            elif roll < self.noise:
+                kind = rng.choice(("identity", "account"))
+                ev = {"did": did, "time_us": time_us, "kind": kind,
+                      kind: {"did": did, "seq": rng.randint(1, 1 << 40), "time": _iso(time_us)}}
+            else:
+                record = self._post_record(time_us)
+                ev = {"did": did, "time_us": time_us, "kind": "commit",
+                      "commit": {"rev": _tid(rng), "operation": "create",
+                                 "collection": "app.bsky.feed.post", "rkey": rkey,
+                                 "record": record, "cid": "bafy" + rkey}}
+                uri = f"at://{did}/app.bsky.feed.post/{rkey}"
+                self.recent.append((uri, record["reply"]["root"]["uri"] if "reply" in record else uri))
+                if len(self.recent) > 1000:
+                    del self.recent[:500]
+            yield json.dumps(ev, separators=(",", ":"))
+
+
+def recorded_messages(path, cursor=None, loop=False):
+    """Raw Jetstream messages from an NDJSON capture, skipping those before the cursor."""
+    while True:
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if cursor is not None and json.loads(line).get("time_us", 0) < cursor:
+                    continue
+                yield line
+        if not loop:
+            return
+
+# ---- server ----------------------------------------------------------------
+
+def _request_path(ws):
+    request = getattr(ws, "request", None)  # websockets >= 13
+    return request.path if request is not None else getattr(ws, "path", "/")
+
+
+async def stream_messages(ws, messages, rate, count):
+    """Send messages at ``rate``/sec (0 = as fast as the client reads)."""
+    sent = 0
+    start = time.perf_counter()
+    for msg in messages:
+        await ws.send(msg)
+        sent += 1
+        if count and sent >= count:
+            break
+        if rate:
+            ahead = sent / rate - (time.perf_counter() - start)
+            if ahead > 0.002:
+                await asyncio.sleep(ahead)
+    return sent, time.perf_counter() - start
+
+
+async def serve(args):
+    done = asyncio.Event()
+
+    async def handler(ws, *_):
+        query = parse_qs(urlparse(_request_path(ws)).query)
+        cursor = int(query["cursor"][0]) if "cursor" in query else None
+        if args.replay:
+            messages = recorded_messages(args.replay, cursor, args.loop)
+        else:
+            start_us = cursor
+            if start_us is None and args.lag_seconds:
+                start_us = int((time.time() - args.lag_seconds) * 1_000_000)
+            messages = iter(SyntheticFirehose(
+                seed=args.seed, authors=args.authors, noise=args.noise,
+                reply_frac=args.reply_frac, quote_frac=args.quote_frac,
+                jitter_ms=args.jitter_ms, start_us=start_us, virtual_rate=args.virtual_rate))
+        print(f"[replay] client connected cursor={cursor}", file=sys.stderr, flush=True)
+        try:
+            sent, elapsed = await stream_messages(ws, messages, args.rate, args.count)
+        except websockets.ConnectionClosed:
+            print("[replay] client went away", file=sys.stderr, flush=True)
+            return
+        # one JSON summary line on stdout for bench_pipeline.py
+        print(json.dumps({"sent": sent, "seconds": round(elapsed, 4),
+                          "rate": round(sent / elapsed, 1) if elapsed else None}), flush=True)
+        await ws.close()
+        if args.once:
+            done.set()
+
+    async with websockets.serve(handler, args.host, args.port, max_size=None):
+        print(f"[replay] listening on ws://{args.host}:{args.port}/subscribe", file=sys.stderr, flush=True)
+        await done.wait()
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Replay recorded or synthetic Jetstream events over a local websocket")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=6008)
+    p.add_argument("--rate", type=float, default=1000.0, help="Messages/sec; 0 = unthrottled (default 1000)")
+    p.add_argument("--count", type=int, default=0, help="Close the connection after N messages (0 = never)")
+    p.add_argument("--once", action="store_true", help="Exit after the first client is served")
+    p.add_argument("--replay", help="NDJSON capture of raw Jetstream messages")
+    p.add_argument("--loop", action="store_true", help="Loop the --replay capture")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--authors", type=int, default=5000, help="Distinct synthetic authors")
+    p.add_argument("--noise", type=float, default=0.6, help="Fraction of non-post messages (default 0.6)")
+    p.add_argument("--reply-frac", type=float, default=0.3, help="Fraction of posts that are replies")
+    p.add_argument("--quote-frac", type=float, default=0.1, help="Fraction of posts that quote another")
+    p.add_argument("--jitter-ms", type=float, default=250, help="Max time_us jitter, for out-of-order arrival")
+    p.add_argument("--lag-seconds", type=float, default=0,
+                   help="Without a client cursor, start synthetic time this far in the past")
+    p.add_argument("--virtual-rate", type=float, default=500.0,
+                   help="Synthetic events per second of time_us while behind wall clock")
+    args = p.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Lightweight pipeline metrics: counters, gauges and histograms rendered in the
+Prometheus text exposition format.
+
+Export either by writing a textfile (for node_exporter's textfile collector)
+or by serving ``/metrics`` from a background thread:
+
+    registry = Registry()
+    events = registry.counter("bsky_stream_events_total", "Posts written")
+    registry.rate("bsky_stream_events_per_second", "Posts written per second", events)
+    ...
+    events.inc()
+    registry.write_textfile("/mnt/ingestion/metrics/stream.prom")
+"""
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def samples(self):
+        yield self.name, self.value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, n=1):
+        self.value += n
+
+    def dec(self, n=1):
+        self.value -= n
+
+    def samples(self):
+        yield self.name, self.value
+
+
+class RateGauge(Gauge):
+    """
+    Per-second rate of a counter over the trailing ``window`` seconds.
+    Renders record a sample at most every ``min_interval`` seconds but never
+    consume one, so the textfile writer and /metrics scrapes read the same
+    window however their ticks interleave.
+    """
+
+    def __init__(self, name, help_text, counter, window=60.0, min_interval=1.0, clock=time.monotonic):
+        super().__init__(name, help_text)
+        self.counter = counter
+        self.window = window
+        self.min_interval = min_interval
+        self._clock = clock
+        self._samples = deque([(clock(), counter.value)])
+
+    def update(self):
+        now, value = self._clock(), self.counter.value
+        if now - self._samples[-1][0] >= self.min_interval:
+            self._samples.append((now, value))
+        # keep the newest sample that is at least ``window`` old as the base
+        while len(self._samples) > 1 and now - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+        base_t, base_v = self._samples[0]
+        if now > base_t:
+            self.value = (value - base_v) / (now - base_t)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def time(self):
+        return _Timer(self)
+
+    def samples(self):
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            yield f'{self.name}_bucket{{le="{_fmt(bound)}"}}', cumulative
+        yield f'{self.name}_bucket{{le="+Inf"}}', self.count
+        yield f"{self.name}_sum", self.sum
+        yield f"{self.name}_count", self.count
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text):
+        return self._add(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self._add(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, buckets))
+
+    def rate(self, name, help_text, counter, window=60.0):
+        return self._add(RateGauge(name, help_text, counter, window))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for m in self._metrics:
+                if isinstance(m, RateGauge):
+                    m.update()
+                lines.append(f"# HELP {m.name} {m.help}")
+                lines.append(f"# TYPE {m.name} {m.kind}")
+                for name, value in m.samples():
+                    lines.append(f"{name} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Atomically replace ``path`` so a scraper never sees a partial file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+        self._last_write = time.monotonic()
+
+    def maybe_write_textfile(self, path, interval):
+        """write_textfile() at most once per ``interval`` seconds; no-op without a path."""
+        if path and time.monotonic() - self._last_write >= interval:
+            self.write_textfile(path)
+
+    def serve(self, port, addr="127.0.0.1"):
+        """Serve /metrics on a daemon thread; returns the server."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def add_metrics_args(parser, serve=True):
+    g = parser.add_argument_group("metrics")
+    g.add_argument("--metrics-file", help="Write Prometheus text metrics to this file")
+    g.add_argument("--metrics-interval", type=float, default=10.0,
+                   help="Seconds between metrics file writes (default 10)")
+    if serve:
+        g.add_argument("--metrics-port", type=int, help="Serve /metrics on 127.0.0.1:PORT")
+    return g
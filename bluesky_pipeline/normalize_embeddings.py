@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+One-off migration: L2-normalise embeddings stored before store_embeddings.py
+wrote unit-length vectors.
+
+Adds the ``emb_norm`` column where it is missing, then rewrites every vector
+with ``emb_norm = 0`` (``emb_vec`` in the per-day DBs, ``embedding_blob`` in
+the legacy DB) in rowid batches, one transaction per batch, so it can be
+stopped and re-run.  Retired Parquet partitions are left as they are; their
+readers (cluster_day.py) normalise on load.
+"""
+import argparse
+import logging
+import sqlite3
+import sys
+
+import numpy as np
+
+from .posts_db import day_db_paths, ensure_emb_norm, is_day_schema
+from .vectors import EMBEDDING_DIM, normalize_rows
+
+logger = logging.getLogger(__name__)
+
+BATCH_ROWS = 10_000
+
+
+def normalize_db(db_path, batch_rows=BATCH_ROWS):
+    """Normalise the DB's unflagged vectors in place; returns the number rewritten."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA busy_timeout=5000;")
+    try:
+        ensure_emb_norm(conn)
+        column = "emb_vec" if is_day_schema(conn) else "embedding_blob"
+        select = f"""
+            SELECT rowid, {column} FROM posts
+            WHERE rowid > ? AND emb_norm = 0 AND {column} IS NOT NULL
+            ORDER BY rowid LIMIT ?
+        """
+        update = f"UPDATE posts SET {column} = ?, emb_norm = 1 WHERE rowid = ?"
+        last, done = 0, 0
+        while True:
+            rows = conn.execute(select, (last, batch_rows)).fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            rows = [r for r in rows if len(r[1]) == EMBEDDING_DIM * 4]
+            if rows:
+                vecs = normalize_rows(np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float32)
+                                      .reshape(-1, EMBEDDING_DIM))
+                conn.executemany(update, [(v.tobytes(), r[0]) for v, r in zip(vecs, rows)])
+                conn.commit()
+                done += len(rows)
+        return done
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ap = argparse.ArgumentParser(description="L2-normalise stored embeddings in place (sets emb_norm = 1)")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--db-path", nargs="+", help="SQLite DB(s); legacy or per-day posts_{day}.db")
+    src.add_argument("--dbdir", help="Directory holding posts_{day}.db files")
+    ap.add_argument("--batch", type=int, default=BATCH_ROWS, help="Rows per transaction")
+    args = ap.parse_args(argv)
+
+    for db_path in args.db_path or day_db_paths(args.dbdir):
+        done = normalize_db(db_path, args.batch)
+        logger.info(f"{db_path}: normalised {done} vectors")
+
+
+if __name__ == "__main__":
+    main()
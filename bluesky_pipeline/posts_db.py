@@ -0,0 +1,235 @@
+"""
+Shared helpers for the posts SQLite databases.
+
+Two schemas are in use:
+  * the legacy monolithic ``bluesky_posts.db`` written by ``bluesky_ingest.py``
+    (``embedding_blob``, ``created_date``, ``langs``)
+  * the per-day ``posts_{day}.db`` files written by ``file_to_db.py``
+    (``emb_vec``, ``has_embedding``, ``lang_en``, ``is_reply``, ...)
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+DB_DAY_RE = re.compile(r'posts_(\d{4}-\d{2}-\d{2})\.db$')
+PARTITION_DAY_RE = re.compile(r'posts_(\d{4}-\d{2}-\d{2})\.(?:db|parquet)$')
+
+# Days retired to Parquet by retire_days.py, kept next to the day DBs
+COLD_CATALOG = "cold_catalog.json"
+
+# edges.kind in the day DBs' reply/quote graph (see file_to_db.py)
+EDGE_REPLY = 1  # src replies to dst (reply_parent)
+EDGE_ROOT = 2   # src is in the thread rooted at dst (reply_root)
+EDGE_QUOTE = 3  # src quotes dst (quote_uri)
+# kind of a cold partition's own rows in its keys sidecar (see retire_days.py)
+KEY_POST = 0
+
+# ---- schema ---------------------------------------------------------------
+
+def table_columns(conn, table="posts"):
+    # table_xinfo, unlike table_info, also lists generated columns
+    return {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+
+
+def is_day_schema(conn):
+    return "emb_vec" in table_columns(conn)
+
+
+def ensure_emb_norm(conn):
+    """
+    Add the ``emb_norm`` flag (1 = stored vector is L2-normalised) to a DB of
+    either schema that predates it.  Existing vectors start at 0; see
+    normalize_embeddings.py to rewrite them.
+    """
+    if "emb_norm" not in table_columns(conn):
+        conn.execute("ALTER TABLE posts ADD COLUMN emb_norm INTEGER NOT NULL DEFAULT 0")
+        conn.commit()
+
+
+def connect_readonly(db_path):
+    # plain connect + query_only: mode=ro can't open a WAL DB whose -shm is missing
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA busy_timeout=5000;")
+    conn.execute("PRAGMA query_only=ON;")
+    return conn
+
+# ---- day partitions -------------------------------------------------------
+
+def db_day(db_path):
+    """Return the YYYY-MM-DD day of a ``posts_{day}.db``/``.parquet`` path, or None."""
+    m = PARTITION_DAY_RE.search(os.path.basename(db_path))
+    return m.group(1) if m else None
+
+
+def day_db_paths(dbdir):
+    """Every ``posts_{day}.db`` in ``dbdir``, oldest day first."""
+    paths = [os.path.join(dbdir, name) for name in os.listdir(dbdir) if DB_DAY_RE.match(name)]
+    return sorted(paths, key=db_day)
+
+
+def keys_sidecar(parquet_path):
+    """``posts_{day}.keys.parquet``: the (key, kind, row) lookup table of a cold partition."""
+    return parquet_path[:-len(".parquet")] + ".keys.parquet"
+
+
+def load_cold_catalog(dbdir):
+    """{day: {"path", "rows", "retired_at"}} for days compacted to Parquet."""
+    try:
+        with open(os.path.join(dbdir, COLD_CATALOG), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_cold_catalog(dbdir, catalog):
+    path = os.path.join(dbdir, COLD_CATALOG)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(dict(sorted(catalog.items())), f, indent=2)
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def partition_paths(dbdir):
+    """
+    One source per day, oldest first: the day's registered cold Parquet file
+    if it has been retired, otherwise its ``posts_{day}.db``.
+    """
+    by_day = {db_day(p): p for p in day_db_paths(dbdir)}
+    for day, entry in load_cold_catalog(dbdir).items():
+        by_day[day] = entry["path"]
+    return [by_day[day] for day in sorted(by_day)]
+
+
+def resolve_partitions(db_paths):
+    """
+    Map recorded DB paths (e.g. an index's ``sources``) to what holds each
+    day now: the DB itself, or its cold Parquet file once retire_days.py
+    has removed it.  Returns (paths, missing).
+    """
+    paths, missing, catalogs = [], [], {}
+    for path in db_paths:
+        if os.path.exists(path):
+            paths.append(path)
+            continue
+        day, dbdir = db_day(path), os.path.dirname(path)
+        if day and dbdir not in catalogs:
+            catalogs[dbdir] = load_cold_catalog(dbdir)
+        entry = catalogs.get(dbdir, {}).get(day) if day else None
+        if entry and os.path.exists(entry["path"]):
+            paths.append(entry["path"])
+        else:
+            missing.append(path)
+    return paths, missing
+
+
+def prune_db_paths(db_paths, filters):
+    """Drop day DBs that cannot hold posts inside the filter's time range."""
+    since_us, until_us = filters.get("since_us"), filters.get("until_us")
+    if since_us is None and until_us is None:
+        return list(db_paths)
+    kept = []
+    for path in db_paths:
+        day = db_day(path)
+        if day is None:
+            kept.append(path)  # legacy / unknown layout: can't prune
+            continue
+        day_start = int(datetime.fromisoformat(day).replace(tzinfo=timezone.utc).timestamp()) * 1_000_000
+        day_end = day_start + 86_400 * 1_000_000
+        if since_us is not None and day_end <= since_us:
+            continue
+        if until_us is not None and day_start >= until_us:
+            continue
+        kept.append(path)
+    return kept
+
+# ---- filters --------------------------------------------------------------
+
+def parse_utc(value):
+    """YYYY-MM-DD[THH[:MM[:SS]]] (UTC) -> microseconds since epoch."""
+    value = value.rstrip("Z")
+    for fmt in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%dT%H", "%Y-%m-%d"):
+        try:
+            dt = datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        return int(dt.timestamp()) * 1_000_000
+    raise ValueError(f"Unrecognised UTC time: {value!r}")
+
+
+def add_filter_args(parser):
+    g = parser.add_argument_group("post filters (per-day DBs)")
+    g.add_argument("--since-hours", type=float, help="Only posts from the last N hours (by time_us)")
+    g.add_argument("--since", help="Only posts at/after this UTC time (YYYY-MM-DD[THH[:MM]])")
+    g.add_argument("--until", help="Only posts before this UTC time (YYYY-MM-DD[THH[:MM]])")
+    g.add_argument("--lang-en", action="store_true", help="Only posts tagged English")
+    replies = g.add_mutually_exclusive_group()
+    replies.add_argument("--no-replies", action="store_true", help="Exclude replies")
+    replies.add_argument("--replies-only", action="store_true", help="Only replies")
+    quotes = g.add_mutually_exclusive_group()
+    quotes.add_argument("--no-quotes", action="store_true", help="Exclude quote posts")
+    quotes.add_argument("--quotes-only", action="store_true", help="Only quote posts")
+    g.add_argument("--author", action="append", help="Author DID (repeatable)")
+    return g
+
+
+def filters_from_args(args, now_us=None):
+    """Turn parsed filter args into a plain dict (empty when unfiltered)."""
+    filters = {}
+    if args.since_hours is not None:
+        now_us = now_us if now_us is not None else int(time.time() * 1_000_000)
+        filters["since_us"] = now_us - int(args.since_hours * 3600 * 1_000_000)
+    elif args.since:
+        filters["since_us"] = parse_utc(args.since)
+    if args.until:
+        filters["until_us"] = parse_utc(args.until)
+    if args.lang_en:
+        filters["lang_en"] = 1
+    if args.no_replies or args.replies_only:
+        filters["is_reply"] = 1 if args.replies_only else 0
+    if args.no_quotes or args.quotes_only:
+        filters["is_quote"] = 1 if args.quotes_only else 0
+    if args.author:
+        filters["authors"] = tuple(sorted(set(args.author)))
+    return filters
+
+
+def where_clause(filters, alias=""):
+    """Build a parameterised WHERE fragment over the per-day posts columns."""
+    col = (alias + ".") if alias else ""
+    clauses, params = [], []
+    if filters.get("since_us") is not None:
+        clauses.append(f"{col}time_us >= ?")
+        params.append(filters["since_us"])
+    if filters.get("until_us") is not None:
+        clauses.append(f"{col}time_us < ?")
+        params.append(filters["until_us"])
+    for key in ("lang_en", "is_reply", "is_quote"):
+        if filters.get(key) is not None:
+            clauses.append(f"{col}{key} = ?")
+            params.append(filters[key])
+    if filters.get("authors"):
+        marks = ",".join("?" * len(filters["authors"]))
+        clauses.append(f"{col}author_did IN ({marks})")
+        params.extend(filters["authors"])
+    return (" AND ".join(clauses) or "1"), params
+
+
+def fts_match_expr(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression.  Each whitespace token
+    becomes a quoted phrase of its word parts, so '#python' matches 'python'
+    and '@alice.bsky.social' matches the phrase 'alice bsky social'; tokens
+    are ANDed.
+    """
+    phrases = []
+    for token in query.split():
+        words = re.findall(r"\w+", token)
+        if words:
+            phrases.append('"' + " ".join(words) + '"')
+    return " ".join(phrases)
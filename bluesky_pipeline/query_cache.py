@@ -0,0 +1,73 @@
+"""
+Small in-process caches for the search path.
+
+``LRUCache`` holds query embeddings (bounded by entry count); ``TTLCache``
+holds finished result lists for a short time.  Both count hits and misses so
+callers can report them.
+"""
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def normalize_query(query):
+    # MiniLM's tokenizer is uncased and FTS5 matching is case-insensitive,
+    # so case and whitespace differences map to the same cache entry.
+    return " ".join(query.casefold().split())
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries also expire ``ttl`` seconds after insertion."""
+
+    def __init__(self, maxsize=256, ttl=60.0, clock=time.monotonic):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self._clock = clock
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING and entry[0] <= self._clock():
+            del self._data[key]
+            entry = _MISSING
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        super().put(key, (self._clock() + self.ttl, value))
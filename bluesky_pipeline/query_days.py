@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Query across the per-day ``posts_{day}.db`` files written by file_to_db.py.
+
+Only the day DBs overlapping the requested time range are opened; each is
+queried on its own thread and results are streamed out in day order (which
+is also time_us order, since day DBs are partitioned by time_us).  Grouped
+counts are computed per day and summed.  Days retired to Parquet by
+retire_days.py are found through the cold catalog and scanned with DuckDB.
+
+    # English non-replies from the last 6 hours, as NDJSON
+    python scripts/query_days.py --dbdir /mnt/ingestion/database \\
+        --since-hours 6 --lang-en --no-replies --columns uri,created_at,text
+
+    # posts per hour and language over three days
+    python scripts/query_days.py --dbdir /mnt/ingestion/database \\
+        --since 2025-08-01 --until 2025-08-04 --count-by created_hour,lang_en
+
+    # the same from the hourly rollups (O(hours), no posts scan), and
+    # estimated distinct authors per day
+    python scripts/query_days.py --dbdir /mnt/ingestion/database \\
+        --since 2025-08-01 --until 2025-08-04 --rollup counts
+    python scripts/query_days.py --dbdir /mnt/ingestion/database \\
+        --since-hours 24 --rollup authors --by day
+"""
+import argparse
+import csv
+import datetime
+import json
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from .posts_db import (add_filter_args, connect_readonly, db_day, filters_from_args,
+                      partition_paths, prune_db_paths, where_clause)
+from .sketches import HyperLogLog
+
+DEFAULT_COLUMNS = "uri,author_did,created_at,time_us,text"
+FETCH_ROWS = 5000
+PREFETCH_CHUNKS = 8
+
+# ---- query -----------------------------------------------------------------
+
+def build_sql(select, filters, where_extra=None, group_by=None, order_by=None):
+    """SQL over a ``{source}`` placeholder, filled in per partition by run_sql()."""
+    where, params = where_clause(filters)
+    if where_extra:
+        where = f"({where}) AND ({where_extra})"
+    sql = f"SELECT {select} FROM {{source}} WHERE {where}"
+    if group_by:
+        sql += f" GROUP BY {group_by}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    return sql, params
+
+
+def run_sql(path, sql, params):
+    """Execute on one partition; returns (connection, cursor)."""
+    if path.endswith(".parquet"):
+        import duckdb  # only needed once days have been retired
+        conn = duckdb.connect()
+        source = "read_parquet('" + path.replace("'", "''") + "')"
+        return conn, conn.execute(sql.replace("{source}", source), params)
+    conn = connect_readonly(path)
+    return conn, conn.execute(sql.replace("{source}", "posts"), params)
+
+
+def _put(out, item, stop):
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _produce(db_path, sql, params, out, stop):
+    """Worker: stream one day's rows into ``out`` in chunks, then a sentinel."""
+    if stop.is_set():
+        return
+    try:
+        conn, cur = run_sql(db_path, sql, params)
+        try:
+            while True:
+                rows = cur.fetchmany(FETCH_ROWS)
+                if not rows:
+                    break
+                if not _put(out, rows, stop):
+                    return
+        finally:
+            conn.close()
+    except Exception as e:
+        _put(out, e, stop)
+    _put(out, None, stop)
+
+
+def iter_rows(db_paths, sql, params, workers=4):
+    """
+    Run ``sql`` on every DB in parallel and yield rows in ``db_paths`` order.
+    Later days prefetch a bounded number of chunks while earlier ones drain.
+    """
+    queues = [queue.Queue(maxsize=PREFETCH_CHUNKS) for _ in db_paths]
+    stop = threading.Event()  # set when the consumer stops early
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for db_path, q in zip(db_paths, queues):
+            pool.submit(_produce, db_path, sql, params, q, stop)
+        for db_path, q in zip(db_paths, queues):
+            while True:
+                chunk = q.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise RuntimeError(f"{db_path}: {chunk}") from chunk
+                yield from chunk
+    finally:
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _count_one(db_path, sql, params):
+    conn, cur = run_sql(db_path, sql, params)
+    try:
+        return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def count_by(db_paths, group_cols, filters, where_extra=None, workers=4):
+    """{group tuple: count} summed over every day DB."""
+    group_by = ", ".join(group_cols)
+    sql, params = build_sql(f"{group_by}, COUNT(*)", filters, where_extra, group_by=group_by)
+    totals = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rows in pool.map(lambda p: _count_one(p, sql, params), db_paths):
+            for *key, n in rows:
+                key = tuple(key)
+                totals[key] = totals.get(key, 0) + n
+    return totals
+
+
+# ---- rollups ---------------------------------------------------------------
+#
+# Day DBs carry hourly_counts / hourly_authors (maintained by file_to_db.py).
+# A created_hour can appear in more than one day DB (created_at is client
+# time, partitions follow time_us), so buckets are summed / sketch-merged
+# across days.  Cold Parquet days have no rollup tables and are aggregated
+# from their columns instead.
+
+ROLLUP_COLUMNS = ("lang_en", "is_reply", "is_quote")
+
+
+def _hour_key(time_us):
+    dt = datetime.datetime.fromtimestamp(time_us / 1_000_000, tz=datetime.timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H")
+
+
+def rollup_where(filters, with_flags=True):
+    """WHERE over created_hour (and the rollup flag columns) for the filters."""
+    if filters.get("authors"):
+        raise ValueError("--author can't be answered from rollups")
+    clauses, params = [], []
+    if filters.get("since_us") is not None:
+        clauses.append("created_hour >= ?")
+        params.append(_hour_key(filters["since_us"]))
+    if filters.get("until_us") is not None:
+        clauses.append("created_hour <= ?")  # until is exclusive; keep its partial hour
+        params.append(_hour_key(filters["until_us"] - 1))
+    if with_flags:
+        for col in ROLLUP_COLUMNS:
+            if filters.get(col) is not None:
+                clauses.append(f"{col} = ?")
+                params.append(int(filters[col]))
+    elif any(filters.get(col) is not None for col in ROLLUP_COLUMNS):
+        raise ValueError("author sketches are per hour only; drop the lang/reply/quote filters")
+    return " AND ".join(clauses) or "1", params
+
+
+def _rollup_one(path, filters, kind):
+    if kind == "counts":
+        where, params = rollup_where(filters)
+        cols = "created_hour, lang_en, is_reply, is_quote"
+        table_sql = f"SELECT {cols}, posts FROM hourly_counts WHERE {where}"
+        posts_sql = f"SELECT {cols}, COUNT(*) FROM {{source}} WHERE {where} GROUP BY {cols}"
+    else:
+        where, params = rollup_where(filters, with_flags=False)
+        table_sql = f"SELECT created_hour, hll FROM hourly_authors WHERE {where}"
+        posts_sql = f"SELECT created_hour, author_did FROM {{source}} WHERE {where}"
+
+    if path.endswith(".parquet"):
+        conn, cur = run_sql(path, posts_sql, params)
+    else:
+        conn = connect_readonly(path)
+        cur = conn.execute(table_sql, params)
+    try:
+        rows = cur.fetchall()
+    finally:
+        conn.close()
+    if kind == "counts" or not path.endswith(".parquet"):
+        return rows
+    sketches = {}
+    for hour, did in rows:
+        sketches.setdefault(hour, HyperLogLog()).add(did)
+    return [(hour, hll.to_bytes()) for hour, hll in sketches.items()]
+
+
+def rollup(db_paths, filters, kind="counts", by="hour", workers=4):
+    """
+    kind="counts":  {(bucket, lang_en, is_reply, is_quote): posts}
+    kind="authors": {(bucket,): estimated distinct authors}
+    where bucket is created_hour, or created_day with by="day".
+    """
+    width = 10 if by == "day" else 13
+    totals = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rows in pool.map(lambda p: _rollup_one(p, filters, kind), db_paths):
+            for hour, *rest in rows:
+                if kind == "counts":
+                    key = (hour[:width], *rest[:-1])
+                    totals[key] = totals.get(key, 0) + rest[-1]
+                else:
+                    hll = HyperLogLog.from_bytes(rest[0])
+                    key = (hour[:width],)
+                    totals[key] = totals[key].merge(hll) if key in totals else hll
+    if kind == "authors":
+        totals = {key: len(hll) for key, hll in totals.items()}
+    return {key: n for key, n in totals.items() if n}
+
+
+def select_db_paths(dbdir, filters, days=None):
+    """Partition pruning: day DBs / cold files that can match the time range / day list."""
+    paths = prune_db_paths(partition_paths(dbdir), filters)
+    if days:
+        paths = [p for p in paths if db_day(p) in days]
+    return paths
+
+# ---- output ----------------------------------------------------------------
+
+def write_rows(rows, columns, fmt, out=None):
+    out = out or sys.stdout  # looked up per call, so redirect_stdout applies
+    if fmt == "ndjson":
+        for row in rows:
+            out.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+    else:
+        writer = csv.writer(out, delimiter="\t" if fmt == "tsv" else ",")
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Query posts across per-day SQLite DBs")
+    ap.add_argument("--dbdir", required=True, help="Directory holding posts_{day}.db files")
+    ap.add_argument("--day", action="append", help="Restrict to these days, YYYY-MM-DD (repeatable)")
+    ap.add_argument("--columns", default=DEFAULT_COLUMNS, help=f"Columns to output (default {DEFAULT_COLUMNS})")
+    ap.add_argument("--where", help="Extra SQL predicate over posts columns")
+    ap.add_argument("--order-by", default="time_us", help="Per-day ORDER BY (default time_us; '' for none)")
+    ap.add_argument("--limit", type=int, help="Stop after N rows")
+    ap.add_argument("--count-by", help="Comma-separated columns to GROUP BY; outputs counts instead of rows")
+    ap.add_argument("--rollup", choices=("counts", "authors"),
+                    help="Read the hourly rollups: post counts per hour x lang_en x is_reply x is_quote, "
+                         "or estimated distinct authors")
+    ap.add_argument("--by", choices=("hour", "day"), default="hour", help="Rollup bucket (default hour)")
+    ap.add_argument("--format", choices=("ndjson", "csv", "tsv"), default="ndjson")
+    ap.add_argument("--workers", type=int, default=4, help="Day DBs queried in parallel (default 4)")
+    add_filter_args(ap)
+    args = ap.parse_args(argv)
+
+    filters = filters_from_args(args)
+    db_paths = select_db_paths(args.dbdir, filters, args.day)
+    print(f"[query] {len(db_paths)} day(s): {', '.join(db_day(p) for p in db_paths)}",
+          file=sys.stderr, flush=True)
+
+    if args.rollup:
+        try:
+            totals = rollup(db_paths, filters, args.rollup, args.by, args.workers)
+        except ValueError as e:
+            ap.error(str(e))
+        bucket = "created_day" if args.by == "day" else "created_hour"
+        columns = ([bucket, *ROLLUP_COLUMNS, "posts"] if args.rollup == "counts"
+                   else [bucket, "distinct_authors"])
+        write_rows([(*key, n) for key, n in sorted(totals.items())], columns, args.format)
+        return
+
+    if args.count_by:
+        group_cols = [c.strip() for c in args.count_by.split(",")]
+        totals = count_by(db_paths, group_cols, filters, args.where, args.workers)
+        rows = [(*key, n) for key, n in sorted(totals.items(), key=lambda kv: tuple(str(k) for k in kv[0]))]
+        write_rows(rows, group_cols + ["count"], args.format)
+        return
+
+    columns = [c.strip() for c in args.columns.split(",")]
+    sql, params = build_sql(", ".join(columns), filters, args.where, order_by=args.order_by or None)
+    rows = iter_rows(db_paths, sql, params, args.workers)
+    try:
+        write_rows(islice(rows, args.limit), columns, args.format)
+    except BrokenPipeError:  # e.g. piped into head
+        pass
+    finally:
+        rows.close()  # stops the prefetching workers
+
+
+if __name__ == "__main__":
+    main()
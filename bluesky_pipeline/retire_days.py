@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Tiered retention: compact closed per-day SQLite DBs into Parquet.
+
+For every ``posts_{day}.db`` older than --min-age-days whose files have not
+been touched for --quiet-minutes, the whole ``posts`` table (including the
+generated columns and embeddings) is written in time_us order to a
+zstd-compressed ``posts_{day}.parquet`` in --cold-dir, with sidecars beside
+it: ``.keys.parquet`` (uri and reply/quote lookups for threads.py) and the
+day's topic clusters (cluster_day.py) as ``.clusters.parquet`` /
+``.centroids.npy``.  The row count is verified against SQLite before the
+day is registered in the cold catalog (``cold_catalog.json`` next to the day
+DBs, read by query_days.py) and the SQLite file is deleted, or with
+--keep-sqlite slimmed down and VACUUMed.
+"""
+import argparse
+import datetime
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .embedding_snapshots import EMBEDDING_DIM, embedding_array
+from .posts_db import (EDGE_QUOTE, EDGE_REPLY, EDGE_ROOT, KEY_POST, connect_readonly,
+                      day_db_paths, db_day, keys_sidecar, load_cold_catalog, save_cold_catalog,
+                      table_columns)
+
+logger = logging.getLogger(__name__)
+
+ROW_GROUP_ROWS = 100_000
+KEY_ROW_GROUP_ROWS = 16_384
+
+COLUMNS = [
+    ("uri", pa.string()),
+    ("author_did", pa.string()),
+    ("rkey", pa.string()),
+    ("cid", pa.string()),
+    ("created_at", pa.string()),
+    ("time_us", pa.int64()),
+    ("indexed_first", pa.int64()),
+    ("indexed_last", pa.int64()),
+    ("text", pa.string()),
+    ("reply_parent", pa.string()),
+    ("reply_root", pa.string()),
+    ("quote_uri", pa.string()),
+    ("langs_json", pa.string()),
+    ("lang_en", pa.int8()),
+    ("has_embedding", pa.int8()),
+    ("is_reply", pa.int8()),
+    ("is_quote", pa.int8()),
+    ("created_day", pa.string()),
+    ("created_hour", pa.string()),
+    ("emb_model", pa.string()),
+    ("emb_dims", pa.int32()),
+    ("emb_norm", pa.int8()),
+]
+SCHEMA = pa.schema(COLUMNS + [("embedding", pa.list_(pa.float32(), EMBEDDING_DIM))])
+
+
+def select_sql(conn):
+    """The export query; columns added after a DB was created read as 0."""
+    present = table_columns(conn)
+    names = [name if name in present else f"0 AS {name}" for name, _ in COLUMNS]
+    return f"SELECT {', '.join(names)}, emb_vec FROM posts ORDER BY time_us"
+
+
+def record_batch(rows):
+    cols = list(zip(*rows))
+    arrays = [pa.array(cols[i], type=typ) for i, (_, typ) in enumerate(COLUMNS)]
+    arrays.append(embedding_array(cols[-1]))
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+def export_day(db_path, parquet_path, row_group_rows=ROW_GROUP_ROWS):
+    """Write the day to ``parquet_path`` (via a temp file); return the verified row count."""
+    tmp = parquet_path + ".tmp"
+    conn = connect_readonly(db_path)
+    try:
+        conn.execute("BEGIN")  # one read snapshot for the count and the scan
+        expected = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+        cur = conn.execute(select_sql(conn))
+        with pq.ParquetWriter(tmp, SCHEMA, compression="zstd") as writer:
+            while True:
+                rows = cur.fetchmany(row_group_rows)
+                if not rows:
+                    break
+                writer.write_batch(record_batch(rows), row_group_size=row_group_rows)
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    written = pq.ParquetFile(tmp).metadata.num_rows
+    if written != expected:
+        os.unlink(tmp)
+        raise RuntimeError(f"{db_path}: wrote {written} rows, expected {expected}")
+    os.replace(tmp, parquet_path)
+    return written
+
+
+def export_keys(parquet_path):
+    """
+    Write the partition's keys sidecar: (key, kind, row) sorted by key, with
+    one row per post (KEY_POST, its uri) and per reply/root/quote link
+    (EDGE_*, the linked uri), ``row`` being the post's row in the partition.
+    Row-group statistics on the sorted key let threads.py find a post or its
+    replies/quotes without scanning the day.
+    """
+    table = pq.read_table(parquet_path, columns=["uri", "reply_parent", "reply_root", "quote_uri"])
+    rows = pa.array(np.arange(table.num_rows, dtype=np.int64))
+    parts = []
+    for kind, column in ((KEY_POST, "uri"), (EDGE_REPLY, "reply_parent"),
+                         (EDGE_ROOT, "reply_root"), (EDGE_QUOTE, "quote_uri")):
+        keys = table.column(column).combine_chunks()
+        valid = keys.is_valid()
+        n = pc.sum(valid).as_py() or 0
+        parts.append(pa.table({"key": keys.filter(valid),
+                               "kind": pa.array(np.full(n, kind, dtype=np.int8)),
+                               "row": rows.filter(valid)}))
+    keys = pa.concat_tables(parts).sort_by([("key", "ascending"), ("kind", "ascending")])
+    path = keys_sidecar(parquet_path)
+    pq.write_table(keys, path + ".tmp", row_group_size=KEY_ROW_GROUP_ROWS, compression="zstd")
+    os.replace(path + ".tmp", path)
+
+
+def export_clusters(db_path, parquet_path):
+    """
+    Write the day's topic clusters (cluster_day.py) as the cold partition's
+    ``.clusters.parquet`` / ``.centroids.npy`` sidecars before the DB goes;
+    returns the number of clustered posts.
+    """
+    from .cluster_day import write_cluster_sidecars
+    conn = connect_readonly(db_path)
+    try:
+        tables = {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name IN ('topic_clusters', 'post_clusters')")}
+        if len(tables) < 2:
+            return 0
+        centroids = [blob for (blob,) in conn.execute(
+            "SELECT centroid FROM topic_clusters ORDER BY cluster_id")]
+        if not centroids:
+            return 0
+        rows = conn.execute("""
+            SELECT p.uri, c.cluster_id, c.similarity
+            FROM post_clusters c JOIN posts p ON p.rowid = c.post_rowid
+            ORDER BY p.time_us""").fetchall()
+    finally:
+        conn.close()
+    centers = np.frombuffer(b"".join(centroids), dtype=np.float32).reshape(len(centroids), -1)
+    uris, labels, sims = (list(col) for col in zip(*rows)) if rows else ([], [], [])
+    write_cluster_sidecars(parquet_path, centers, pa.array(uris, type=pa.string()), labels, sims)
+    return len(rows)
+
+
+def remove_db(db_path):
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.unlink(db_path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def slim_db(db_path):
+    """Keep a fallback copy: drop secondary indexes, FTS and rowid-keyed tables, then VACUUM."""
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    try:
+        names = [r[0] for r in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_posts_%'")]
+        for name in names:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        for name in ("posts_fts_ai", "posts_fts_ad", "posts_fts_au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute("DROP TABLE IF EXISTS posts_fts")
+        # the reply/quote graph and cluster ids are keyed by posts.rowid, which VACUUM may renumber
+        for name in ("posts_graph_ai", "posts_graph_ad", "posts_graph_au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute("DROP TABLE IF EXISTS edges")
+        conn.execute("DROP TABLE IF EXISTS uri_ids")
+        conn.execute("DROP TABLE IF EXISTS post_clusters")
+        conn.execute("DROP TABLE IF EXISTS topic_clusters")  # kept in the .centroids.npy sidecar
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def is_quiet(db_path, quiet_seconds):
+    newest = max(os.path.getmtime(db_path + s) for s in ("", "-wal") if os.path.exists(db_path + s))
+    return time.time() - newest >= quiet_seconds
+
+
+def main(argv=None):
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    ap = argparse.ArgumentParser(description="Compact old per-day SQLite DBs into Parquet")
+    ap.add_argument("--dbdir", required=True, help="Directory holding posts_{day}.db files")
+    ap.add_argument("--cold-dir", required=True, help="Directory for posts_{day}.parquet files")
+    ap.add_argument("--min-age-days", type=int, default=7, help="Retire days at least this old (default 7)")
+    ap.add_argument("--quiet-minutes", type=float, default=60,
+                    help="Skip DBs modified within this many minutes (default 60)")
+    ap.add_argument("--keep-sqlite", action="store_true",
+                    help="Drop indexes/FTS and VACUUM instead of deleting the DB")
+    ap.add_argument("--dry-run", action="store_true", help="Only list the days that would be retired")
+    ap.add_argument("--backfill-keys", action="store_true",
+                    help="Also write .keys.parquet for days retired before the sidecar existed")
+    args = ap.parse_args(argv)
+
+    os.makedirs(args.cold_dir, exist_ok=True)
+    cutoff = (datetime.datetime.now(datetime.timezone.utc).date()
+              - datetime.timedelta(days=args.min_age_days)).isoformat()
+    catalog = load_cold_catalog(args.dbdir)
+
+    if args.backfill_keys and not args.dry_run:
+        for day, entry in sorted(catalog.items()):
+            if os.path.exists(entry["path"]) and not os.path.exists(keys_sidecar(entry["path"])):
+                export_keys(entry["path"])
+                logger.info(f"Wrote keys sidecar for {day}")
+
+    for db_path in day_db_paths(args.dbdir):
+        day = db_day(db_path)
+        if day > cutoff:
+            break  # sorted oldest first
+        if day in catalog and os.path.exists(catalog[day]["path"]):
+            continue  # already retired (a --keep-sqlite copy)
+        if not is_quiet(db_path, args.quiet_minutes * 60):
+            logger.info(f"Skipping {day}: modified within {args.quiet_minutes} minutes")
+            continue
+        if args.dry_run:
+            logger.info(f"Would retire {day} ({os.path.getsize(db_path)} bytes)")
+            continue
+
+        parquet_path = os.path.abspath(os.path.join(args.cold_dir, f"posts_{day}.parquet"))
+        size = os.path.getsize(db_path)
+        t0 = time.perf_counter()
+        rows = export_day(db_path, parquet_path)
+        export_keys(parquet_path)
+        clustered = export_clusters(db_path, parquet_path)
+        catalog[day] = {
+            "path": parquet_path,
+            "rows": rows,
+            "retired_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        }
+        save_cold_catalog(args.dbdir, catalog)
+        if args.keep_sqlite:
+            slim_db(db_path)
+        else:
+            remove_db(db_path)
+        logger.info(f"Retired {day}: {rows} rows ({clustered} clustered), "
+                    f"{size} -> {os.path.getsize(parquet_path)} bytes in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
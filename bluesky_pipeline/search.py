@@ -0,0 +1,436 @@
+import argparse
+import json
+import os
+import numpy as np
+from pathlib import Path
+
+from .posts_db import (add_filter_args, connect_readonly, filters_from_args,
+                      fts_match_expr, is_day_schema, prune_db_paths, resolve_partitions,
+                      where_clause)
+from .query_cache import LRUCache, TTLCache, normalize_query
+from .query_days import run_sql
+from .vectors import normalize_rows
+
+# ------------------------
+# Config
+# ------------------------
+INDEX_DIR = "faiss_index"
+MODEL_NAME = "all-MiniLM-L6-v2"
+TOP_K = 5
+
+# Below this selectivity a FAISS ID selector is used; above it an over-fetch
+# of the unfiltered search is cheaper and almost always fills k.
+SELECTOR_MAX_FRACTION = 0.5
+OVERFETCH_FACTOR = 4
+FILTER_FETCH_ROWS = 10_000
+
+# Hybrid mode: lexical candidates pulled from FTS5, and the reciprocal rank
+# fusion constant used to merge the lexical and vector rankings.
+LEXICAL_CANDIDATES = 200
+RRF_K = 60
+
+# Query embeddings are cached per (model, normalized text); finished result
+# lists per (query, mode, filters, k, index version) for a short TTL.  FTS
+# modes also key on the source DBs' stat stamp, since posts_fts changes with
+# every import while the index version does not.
+EMBEDDING_CACHE_SIZE = 4096
+RESULT_TTL_SECONDS = 60.0
+
+
+def load_model(model_name=MODEL_NAME):
+    # torch / sentence-transformers are only imported once a query needs embedding
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(1)
+    return SentenceTransformer(model_name)
+
+
+def load_index_info(index_dir):
+    info_path = index_dir / "index_info.json"
+    if not info_path.exists():
+        return {}
+    with open(info_path) as f:
+        return json.load(f)
+
+
+def index_version(index_dir, info=None):
+    """build_faiss.py's version stamp; falls back to the index file mtime."""
+    version = (load_index_info(index_dir) if info is None else info).get("version")
+    if version is None:
+        index_path = index_dir / "index.faiss"
+        version = index_path.stat().st_mtime_ns if index_path.exists() else None
+    return version
+
+
+def load_index(index_dir):
+    index_path = index_dir / "index.faiss"
+    meta_path = index_dir / "metadata.json"
+
+    import faiss
+    print("Loading FAISS index at... ", index_path)
+    index = faiss.read_index(str(index_path))
+
+    with open(meta_path) as f:
+        metadata = json.load(f)
+
+    print(f"Loaded index with {len(metadata)} posts.")
+    return index, metadata
+
+
+def uri_positions(metadata):
+    return {m["uri"]: i for i, m in enumerate(metadata)}
+
+# ------------------------
+# Filtering
+# ------------------------
+
+def current_sources(db_paths, filters):
+    """
+    The index's source DBs as they are now: days retired since the build
+    are read from their cold Parquet, days gone entirely are skipped.
+    """
+    paths, missing = resolve_partitions(prune_db_paths(db_paths, filters))
+    for path in missing:
+        print(f"[sources] {path} no longer exists and is not in the cold catalog; skipped")
+    return paths
+
+
+def sources_stamp(db_paths, filters):
+    """
+    (path, mtime_ns, size) of each current source and its WAL file: changes
+    whenever file_to_db.py commits to a day the query can read.
+    """
+    paths, _ = resolve_partitions(prune_db_paths(db_paths, filters))
+    stamp = []
+    for path in paths:
+        for name in (path, path + "-wal"):
+            try:
+                st = os.stat(name)
+            except FileNotFoundError:
+                continue
+            stamp.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(stamp)
+
+
+def filter_mask(metadata, position, db_paths, filters):
+    """
+    Resolve the SQLite predicates to a boolean mask over index positions.
+    Only the day DBs (or retired Parquet days) that overlap the time range
+    are queried.
+    """
+    mask = np.zeros(len(metadata), dtype=bool)
+    where, params = where_clause(filters)
+    sql = f"SELECT uri FROM {{source}} WHERE has_embedding = 1 AND {where}"
+    for db_path in current_sources(db_paths, filters):
+        if db_path.endswith(".parquet"):
+            conn, cur = run_sql(db_path, sql, params)
+        else:
+            conn = connect_readonly(db_path)
+            if not is_day_schema(conn):
+                conn.close()
+                raise SystemExit(f"{db_path}: filters need a per-day posts DB (file_to_db.py schema)")
+            cur = conn.execute(sql.replace("{source}", "posts"), params)
+        try:
+            while True:
+                rows = cur.fetchmany(FILTER_FETCH_ROWS)
+                if not rows:
+                    break
+                for (uri,) in rows:
+                    i = position.get(uri)
+                    if i is not None:
+                        mask[i] = True
+        finally:
+            conn.close()
+    return mask
+
+
+def overfetch_search(index, query_embedding, k, mask):
+    """Search unfiltered with a growing k until k hits survive the mask."""
+    fetch = k * OVERFETCH_FACTOR
+    while True:
+        fetch = min(fetch, index.ntotal)
+        D, I = index.search(query_embedding, fetch)
+        keep = [(d, i) for d, i in zip(D[0], I[0]) if i >= 0 and mask[i]]
+        if len(keep) >= k or fetch >= index.ntotal:
+            keep = keep[:k]
+            return (np.array([[d for d, _ in keep]], dtype=np.float32),
+                    np.array([[i for _, i in keep]], dtype=np.int64))
+        fetch *= OVERFETCH_FACTOR
+
+
+def filtered_search(index, query_embedding, k, mask):
+    selected = int(mask.sum())
+    if selected == 0:
+        return np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64)
+    if selected > SELECTOR_MAX_FRACTION * index.ntotal:
+        return overfetch_search(index, query_embedding, k, mask)
+    import faiss
+    bitmap = np.packbits(mask, bitorder="little")
+    sel = faiss.IDSelectorBitmap(bitmap)
+    try:
+        return index.search(query_embedding, min(k, selected), params=faiss.SearchParameters(sel=sel))
+    except RuntimeError:
+        # index type without selector support
+        return overfetch_search(index, query_embedding, k, mask)
+
+
+# ------------------------
+# Lexical / hybrid
+# ------------------------
+
+def lexical_search(db_paths, query, filters, limit):
+    """
+    BM25-ranked FTS5 matches across the day DBs, best first, as
+    (uri, text, bm25) tuples.  DBs imported without --fts are skipped.
+    """
+    match = fts_match_expr(query)
+    if not match:
+        return []
+    where, params = where_clause(filters, alias="p")
+    sql = f"""
+        SELECT p.uri, p.text, bm25(posts_fts) AS score
+        FROM posts_fts JOIN posts p ON p.rowid = posts_fts.rowid
+        WHERE posts_fts MATCH ? AND {where}
+        ORDER BY score
+        LIMIT ?
+    """
+    hits = []
+    for db_path in current_sources(db_paths, filters):
+        if db_path.endswith(".parquet"):
+            print(f"[lexical] {db_path} is a retired day without posts_fts; skipped")
+            continue
+        conn = connect_readonly(db_path)
+        try:
+            has_fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='posts_fts'"
+            ).fetchone()
+            if not has_fts:
+                print(f"[lexical] {db_path} has no posts_fts index (import with --fts); skipped")
+                continue
+            hits.extend(conn.execute(sql, [match, *params, limit]))
+        finally:
+            conn.close()
+    hits.sort(key=lambda h: h[2])  # bm25: lower is better
+    return hits[:limit]
+
+
+def hybrid_search(index, metadata, position, query_embedding, hits, k):
+    """
+    Rerank lexical candidates by vector score and fuse both rankings with
+    reciprocal rank fusion.  Only the candidates are scored, via an ID
+    selector, so no brute-force scan of the full index is needed.
+    """
+    fused = {}
+    for rank, (uri, text, _) in enumerate(hits):
+        fused[uri] = [1.0 / (RRF_K + rank + 1), text]
+
+    mask = np.zeros(index.ntotal, dtype=bool)
+    for uri, _, _ in hits:
+        i = position.get(uri)
+        if i is not None:
+            mask[i] = True
+    _, I = filtered_search(index, query_embedding, int(mask.sum()), mask)
+    for rank, idx in enumerate(I[0]):
+        if idx >= 0:
+            fused[metadata[idx]["uri"]][0] += 1.0 / (RRF_K + rank + 1)
+
+    ranked = sorted(fused.items(), key=lambda kv: kv[1][0], reverse=True)
+    return [(uri, text, score) for uri, (score, text) in ranked[:k]]
+
+
+def print_matches(matches, label):
+    print("\nTop matches:")
+    for uri, text, score in matches:
+        print(f"URI: {uri}")
+        print(f"Text: {text}")
+        print(f"{label}: {score:.4f}")
+
+
+# ------------------------
+# Searcher
+# ------------------------
+
+class Searcher:
+    """
+    Holds the loaded index, model and caches so repeated queries in one
+    process skip ``model.encode`` and ``index.search``.  The index is
+    reloaded, and cached results dropped, whenever build_faiss.py writes a
+    new index_info.json version.
+    """
+
+    def __init__(self, index_dir, db_paths, filters, embedding_cache_size=EMBEDDING_CACHE_SIZE,
+                 result_ttl=RESULT_TTL_SECONDS):
+        self.index_dir = Path(index_dir)
+        self.db_paths = db_paths
+        self.filters = filters
+        self.filters_key = tuple(sorted(filters.items()))
+        self.embeddings = LRUCache(embedding_cache_size)
+        self.results = TTLCache(ttl=result_ttl)
+        self.model = None
+        self.index = None
+        self.version = None
+        self.metric = "l2"
+        self.info = {}
+        self.info_stat = None
+
+    def _index_info(self):
+        """index_info.json, re-parsed only when its mtime or size changes."""
+        try:
+            st = (self.index_dir / "index_info.json").stat()
+            info_stat = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            info_stat = None
+        if info_stat != self.info_stat:
+            self.info = load_index_info(self.index_dir)
+            self.info_stat = info_stat
+        return self.info
+
+    def _check_version(self):
+        info = self._index_info()
+        version = index_version(self.index_dir, info)
+        if self.index is not None and version == self.version:
+            return
+        if self.index is not None:
+            print(f"[cache] index version changed ({self.version} -> {version}); reloading")
+        self.index, self.metadata = load_index(self.index_dir)
+        # indexes built before build_faiss.py recorded a metric are L2
+        self.metric = info.get("metric", "l2")
+        self.position = uri_positions(self.metadata)
+        self.mask = None
+        if self.filters:
+            self.mask = filter_mask(self.metadata, self.position, self.db_paths, self.filters)
+            print(f"Filter matched {int(self.mask.sum())} indexed posts.")
+        self.version = version
+        self.results.clear()
+
+    def embed(self, query):
+        key = (MODEL_NAME, normalize_query(query))
+        vec = self.embeddings.get(key)
+        if vec is None:
+            if self.model is None:
+                self.model = load_model()
+            vec = np.array(self.model.encode([query])).astype("float32")
+            self.embeddings.put(key, vec)
+        if self.metric == "ip":
+            # unit length, like the indexed vectors, so inner product is cosine
+            vec = normalize_rows(vec)
+        return vec
+
+    def search(self, query, mode="vector", k=TOP_K, candidates=LEXICAL_CANDIDATES):
+        """Return ([(uri, text, score)], score label)."""
+        if mode == "lexical":
+            self.version = index_version(self.index_dir, self._index_info())
+        else:
+            self._check_version()
+        key = (normalize_query(query), mode, self.filters_key, k, candidates, self.version)
+        if mode != "vector":
+            key += (sources_stamp(self.db_paths, self.filters),)
+        cached = self.results.get(key)
+        if cached is not None:
+            return cached
+
+        if mode == "lexical":
+            result = (lexical_search(self.db_paths, query, self.filters, k), "BM25")
+        elif mode == "hybrid":
+            # filters are applied inside the FTS query
+            hits = lexical_search(self.db_paths, query, self.filters, candidates)
+            result = (hybrid_search(self.index, self.metadata, self.position,
+                                    self.embed(query), hits, k), "RRF")
+        else:
+            query_embedding = self.embed(query)
+            if self.mask is None:
+                D, I = self.index.search(query_embedding, k)
+            else:
+                D, I = filtered_search(self.index, query_embedding, k, self.mask)
+            result = ([(self.metadata[idx]["uri"], self.metadata[idx]["text"], float(score))
+                       for idx, score in zip(I[0], D[0]) if idx >= 0],
+                      "Similarity" if self.metric == "ip" else "Distance")
+        self.results.put(key, result)
+        return result
+
+    def cache_stats(self):
+        return {"embeddings": self.embeddings.stats(), "results": self.results.stats()}
+
+
+def prompt_queries():
+    while True:
+        try:
+            query = input("\nEnter your search query: ").strip()
+        except EOFError:
+            return
+        if not query:
+            return
+        yield query
+
+
+def main(argv=None):
+    # ----------------------------------------
+    # Parse command line
+    # ----------------------------------------
+    parser = argparse.ArgumentParser(
+        description="Search on built search index."
+    )
+
+    parser.add_argument(
+        "--index-dir",
+        type=str,
+        default=INDEX_DIR,
+        help="Directory to put search index files into."
+    )
+    parser.add_argument(
+        "--db-path",
+        type=str,
+        nargs="+",
+        help="DB(s) for filters and lexical search (default: the sources recorded at build time)."
+    )
+    parser.add_argument(
+        "-k", "--top-k",
+        type=int,
+        default=TOP_K,
+        help="Number of matches to return."
+    )
+    parser.add_argument(
+        "--query",
+        type=str,
+        help="Query text (otherwise prompt repeatedly until an empty line or EOF)."
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("vector", "lexical", "hybrid"),
+        default="vector",
+        help="vector: FAISS only; lexical: FTS5 only; hybrid: FTS5 candidates fused with vector scores."
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=LEXICAL_CANDIDATES,
+        help="Lexical candidates to rerank in hybrid mode."
+    )
+    parser.add_argument(
+        "--result-ttl",
+        type=float,
+        default=RESULT_TTL_SECONDS,
+        help="Seconds a cached result list stays valid (0 disables result caching)."
+    )
+    add_filter_args(parser)
+
+    args = parser.parse_args(argv)
+    filters = filters_from_args(args)
+    info = load_index_info(Path(args.index_dir))
+
+    db_paths = args.db_path or info.get("sources") or []
+    if (filters or args.mode != "vector") and not db_paths:
+        raise SystemExit("Filters and lexical search need --db-path (index has no recorded sources).")
+
+    searcher = Searcher(args.index_dir, db_paths, filters, result_ttl=args.result_ttl)
+    queries = [args.query] if args.query else prompt_queries()
+    for query in queries:
+        matches, label = searcher.search(query, args.mode, args.top_k, args.candidates)
+        print_matches(matches, label)
+
+    stats = searcher.cache_stats()
+    print(f"[cache] embeddings {stats['embeddings']} results {stats['results']}")
+
+
+if __name__ == "__main__":
+    main()
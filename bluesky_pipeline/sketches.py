@@ -0,0 +1,66 @@
+"""
+HyperLogLog distinct-count sketch, stored as a BLOB in the day DB rollups.
+
+Sketches for the same bucket merge losslessly (register-wise max), so
+distinct authors per hour can be combined across day DBs and into per-day
+totals without rescanning posts.  With the default precision (2^12
+registers, 4 KiB) the standard error is about 1.6%.
+"""
+import hashlib
+import math
+
+DEFAULT_P = 12
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, p=DEFAULT_P, registers=None):
+        self.p = p
+        self.m = 1 << p
+        if registers is None:
+            registers = bytearray(self.m)
+        elif len(registers) != self.m:
+            raise ValueError(f"expected {self.m} registers, got {len(registers)}")
+        self.registers = bytearray(registers)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        p = len(blob).bit_length() - 1
+        return cls(p, blob)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    def add(self, value):
+        h = _hash64(value)
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def update(self, values):
+        for v in values:
+            self.add(v)
+        return self
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # linear counting for small sets
+        return raw
+
+    def __len__(self):
+        return round(self.estimate())
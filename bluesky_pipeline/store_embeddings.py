@@ -0,0 +1,166 @@
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from .metrics import Registry, add_metrics_args
+from .posts_db import ensure_emb_norm, is_day_schema
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------
+# Config
+# ----------------------------------------
+DB_PATH = "bluesky_posts.db"
+MODEL_NAME = "all-MiniLM-L6-v2"
+BATCH_SIZE = 128  # this should be a command line arg soon
+MAX_COMMENT_LEN = 300
+FETCH_LIMIT = 30000
+IDLE_SLEEP_SECONDS = 60
+
+metrics = Registry()
+m_posts = metrics.counter("bsky_embed_posts_total", "Posts embedded and stored")
+metrics.rate("bsky_embed_posts_per_second", "Posts embedded per second", m_posts)
+m_backlog = metrics.gauge("bsky_embed_backlog_posts", "Posts fetched but not yet embedded in this run")
+m_encode = metrics.histogram("bsky_embed_encode_seconds", "model.encode latency per batch")
+
+# Per-day DBs (file_to_db.py) keep vectors in emb_vec; the legacy
+# monolithic DB uses embedding_blob.  Vectors are stored L2-normalised and
+# flagged with emb_norm = 1, so inner product is cosine similarity.
+DAY_PENDING = f"""
+    SELECT uri, text FROM posts
+    WHERE has_embedding = 0 AND LENGTH(text) > 10 AND lang_en = 1
+    ORDER BY time_us DESC
+    LIMIT {FETCH_LIMIT};
+"""
+LEGACY_PENDING = f"""
+    SELECT uri, text FROM posts
+    WHERE embedding IS NULL AND LENGTH(text) > 10 AND langs='en'
+    ORDER BY created_date DESC, created_hour DESC
+    LIMIT {FETCH_LIMIT};
+"""
+DAY_UPDATE = """
+    UPDATE posts
+    SET emb_vec = ?, emb_model = ?, emb_dims = ?, has_embedding = 1, emb_norm = 1
+    WHERE uri = ?
+"""
+LEGACY_UPDATE = """
+    UPDATE posts
+    SET embedding_blob = ?, embedding = 'y', emb_norm = 1
+    WHERE uri = ?
+"""
+
+
+def load_model(model_name=MODEL_NAME):
+    from sentence_transformers import SentenceTransformer  # torch env only
+    logger.info(f"Loading embedding model: {model_name}")
+    return SentenceTransformer(model_name)
+
+
+def open_db(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    ensure_emb_norm(conn)
+    return conn
+
+
+def fetch_pending(conn):
+    """(uri, text) rows still needing an embedding, newest first."""
+    query = DAY_PENDING if is_day_schema(conn) else LEGACY_PENDING
+    return conn.execute(query).fetchall()
+
+
+def encode(model, texts):
+    """float32 (N, dim) unit-length embeddings for ``texts`` (truncated to MAX_COMMENT_LEN)."""
+    with m_encode.time():
+        embeddings = model.encode([t[:MAX_COMMENT_LEN] for t in texts], show_progress_bar=False,
+                                  normalize_embeddings=True)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def store_batch(conn, uris, vectors, model_name=MODEL_NAME, day_schema=None):
+    """Write one batch of vectors and commit."""
+    if day_schema is None:
+        day_schema = is_day_schema(conn)
+    if day_schema:
+        conn.executemany(DAY_UPDATE, [(v.tobytes(), model_name, v.shape[0], uri)
+                                      for uri, v in zip(uris, vectors)])
+    else:
+        conn.executemany(LEGACY_UPDATE, [(v.tobytes(), uri) for uri, v in zip(uris, vectors)])
+    conn.commit()
+
+
+def embed_pending(conn, model, batch_size=BATCH_SIZE, metrics_file=None, metrics_interval=10.0):
+    """Embed everything fetch_pending() returns; returns the number of posts stored."""
+    rows = fetch_pending(conn)
+    logger.info(f"Loaded {len(rows)} posts without embeddings.")
+    m_backlog.set(len(rows))
+    if not rows:
+        return 0
+
+    day_schema = is_day_schema(conn)
+    uris = [row[0] for row in rows]
+    texts = [row[1] for row in rows]
+    logger.info(f"Embedding {len(texts)} posts...")
+
+    for i in range(0, len(texts), batch_size):
+        batch_uris = uris[i:i + batch_size]
+        vectors = encode(model, texts[i:i + batch_size])
+        store_batch(conn, batch_uris, vectors, day_schema=day_schema)
+        m_posts.inc(len(batch_uris))
+        m_backlog.dec(len(batch_uris))
+        metrics.maybe_write_textfile(metrics_file, metrics_interval)
+        if i // batch_size % 10 == 0:
+            logger.info(f"Committed batch {i // batch_size + 1}")
+    return len(rows)
+
+
+def main(argv=None):
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # ----------------------------------------
+    # Parse command line
+    # ----------------------------------------
+    parser = argparse.ArgumentParser(
+        description="Ingest Bluesky posts or generate embeddings."
+    )
+
+    parser.add_argument(
+        "--db-path",
+        type=str,
+        default=DB_PATH,
+        help="Path to the SQLite database file."
+    )
+    parser.add_argument(
+        "--idle-sleep",
+        type=float,
+        default=IDLE_SLEEP_SECONDS,
+        help=f"Seconds to sleep before exiting when nothing was embedded (default {IDLE_SLEEP_SECONDS})."
+    )
+    add_metrics_args(parser, serve=False)
+
+    args = parser.parse_args(argv)
+
+    model = load_model()
+    conn = open_db(args.db_path)
+    try:
+        stored = embed_pending(conn, model, metrics_file=args.metrics_file,
+                               metrics_interval=args.metrics_interval)
+    finally:
+        conn.close()
+
+    if args.metrics_file:
+        metrics.write_textfile(args.metrics_file)
+    if not stored:
+        if args.idle_sleep > 0:
+            logger.info(f"Nothing to embed — sleeping {args.idle_sleep:g} seconds before exiting.")
+            time.sleep(args.idle_sleep)
+        return
+    logger.info("All embeddings saved.")
+
+
+if __name__ == "__main__":
+    main()
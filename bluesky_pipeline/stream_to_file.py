@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+import argparse, asyncio, json, os, shutil, signal, sys, time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from functools import lru_cache
+import websockets
+
+from .metrics import Registry, add_metrics_args
+
+# ---- helpers ---------------------------------------------------------------
+
+HOUR_US = 3_600_000_000
+
+# write buffer for .part handles while catching up (live mode is line-buffered)
+CATCHUP_BUFFER_BYTES = 1 << 20
+
+
+@lru_cache(maxsize=64)
+def _hour_key(hour_index: int) -> str:
+    # flat pattern: YYYY-MM-DDTHH.ndjson / .part
+    return datetime.fromtimestamp(hour_index * 3600, tz=timezone.utc).strftime("%Y-%m-%dT%H")
+
+
+def hour_key_from_timeus(time_us: int) -> str:
+    # time_us is microseconds since epoch (UTC); bucket with integer division
+    # so the datetime/strftime work happens once per hour, not per event
+    return _hour_key(time_us // HOUR_US)
+
+
+def current_hour_key() -> str:
+    return _hour_key(int(time.time()) // 3600)
+
+
+def atomic_write_json(path, obj):
+    tmp = path + ".tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(tmp, "w") as f:
+        json.dump(obj, f, separators=(",", ":"))
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def commit_checkpoint_timestamp(time_us: int, cursor_path):
+    if time_us is not None:
+        atomic_write_json(cursor_path, {"time_us": time_us})
+
+
+def load_cursor(path):
+    try:
+        with open(path, "r") as f:
+            return int(json.load(f)["time_us"])
+    except Exception:
+        return None
+
+
+def should_skip_event(ev):
+    time_us = ev.get("time_us")
+    if not isinstance(time_us, int):
+        return True
+    if ev.get("kind") != "commit":
+        return True
+
+    commit = ev.get("commit", {})
+    if (
+            commit.get("operation") != "create" or
+            commit.get("collection") != "app.bsky.feed.post"
+    ):
+        return True
+
+    record = commit.get("record", {})
+    if not record:
+        return True
+
+    return False
+
+def flatten_post_events(ev):
+    """
+    Return a list of flattened records from a Jetstream message.
+    Assume message has already been checked to be a bluesky post.
+    Handles commit/create events for app.bsky.feed.post.
+    """
+    time_us = ev.get("time_us")
+
+    commit = ev.get("commit", {})
+    record = commit.get("record", {})
+
+    did = ev.get("did") or ev.get("repo")
+    cid = commit.get("cid")
+
+    post_uri = f"at://{did}/{commit['collection']}/{commit['rkey']}"
+    rkey = commit["rkey"]
+    text = record.get("text", "")
+    created_at = record.get("createdAt", "")
+    langs = record.get("langs", [])
+    if isinstance(langs, str):
+        langs = [langs]
+    if langs is None:
+        langs = []
+
+    # reply pointers
+    reply = record.get("reply") or {}
+    parent_uri = (reply.get("parent") or {}).get("uri")
+    root_uri = (reply.get("root") or {}).get("uri")
+
+    # quote pointer (if any)
+    quote_uri = None
+    embed = record.get("embed") or {}
+    if embed.get("$type") == "app.bsky.embed.record#view" and "record" in embed:
+        quote_uri = (embed["record"].get("uri")
+                     if isinstance(embed["record"], dict) else None)
+    elif embed.get("$type") == "app.bsky.embed.record" and "record" in embed:
+        quote_uri = (embed["record"].get("uri")
+                     if isinstance(embed["record"], dict) else None)
+
+    # print(f"Inserting post: {text[:40]}...")
+
+    return {
+        "kind": "post",
+        "uri": post_uri,
+        "cid": cid,
+        "did": did,
+        "rkey": rkey,
+        "created_at": created_at,
+        "time_us": time_us,
+        "text": text,
+        "reply_parent": parent_uri,
+        "reply_root": root_uri,
+        "quote_uri": quote_uri,
+        "langs": langs
+    }
+
+# ---- hourly segments -------------------------------------------------------
+
+class SegmentWriter:
+    """
+    Writers for ``{hour}.ndjson.part`` with at most ``max_open`` handles,
+    line-buffered unless ``buffering`` says otherwise.  When the cap is hit
+    the least recently written hour is closed: a past hour is rolled into its
+    ``.ndjson``, the current wall-clock hour is just closed and reopened in
+    append mode on its next event.
+    """
+
+    def __init__(self, outdir, max_open=8, fsync_timer=None, buffering=1):
+        self.outdir = outdir
+        self.max_open = max_open
+        self.fsync_timer = fsync_timer
+        self.buffering = buffering
+        self.handles = OrderedDict()  # hour -> fileobj, least recently written first
+        self._last_hour = None
+        self._last_fh = None
+        self._newest = None   # newest event hour written
+        self._rolled = None   # (wall-clock hour, newest hour) at the last roll
+
+    def write(self, hour, line):
+        if hour == self._last_hour:
+            self._last_fh.write(line)
+            return
+        fh = self.handles.get(hour)
+        if fh is None:
+            if len(self.handles) >= self.max_open:
+                oldest = next(iter(self.handles))
+                self.close(oldest, roll=oldest != current_hour_key())
+            path = os.path.join(self.outdir, f"{hour}.ndjson.part")
+            fh = open(path, "a", buffering=self.buffering)
+            self.handles[hour] = fh
+            if self._newest is None or hour > self._newest:
+                self._newest = hour
+        else:
+            self.handles.move_to_end(hour)
+        self._last_hour, self._last_fh = hour, fh
+        fh.write(line)
+
+    def _fsync(self, fh):
+        fh.flush()
+        if self.fsync_timer is None:
+            os.fsync(fh.fileno())
+        else:
+            with self.fsync_timer.time():
+                os.fsync(fh.fileno())
+
+    def close(self, hour, roll):
+        fh = self.handles.pop(hour)
+        if hour == self._last_hour:
+            self._last_hour = self._last_fh = None
+        self._fsync(fh)
+        fh.close()
+        if roll:
+            path_part = os.path.join(self.outdir, f"{hour}.ndjson.part")
+            path_final = os.path.join(self.outdir, f"{hour}.ndjson")
+            with open(path_final, "a") as out, open(path_part, "r") as inp:
+                shutil.copyfileobj(inp, out)
+                out.flush()
+                os.fsync(out.fileno())
+            os.unlink(path_part)
+
+    def set_buffering(self, buffering):
+        """Switch buffering; open handles are closed (past hours rolled) and reopen on demand."""
+        if buffering == self.buffering:
+            return
+        self.buffering = buffering
+        now_hour = current_hour_key()
+        for hour in list(self.handles):
+            self.close(hour, roll=hour != now_hour)
+
+    def flush(self, roll=False):
+        """
+        fsync every open segment.  Past hours are rolled into ``.ndjson`` only
+        when the wall-clock hour or the newest event hour has changed since
+        the last roll, keeping those two open; ``roll`` rolls every past hour.
+        """
+        now_hour = current_hour_key()
+        marks = (now_hour, self._newest)
+        if roll or marks != self._rolled:
+            self._rolled = marks
+            keep = {now_hour} if roll else set(marks)
+            for hour in [h for h in self.handles if h not in keep]:
+                self.close(hour, roll=True)
+        for fh in self.handles.values():
+            self._fsync(fh)
+
+    def __len__(self):
+        return len(self.handles)
+
+# ---- replay dedup ----------------------------------------------------------
+
+class RecentURIs:
+    """
+    Post URIs seen within the last ``window_seconds`` of event time.  URIs go
+    into per-bucket lists so expiry drops whole buckets; membership is a
+    single set lookup.
+    """
+
+    def __init__(self, window_seconds=600, bucket_seconds=60):
+        self.bucket_us = int(bucket_seconds * 1_000_000)
+        self.window_buckets = max(1, int(window_seconds // bucket_seconds))
+        self.seen = set()
+        self.buckets = deque()  # (bucket, [uris]), oldest first
+
+    def add(self, uri, time_us):
+        """Record ``uri``; return False if it was already seen."""
+        if uri in self.seen:
+            return False
+        bucket = time_us // self.bucket_us
+        if not self.buckets or bucket > self.buckets[-1][0]:
+            self.buckets.append((bucket, []))
+            while self.buckets[0][0] <= bucket - self.window_buckets:
+                _, old = self.buckets.popleft()
+                self.seen.difference_update(old)
+        # late (out-of-order) events land in the newest bucket
+        self.buckets[-1][1].append(uri)
+        self.seen.add(uri)
+        return True
+
+    def __len__(self):
+        return len(self.seen)
+
+
+def seed_recent_uris(recent, outdir, since_us):
+    """
+    Load URIs already spooled at/after ``since_us`` so a cursor replay after
+    restart doesn't write them twice.
+    """
+    first_hour = since_us // HOUR_US
+    last_hour = int(time.time()) // 3600
+    seeded = 0
+    for hour_index in range(first_hour, last_hour + 1):
+        hour = _hour_key(hour_index)
+        for suffix in (".ndjson", ".ndjson.part"):
+            path = os.path.join(outdir, hour + suffix)
+            if not os.path.exists(path):
+                continue
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    tu = rec.get("time_us")
+                    if isinstance(tu, int) and tu >= since_us and recent.add(rec.get("uri"), tu):
+                        seeded += 1
+    return seeded
+
+# ---- runtime ---------------------------------------------------------------
+
+async def run(outdir: str, url: str, flush_count: int, flush_seconds: float,
+              metrics_file=None, metrics_port=None, metrics_interval=10.0, max_open_files=8,
+              catchup_lag=60.0, catchup_factor=10, dedup_window=600.0, rewind_seconds=5.0):
+    registry = Registry()
+    m_messages = registry.counter("bsky_stream_messages_total", "Jetstream messages received")
+    m_events = registry.counter("bsky_stream_events_total", "Post events written to NDJSON")
+    registry.rate("bsky_stream_events_per_second", "Post events written per second", m_events)
+    m_lag = registry.gauge("bsky_stream_lag_seconds", "Wall clock minus time_us of the last written event")
+    m_flush = registry.histogram("bsky_stream_flush_seconds", "Duration of flush_and_checkpoint")
+    m_fsync = registry.histogram("bsky_stream_fsync_seconds", "Duration of a single fsync")
+    m_open = registry.gauge("bsky_stream_open_files", "Open hourly .part handles")
+    m_dupes = registry.counter("bsky_stream_duplicates_total", "Replayed post events dropped as already spooled")
+    m_catchup = registry.gauge("bsky_stream_catchup", "1 while in catch-up mode after an outage")
+    if metrics_port:
+        registry.serve(metrics_port)
+
+    state_dir = os.path.join(outdir, "state")
+    os.makedirs(state_dir, exist_ok=True)
+    cursor_path = os.path.join(state_dir, "cursor.json")
+
+    max_time_us = load_cursor(cursor_path)
+
+    # drop events that were spooled before a restart but after the checkpoint
+    recent = RecentURIs(dedup_window)
+    if max_time_us:
+        since_us = max_time_us - int(dedup_window * 1_000_000)
+        print(f"[dedup] seeded {seed_recent_uris(recent, outdir, since_us)} recent URIs", flush=True)
+
+    # bounded set of open hourly .part handles
+    segments = SegmentWriter(outdir, max_open_files, fsync_timer=m_fsync)
+
+    # graceful shutdown
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    last_flush = time.time()
+
+    async def flush_and_checkpoint(force=False, min_interval=flush_seconds):
+        nonlocal last_flush, max_time_us
+        now = time.time()
+        if not force and (now - last_flush) < min_interval:
+            return
+        t0 = time.perf_counter()
+        # fsync for durability; past hours are rolled to .ndjson
+        segments.flush(roll=force)
+        commit_checkpoint_timestamp(max_time_us, cursor_path)
+        last_flush = now
+        m_flush.observe(time.perf_counter() - t0)
+        m_open.set(len(segments))
+        registry.maybe_write_textfile(metrics_file, 0 if force else metrics_interval)
+
+    async def writer_loop():
+        nonlocal max_time_us
+        pending = 0
+        catchup = False
+        batch_count, batch_seconds = flush_count, flush_seconds
+        try:
+            # rewind a little: events arriving out of order just before the
+            # checkpoint would otherwise be skipped; dedup drops the overlap
+            cursor = max_time_us - int(rewind_seconds * 1_000_000) if max_time_us else None
+            qs = f"?cursor={cursor}" if cursor else ""
+            async with websockets.connect(url + qs, max_size=None) as ws:
+                print(f"[connect] {url}{qs}", flush=True)
+                while not stop.is_set():
+                    msg = await ws.recv()  # text JSON per message
+                    m_messages.inc()
+                    ev = json.loads(msg)
+                    if should_skip_event(ev):
+                        continue
+
+                    tu = ev.get("time_us")
+                    rec = flatten_post_events(ev)
+                    if not recent.add(rec["uri"], tu):
+                        m_dupes.inc()
+                        continue
+                    hour = hour_key_from_timeus(tu)
+
+                    # write line
+                    segments.write(hour, json.dumps(rec, separators=(",", ":")) + "\n")
+                    pending += 1
+                    m_events.inc()
+                    now = time.time()
+                    lag = now - tu / 1_000_000
+                    m_lag.set(lag)
+
+                    # catch-up: while replaying far behind live, buffer writes
+                    # and fsync/checkpoint less often; back to normal near live
+                    if not catchup and lag > catchup_lag:
+                        catchup = True
+                        batch_count, batch_seconds = flush_count * catchup_factor, flush_seconds * catchup_factor
+                        segments.set_buffering(CATCHUP_BUFFER_BYTES)
+                        print(f"[catchup] lag {lag:.0f}s, flushing at most every {batch_seconds:.0f}s", flush=True)
+                    elif catchup and lag < catchup_lag / 2:
+                        catchup = False
+                        batch_count, batch_seconds = flush_count, flush_seconds
+                        segments.set_buffering(1)
+                        print(f"[catchup] live again (lag {lag:.1f}s)", flush=True)
+                    m_catchup.set(int(catchup))
+
+                    # advance cursor to the max observed (events can arrive slightly out of order)
+                    if max_time_us is None or tu > max_time_us:
+                        max_time_us = tu
+
+                    # flush conditions (never more often than batch_seconds)
+                    if pending >= batch_count or (now - last_flush) >= batch_seconds:
+                        await flush_and_checkpoint(min_interval=batch_seconds)
+                        pending = 0
+        except websockets.ConnectionClosed:
+            print("[disconnect] shutting down...", flush=True)
+        except Exception as e:
+            print(f"[error] {e}", file=sys.stderr, flush=True)
+        finally:
+            await flush_and_checkpoint(force=True)
+
+    await asyncio.gather(writer_loop())
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Jetstream → hourly NDJSON (partitioned by time_us)")
+    p.add_argument("--outdir", default=".", help="Output directory (default: current dir)")
+    p.add_argument("--url", default="wss://jetstream1.us-west.bsky.network/subscribe", help="Jetstream WS URL")
+    p.add_argument("--flush-count", type=int, default=200, help="Flush after N events (default 200)")
+    p.add_argument("--flush-seconds", type=float, default=3.0, help="Flush every N seconds (default 3.0)")
+    p.add_argument("--max-open-files", type=int, default=8,
+                   help="Cap on open hourly .part handles; least recently written hours are closed (default 8)")
+    p.add_argument("--catchup-lag", type=float, default=60.0,
+                   help="Enter catch-up mode when time_us lags wall clock by more than N seconds (default 60)")
+    p.add_argument("--catchup-factor", type=int, default=10,
+                   help="Multiply flush count/seconds by this while catching up (default 10)")
+    p.add_argument("--dedup-window", type=float, default=600.0,
+                   help="Seconds of event time over which replayed URIs are dropped (default 600)")
+    p.add_argument("--rewind-seconds", type=float, default=5.0,
+                   help="Reconnect this far before the saved cursor (default 5)")
+    add_metrics_args(p)
+    args = p.parse_args(argv)
+    try:
+        asyncio.run(run(args.outdir, args.url, args.flush_count, args.flush_seconds,
+                        args.metrics_file, args.metrics_port, args.metrics_interval,
+                        args.max_open_files, args.catchup_lag, args.catchup_factor,
+                        args.dedup_window, args.rewind_seconds))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Thread trees and quote fan-out across the per-day partitions.
+
+Uses the reply/quote graph that file_to_db.py maintains in every day DB
+(``uri_ids`` + ``edges``), so each partition answers with a couple of index
+lookups instead of a scan.  Replies and quotes are never older than the post
+they point at, so only partitions from that post's day onward are queried.
+Cold Parquet days are looked up through the ``.keys.parquet`` sidecar that
+retire_days.py writes (sorted keys, so row-group statistics skip all but one
+group) and only the matching rows are read; days retired without one are
+scanned with DuckDB.
+
+    # full thread containing a post, as a flat JSON list in tree order
+    # (each post with its tree ``parent`` uri and ``depth``)
+    python scripts/threads.py --dbdir /mnt/ingestion/database --uri at://did:plc:.../app.bsky.feed.post/...
+
+    # every post quoting it
+    python scripts/threads.py --dbdir /mnt/ingestion/database --uri at://... --quotes
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .posts_db import (EDGE_QUOTE, EDGE_REPLY, EDGE_ROOT, KEY_POST, connect_readonly,
+                      keys_sidecar, partition_paths)
+
+POST_COLUMNS = ("uri", "author_did", "created_at", "time_us", "text", "reply_parent", "reply_root", "quote_uri")
+_SELECT = ", ".join(POST_COLUMNS)
+
+GRAPH_SQL = f"""
+SELECT {", ".join("p." + c for c in POST_COLUMNS)}
+FROM uri_ids u
+JOIN edges e ON e.dst = u.id AND e.kind = ?
+JOIN posts p ON p.rowid = e.src
+WHERE u.uri = ?
+"""
+
+# fallback for DBs not yet opened by file_to_db.py since the graph was added,
+# and cold days retired before retire_days.py wrote keys sidecars
+SCAN_COLUMN = {EDGE_REPLY: "reply_parent", EDGE_ROOT: "reply_root", EDGE_QUOTE: "quote_uri"}
+
+# ---- per-partition lookups -------------------------------------------------
+
+def _keyed(path):
+    return path.endswith(".parquet") and os.path.exists(keys_sidecar(path))
+
+
+def _cold_lookup(path, key, kind):
+    """Posts of a cold partition whose ``kind`` key is ``key``, via its keys sidecar."""
+    import pyarrow.parquet as pq
+    rows = pq.read_table(keys_sidecar(path), columns=["row"],
+                         filters=[("key", "=", key), ("kind", "=", kind)]).column("row").to_pylist()
+    if not rows:
+        return []
+    rows.sort()
+    pf = pq.ParquetFile(path)
+    posts, start = [], 0
+    for group in range(pf.metadata.num_row_groups):
+        end = start + pf.metadata.row_group(group).num_rows
+        local = [r - start for r in rows if start <= r < end]
+        if local:
+            posts += pf.read_row_group(group, columns=list(POST_COLUMNS)).take(local).to_pylist()
+        start = end
+    return posts
+
+
+def _connect(path):
+    """(connection, name to select posts FROM, has graph tables) for one partition."""
+    if path.endswith(".parquet"):
+        import duckdb  # only needed once days have been retired
+        return duckdb.connect(), "read_parquet('" + path.replace("'", "''") + "')", False
+    conn = connect_readonly(path)
+    has_graph = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='edges'").fetchone() is not None
+    return conn, "posts", has_graph
+
+
+def get_post(path, uri):
+    if _keyed(path):
+        posts = _cold_lookup(path, uri, KEY_POST)
+        return posts[0] if posts else None
+    conn, source, _ = _connect(path)
+    try:
+        row = conn.execute(f"SELECT {_SELECT} FROM {source} WHERE uri = ?", [uri]).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(POST_COLUMNS, row)) if row else None
+
+
+def linked(path, uri, kind):
+    """Posts in one partition with a ``kind`` edge pointing at ``uri``."""
+    if _keyed(path):
+        return _cold_lookup(path, uri, kind)
+    conn, source, has_graph = _connect(path)
+    try:
+        if has_graph:
+            rows = conn.execute(GRAPH_SQL, [kind, uri]).fetchall()
+        else:
+            rows = conn.execute(f"SELECT {_SELECT} FROM {source} WHERE {SCAN_COLUMN[kind]} = ?", [uri]).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(POST_COLUMNS, row)) for row in rows]
+
+# ---- across partitions -----------------------------------------------------
+
+def find_post(paths, uri, workers=4):
+    """(partition index, post) for ``uri``, newest partition first; (None, None) if absent."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        found = list(pool.map(lambda p: get_post(p, uri), paths))
+    for i in reversed(range(len(paths))):
+        if found[i]:
+            return i, found[i]
+    return None, None
+
+
+def linked_all(paths, uri, kind, workers=4):
+    """Every post with a ``kind`` edge to ``uri``, in time_us order."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        chunks = pool.map(lambda p: linked(p, uri, kind), paths)
+        posts = [post for chunk in chunks for post in chunk]
+    return sorted(posts, key=lambda p: p["time_us"])
+
+
+def quotes(dbdir, uri, workers=4):
+    """Posts quoting ``uri`` across every partition that can hold them."""
+    paths = partition_paths(dbdir)
+    i, _ = find_post(paths, uri, workers)
+    return linked_all(paths[i or 0:], uri, EDGE_QUOTE, workers)
+
+
+def thread(dbdir, uri, workers=4):
+    """
+    The whole thread containing ``uri`` as a tree of post dicts, each with a
+    ``replies`` list ordered by time_us.  Replies whose parent is missing
+    (deleted, or never ingested) hang off the root with ``orphan: True``.
+    """
+    paths = partition_paths(dbdir)
+    i, post = find_post(paths, uri, workers)
+    root_uri = (post or {}).get("reply_root") or uri
+    if root_uri != uri:
+        i, root = find_post(paths[:(i or 0) + 1], root_uri, workers)
+    else:
+        root = post
+    root = dict(root or {"uri": root_uri, "missing": True})
+
+    members = linked_all(paths[i or 0:], root_uri, EDGE_ROOT, workers)
+    nodes = {root_uri: root}
+    for m in members:
+        nodes[m["uri"]] = dict(m)
+    for node in nodes.values():
+        node["replies"] = []
+    for m in members:
+        node = nodes[m["uri"]]
+        parent = nodes.get(m["reply_parent"])
+        if parent is None:
+            node["orphan"] = True
+            parent = root
+        parent["replies"].append(node)
+    return root
+
+# ---- CLI -------------------------------------------------------------------
+
+def walk(root):
+    """(node, parent, depth) over a thread tree in pre-order, with an explicit stack."""
+    stack = [(root, None, 0)]
+    while stack:
+        node, parent, depth = stack.pop()
+        yield node, parent, depth
+        stack.extend((child, node, depth + 1) for child in reversed(node.get("replies", ())))
+
+
+def flatten(root):
+    """
+    The tree as a flat pre-order list of posts, each with its tree ``parent``
+    uri (None for the root) and ``depth`` instead of nested ``replies``.
+    """
+    return [{**{k: v for k, v in node.items() if k != "replies"},
+             "parent": parent and parent["uri"], "depth": depth}
+            for node, parent, depth in walk(root)]
+
+
+def print_tree(node, out=None):
+    out = out or sys.stdout
+    for node, _, depth in walk(node):
+        text = (node.get("text") or "").replace("\n", " ")
+        if len(text) > 100:
+            text = text[:97] + "..."
+        mark = " (orphan)" if node.get("orphan") else ""
+        if node.get("missing"):
+            out.write(f"{'  ' * depth}[missing] {node['uri']}\n")
+        else:
+            out.write(f"{'  ' * depth}- {node.get('created_at', '')} {node.get('author_did', '')}{mark}: {text}\n")
+
+
+def count_nodes(node):
+    return sum(1 for _ in walk(node))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Thread trees and quote fan-out across per-day DBs")
+    ap.add_argument("--dbdir", required=True, help="Directory holding posts_{day}.db files")
+    ap.add_argument("--uri", required=True, help="at:// URI of any post in the thread")
+    ap.add_argument("--quotes", action="store_true", help="List posts quoting --uri instead of the thread")
+    ap.add_argument("--format", choices=("json", "text"), default="json")
+    ap.add_argument("--workers", type=int, default=4, help="Partitions queried in parallel (default 4)")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.quotes:
+        result = quotes(args.dbdir, args.uri, args.workers)
+        n = len(result)
+    else:
+        result = thread(args.dbdir, args.uri, args.workers)
+        n = count_nodes(result)
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"[threads] {n} post(s) in {ms:.1f} ms", file=sys.stderr, flush=True)
+
+    if args.format == "json":
+        # flat, so threads thousands of replies deep don't recurse in json.dump
+        json.dump(result if args.quotes else flatten(result), sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    elif args.quotes:
+        for post in result:
+            print_tree(post)
+    else:
+        print_tree(result)
+
+
+if __name__ == "__main__":
+    main()
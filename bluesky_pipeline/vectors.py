@@ -0,0 +1,15 @@
+"""
+NumPy-only embedding helpers, kept free of pyarrow so the search and index
+commands can use them without importing it.
+"""
+import numpy as np
+
+EMBEDDING_DIM = 384  # for MiniLM
+
+
+def normalize_rows(vectors):
+    """(N, dim) -> float32 rows scaled to unit L2 norm (all-zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
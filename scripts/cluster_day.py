@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""Shim for ``bluesky-pipeline cluster``; the code lives in bluesky_pipeline/cluster_day.py."""
+import os
+import sys
+
+try:
+    from bluesky_pipeline.cli import run
+except ImportError:  # checkout without `pip install -e .`
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from bluesky_pipeline.cli import run
+
+if __name__ == "__main__":
+    sys.exit(run("cluster", sys.argv[1:]))
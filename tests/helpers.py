@@ -0,0 +1,105 @@
+"""
+Test data built through the real import path: flattened post records, as
+stream_to_file.py spools them, are written to hourly NDJSON files and
+imported by file_to_db.py into per-day DBs.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+
+from bluesky_pipeline import file_to_db
+from bluesky_pipeline.store_embeddings import store_batch
+from bluesky_pipeline.stream_to_file import hour_key_from_timeus
+from bluesky_pipeline.vectors import EMBEDDING_DIM, normalize_rows
+
+HOUR_US = 3_600 * 1_000_000
+DAY_US = 24 * HOUR_US
+DAY0_US = 1_754_006_400 * 1_000_000  # 2025-08-01T00:00:00Z
+DAY0, DAY1 = "2025-08-01", "2025-08-02"
+
+
+def iso(time_us):
+    dt = datetime.fromtimestamp(time_us / 1_000_000, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+
+def post(n, time_us, text=None, author=None, langs=("en",), reply_parent=None, reply_root=None,
+         quote_uri=None):
+    """One flattened post record, numbered ``n``."""
+    did = author or f"did:plc:author{n % 5}"
+    rkey = f"3k{n:011d}"
+    return {
+        "kind": "post",
+        "uri": f"at://{did}/app.bsky.feed.post/{rkey}",
+        "cid": f"bafy{rkey}",
+        "did": did,
+        "rkey": rkey,
+        "created_at": iso(time_us),
+        "time_us": time_us,
+        "text": text if text is not None else f"plain post number {n}",
+        "reply_parent": reply_parent,
+        "reply_root": reply_root,
+        "quote_uri": quote_uri,
+        "langs": list(langs),
+    }
+
+
+def mixed_posts(n, start_us=DAY0_US, step_us=HOUR_US // 2):
+    """``n`` posts every ``step_us``, cycling through langs, replies and quotes."""
+    posts = []
+    for i in range(n):
+        langs = (("en",), ("ja",), ("en", "es"), ())[i % 4]
+        parent = posts[i - 1]["uri"] if i % 3 == 1 else None
+        quote = posts[i // 2]["uri"] if i % 5 == 4 else None
+        posts.append(post(i, start_us + i * step_us, langs=langs, reply_parent=parent,
+                          reply_root=parent and (posts[i - 1]["reply_root"] or parent), quote_uri=quote))
+    return posts
+
+
+def spool(indir, posts):
+    """Append records to their ``{hour}.ndjson`` files."""
+    os.makedirs(indir, exist_ok=True)
+    by_hour = {}
+    for rec in posts:
+        by_hour.setdefault(hour_key_from_timeus(rec["time_us"]), []).append(rec)
+    for hour, records in by_hour.items():
+        with open(os.path.join(indir, f"{hour}.ndjson"), "a") as f:
+            for rec in records:
+                f.write(json.dumps(rec) + "\n")
+
+
+def run_import(tmp_path, fts=False):
+    """file_to_db.py over ``tmp_path/spool`` into ``tmp_path/db``; returns the DB dir."""
+    dbdir = str(tmp_path / "db")
+    args = ["--indir", str(tmp_path / "spool"), "--outdir", dbdir, "--state", str(tmp_path / "state")]
+    file_to_db.main(args + (["--fts"] if fts else []))
+    return dbdir
+
+
+def import_posts(tmp_path, posts, fts=False):
+    spool(str(tmp_path / "spool"), posts)
+    return run_import(tmp_path, fts)
+
+
+def day_db(dbdir, day):
+    return os.path.join(dbdir, f"posts_{day}.db")
+
+
+def embed(db_path, vectors=None, seed=0):
+    """
+    Store unit vectors for every post in time_us order (random unless given)
+    the way store_embeddings.py does; returns (uris, vectors).
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        uris = [uri for (uri,) in conn.execute("SELECT uri FROM posts ORDER BY time_us")]
+        if vectors is None:
+            vectors = np.random.default_rng(seed).standard_normal((len(uris), EMBEDDING_DIM))
+        vectors = normalize_rows(vectors)
+        store_batch(conn, uris, vectors)
+    finally:
+        conn.close()
+    return uris, vectors
@@ -0,0 +1,44 @@
+"""The benchmark's batch stages, run in-process against real day DBs."""
+import time
+
+import numpy as np
+import pytest
+
+from bluesky_pipeline import bench_pipeline, store_embeddings
+from bluesky_pipeline.vectors import EMBEDDING_DIM, normalize_rows
+
+from helpers import DAY0, DAY1, day_db, import_posts, mixed_posts
+
+
+class FakeModel:
+    def __init__(self):
+        self.rng = np.random.default_rng(0)
+
+    def encode(self, texts, **kwargs):
+        return normalize_rows(self.rng.standard_normal((len(texts), EMBEDDING_DIM)))
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    def sleep(seconds):
+        raise AssertionError(f"benchmark slept {seconds}s")
+    monkeypatch.setattr(store_embeddings, "load_model", lambda *a: FakeModel())
+    monkeypatch.setattr(time, "sleep", sleep)
+
+
+def test_bench_embed_times_only_the_work(tmp_path, no_sleep):
+    dbdir = import_posts(tmp_path, mixed_posts(80))
+    dbs = [day_db(dbdir, DAY0), day_db(dbdir, DAY1)]
+    english = bench_pipeline.count_rows(dbs, "lang_en = 1")
+
+    first = bench_pipeline.bench_embed(dbs, None, in_process=True)
+    assert first["posts"] == english
+    again = bench_pipeline.bench_embed(dbs, None, in_process=True)  # nothing pending: no idle sleep
+    assert again["posts"] == english and again["seconds"] < 5
+
+
+def test_embed_still_idles_by_default(tmp_path, no_sleep):
+    dbdir = import_posts(tmp_path, mixed_posts(4))
+    store_embeddings.main(["--db-path", day_db(dbdir, DAY0)])
+    with pytest.raises(AssertionError, match="slept 60"):
+        store_embeddings.main(["--db-path", day_db(dbdir, DAY0)])
@@ -0,0 +1,65 @@
+"""The bluesky-pipeline entry point, the scripts/ shims and lazy imports."""
+import datetime
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bluesky_pipeline import cli
+from bluesky_pipeline.dates import get_date_strings
+
+from helpers import DAY0, DAY0_US, HOUR_US, import_posts, post
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("torch", "sentence_transformers", "faiss", "pandas")
+
+
+def test_help_for_every_command_skips_heavy_imports():
+    code = f"""
+import sys
+from bluesky_pipeline import cli
+for command in cli.COMMANDS:
+    try:
+        cli.run(command, ["--help"])
+    except SystemExit as e:
+        assert e.code == 0, (command, e.code)
+print(sorted(m for m in {HEAVY!r} if m in sys.modules))
+"""
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True)
+    assert out.stdout.splitlines()[-1] == "[]"
+
+
+def test_usage_and_unknown_commands(capsys):
+    assert cli.main(["--help"]) == 0
+    assert "threads" in capsys.readouterr().out
+    assert cli.main([]) == 2
+    assert cli.main(["frobnicate"]) == 2
+    assert "unknown command 'frobnicate'" in capsys.readouterr().err
+
+
+def test_every_script_is_a_shim_for_a_command():
+    modules = {module for module, _ in cli.COMMANDS.values()}
+    scripts = {name[:-3] for name in os.listdir(os.path.join(ROOT, "scripts")) if name.endswith(".py")}
+    assert scripts <= modules
+
+    out = subprocess.run([sys.executable, os.path.join(ROOT, "scripts", "query_days.py"), "--help"],
+                         capture_output=True, text=True, check=True, cwd="/")
+    assert out.stdout.startswith("usage: bluesky-pipeline query")
+
+
+def test_run_restores_argv0_and_returns_main_result(tmp_path, capsys):
+    dbdir = import_posts(tmp_path, [post(i, DAY0_US + i * HOUR_US) for i in range(3)])
+    capsys.readouterr()
+    argv0 = sys.argv[0]
+    cli.run("query", ["--dbdir", dbdir, "--columns", "uri", "--limit", "2"])
+    assert sys.argv[0] == argv0
+    assert len([json.loads(line) for line in capsys.readouterr().out.splitlines()]) == 2
+    with pytest.raises(SystemExit):
+        cli.run("query", ["--no-such-flag"])
+    assert sys.argv[0] == argv0
+
+
+def test_date_strings_count_back_from_last_date():
+    assert get_date_strings(datetime.datetime(2025, 8, 2), 3) == ["2025-08-02", DAY0, "2025-07-31"]
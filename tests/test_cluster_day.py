@@ -0,0 +1,82 @@
+"""Streaming spherical k-means over a day's embeddings."""
+import sqlite3
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+from bluesky_pipeline import retire_days
+from bluesky_pipeline.cluster_day import cluster_day, reservoir_sample
+from bluesky_pipeline.posts_db import load_cold_catalog
+from bluesky_pipeline.vectors import EMBEDDING_DIM, normalize_rows
+
+from helpers import DAY0, HOUR_US, day_db, embed, import_posts, mixed_posts
+
+K = 4
+
+
+@pytest.fixture
+def topics(tmp_path):
+    """200 posts in one day whose vectors sit around K well-separated directions."""
+    dbdir = import_posts(tmp_path, mixed_posts(200, step_us=HOUR_US // 10))
+    rng = np.random.default_rng(1)
+    centers = normalize_rows(rng.standard_normal((K, EMBEDDING_DIM)))
+    truth = np.arange(200) % K
+    vectors = centers[truth] + 0.02 * rng.standard_normal((200, EMBEDDING_DIM))
+    uris, _ = embed(day_db(dbdir, DAY0), vectors)
+    return tmp_path, dbdir, dict(zip(uris, truth.tolist()))
+
+
+def assert_recovers(truth, labels):
+    """Every true topic maps onto exactly one cluster, and vice versa."""
+    pairs = {(truth[uri], label) for uri, label in labels.items()}
+    assert len(pairs) == K and len({t for t, _ in pairs}) == len({c for _, c in pairs}) == K
+
+
+def db_labels(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute(
+            "SELECT p.uri, c.cluster_id FROM post_clusters c JOIN posts p ON p.rowid = c.post_rowid"))
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("backend", ["numpy", "faiss"])
+def test_recovers_topics_streaming(topics, backend):
+    _, dbdir, truth = topics
+    db_path = day_db(dbdir, DAY0)
+    # sample and batches smaller than the day: reservoir, mini-batch and assignment all stream
+    summary = cluster_day(db_path, K, sample_size=60, batch=32, backend=backend)
+    assert summary["posts"] == 200 and summary["mean_similarity"] > 0.9
+    assert sorted(c["size"] for c in summary["clusters"]) == [50] * K
+
+    labels = db_labels(db_path)
+    assert len(labels) == 200
+    assert_recovers(truth, labels)
+    for c in summary["clusters"]:
+        assert len(c["representatives"]) == 5
+        assert {labels[r["uri"]] for r in c["representatives"]} == {c["cluster_id"]}
+
+    cluster_day(db_path, K, sample_size=60, batch=32, backend=backend, seed=3)  # replaces the run
+    assert len(db_labels(db_path)) == 200
+
+
+def test_retired_day_clusters_into_sidecars(topics):
+    tmp_path, dbdir, truth = topics
+    retire_days.main(["--dbdir", dbdir, "--cold-dir", str(tmp_path / "cold"), "--quiet-minutes", "0"])
+    parquet_path = load_cold_catalog(dbdir)[DAY0]["path"]
+    summary = cluster_day(parquet_path, K, sample_size=60, batch=32)
+    assert summary["posts"] == 200
+
+    clusters = pq.read_table(parquet_path[:-len(".parquet")] + ".clusters.parquet")
+    assert_recovers(truth, dict(zip(clusters.column("uri").to_pylist(), clusters.column("cluster_id").to_pylist())))
+    centroids = np.load(parquet_path[:-len(".parquet")] + ".centroids.npy")
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0, rtol=1e-5)
+
+
+def test_reservoir_sample_draws_distinct_rows(topics):
+    _, dbdir, _ = topics
+    sample, total = reservoir_sample(day_db(dbdir, DAY0), 50, 16, np.random.default_rng(0))
+    assert total == 200 and sample.shape == (50, EMBEDDING_DIM)
+    assert len({row.tobytes() for row in sample}) == 50
@@ -0,0 +1,67 @@
+"""Arrow IPC day snapshots: one record batch, memory-mapped back as an (N, 384) view."""
+import sqlite3
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from bluesky_pipeline.embedding_snapshots import as_matrix, load_embeddings, vectors_array
+from bluesky_pipeline.export_embeddings import export_arrow_day, export_parquet_single_pass
+
+from helpers import DAY0, DAY1, day_db, embed, import_posts, mixed_posts
+
+
+@pytest.fixture
+def day(tmp_path):
+    """DAY0 with every non-English post's embedding cleared: {uri: vector} of the rest, in time order."""
+    dbdir = import_posts(tmp_path, mixed_posts(80))
+    db_path = day_db(dbdir, DAY0)
+    uris, vectors = embed(db_path)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE posts SET has_embedding = 0, emb_vec = NULL WHERE lang_en = 0")
+        english = {uri for (uri,) in conn.execute("SELECT uri FROM posts WHERE lang_en = 1")}
+    out = tmp_path / "out"
+    out.mkdir()
+    yield conn, str(out), {u: v for u, v in zip(uris, vectors) if u in english}
+    conn.close()
+
+
+def test_arrow_day_is_one_mmapped_batch(day):
+    conn, out, expected = day
+    export_arrow_day(conn, DAY0, out)
+    path = f"{out}/posts-{DAY0}.arrow"
+
+    assert pa.ipc.open_file(pa.memory_map(path, "r")).num_record_batches == 1
+    table, vectors = load_embeddings(path)
+    assert table.column("uri").to_pylist() == list(expected)
+    np.testing.assert_array_equal(vectors, np.array(list(expected.values()), dtype=np.float32))
+    assert not vectors.flags.owndata and not vectors.flags.writeable  # a view of the read-only mmap
+    assert table.column("created_hour").type == pa.int32()
+
+
+def test_arrow_and_parquet_day_agree(day):
+    conn, out, expected = day
+    export_arrow_day(conn, DAY0, out)
+    export_parquet_single_pass(conn, DAY0, out, row_group_rows=7)
+    parquet = pq.read_table(f"{out}/posts-{DAY0}.parquet")
+    arrow, vectors = load_embeddings(f"{out}/posts-{DAY0}.arrow")
+    assert parquet.column("uri").to_pylist() == arrow.column("uri").to_pylist()
+    assert parquet.column("post_url").to_pylist() == arrow.column("post_url").to_pylist()
+    np.testing.assert_allclose(np.array(parquet.column("embedding").to_pylist()), vectors, rtol=1e-6)
+
+
+def test_day_without_embeddings_writes_nothing(day, tmp_path):
+    conn, out, _ = day
+    export_arrow_day(conn, DAY1, out)  # DAY1 is in another DB: nothing in range here
+    assert not (tmp_path / "out" / f"posts-{DAY1}.arrow").exists()
+    assert not conn.in_transaction
+
+
+def test_as_matrix_views_sliced_and_chunked_columns():
+    m = np.arange(5 * 384, dtype=np.float32).reshape(5, 384)
+    sliced = vectors_array(m).slice(2, 2)
+    np.testing.assert_array_equal(as_matrix(sliced), m[2:4])
+    chunked = pa.chunked_array([vectors_array(m[:2]), vectors_array(m[2:])])
+    np.testing.assert_array_equal(as_matrix(chunked), m)
@@ -0,0 +1,79 @@
+"""Day exports: the single ordered pass against hourly chunks plus consolidation."""
+import glob
+import os
+import sqlite3
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+from bluesky_pipeline import export_embeddings
+from bluesky_pipeline.bluesky_ingest import init_db
+from bluesky_pipeline.consolidate_exports import consolidate_day
+from bluesky_pipeline.export_embeddings import DAY_SCAN, day_range_us, export_parquet_single_pass
+from bluesky_pipeline.vectors import EMBEDDING_DIM
+
+from helpers import DAY0, DAY1, day_db, embed, import_posts, mixed_posts
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """The monolithic bluesky_posts.db: 3 posts an hour over DAY0-DAY1, every third without a vector."""
+    path = str(tmp_path / "bluesky_posts.db")
+    conn = init_db(path)
+    rng = np.random.default_rng(0)
+    rows = []
+    for day in (DAY0, DAY1):
+        for hour in (23, 0, 7, 12):  # inserted out of hour order
+            for i in range(3):
+                blob = rng.standard_normal(EMBEDDING_DIM).astype(np.float32).tobytes() if i != 2 else None
+                uri = f"at://did:plc:legacy/app.bsky.feed.post/{day}-{hour:02d}-{i}"
+                rows.append((uri, f"{day}T{hour:02d}:{i:02d}:00Z", day, hour, f"post {uri}", blob))
+    with conn:
+        conn.executemany("""INSERT INTO posts (uri, created_at, created_date, created_hour, text, embedding_blob)
+                            VALUES (?, ?, ?, ?, ?, ?)""", rows)
+    conn.close()
+    out = tmp_path / "out"
+    (out / "consolidated").mkdir(parents=True)
+    return path, str(out)
+
+
+def export(db_path, out, fmt):
+    export_embeddings.main(["--db-path", db_path, "--current-date", DAY1, "--output-dir", out, "--format", fmt])
+
+
+def test_single_pass_matches_consolidated_hourly_export(legacy_db):
+    db_path, out = legacy_db
+    export(db_path, out, "parquet")
+    assert len(glob.glob(f"{out}/posts-{DAY0}-*.parquet")) == 4  # the small files it replaces
+    consolidate_day(out, "consolidated", DAY0)
+    export(db_path, out, "parquet-day")
+
+    day = pq.read_table(f"{out}/posts-{DAY0}.parquet")
+    consolidated = pq.read_table(f"{out}/consolidated/posts-{DAY0}.parquet")
+    assert day.schema == consolidated.schema
+    assert day.num_rows == 8
+    assert day.column("created_hour").to_pylist() == [0, 0, 7, 7, 12, 12, 23, 23]
+    key = [("uri", "ascending")]
+    assert day.sort_by(key).to_pylist() == consolidated.sort_by(key).to_pylist()
+    assert not os.path.exists(f"{out}/posts-2025-07-31.parquet")  # no posts: no file
+
+
+def test_day_db_scan_is_ordered_and_row_grouped(tmp_path):
+    dbdir = import_posts(tmp_path, mixed_posts(80))
+    db_path = day_db(dbdir, DAY0)
+    embed(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:  # some rows without vectors are skipped
+            conn.execute("UPDATE posts SET has_embedding = 0, emb_vec = NULL WHERE lang_en = 0")
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + DAY_SCAN, day_range_us(DAY0)))
+        export_parquet_single_pass(conn, DAY0, str(tmp_path), row_group_rows=10)
+        english = [uri for (uri,) in conn.execute("SELECT uri FROM posts WHERE lang_en = 1 ORDER BY time_us")]
+    finally:
+        conn.close()
+    assert "idx_posts_timeus" in plan and "TEMP B-TREE" not in plan
+
+    parquet = pq.ParquetFile(f"{tmp_path}/posts-{DAY0}.parquet")
+    assert [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)] == [10, 10, 4]
+    assert parquet.read(columns=["uri"]).column("uri").to_pylist() == english
@@ -0,0 +1,45 @@
+"""The synthetic Jetstream firehose, as stream_to_file.py parses it."""
+import itertools
+import json
+
+from bluesky_pipeline.jetstream_replay import SyntheticFirehose, recorded_messages
+from bluesky_pipeline.stream_to_file import flatten_post_events, should_skip_event
+
+from helpers import DAY0_US
+
+
+def take(firehose, n):
+    return [json.loads(m) for m in itertools.islice(firehose, n)]
+
+
+def test_synthetic_feed_is_seeded():
+    a = take(SyntheticFirehose(seed=7, authors=50, start_us=DAY0_US), 500)
+    b = take(SyntheticFirehose(seed=7, authors=50, start_us=DAY0_US), 500)
+    assert a == b
+
+
+def test_synthetic_feed_mixes_posts_threads_and_noise():
+    events = take(SyntheticFirehose(seed=1, authors=50, noise=0.6, jitter_ms=250, start_us=DAY0_US), 4000)
+    posts = [flatten_post_events(ev) for ev in events if not should_skip_event(ev)]
+    assert 0.3 < len(posts) / len(events) < 0.5
+
+    seen, replies, quotes = set(), 0, 0
+    for rec in posts:
+        if rec["reply_parent"]:
+            replies += 1
+            assert rec["reply_parent"] in seen and rec["reply_root"] in seen
+        if rec["quote_uri"]:
+            quotes += 1
+            assert rec["quote_uri"] in seen
+        seen.add(rec["uri"])
+    assert replies > 0.2 * len(posts) and quotes > 0.05 * len(posts)
+
+    times = [ev["time_us"] for ev in events]
+    assert any(b < a for a, b in zip(times, times[1:]))  # jittered: out of order
+    assert max(a - b for a, b in zip(times, times[1:])) <= 250_000 + 2_000
+
+
+def test_recorded_messages_start_at_cursor(tmp_path):
+    path = tmp_path / "capture.ndjson"
+    path.write_text("".join(json.dumps({"time_us": t}) + "\n" for t in (10, 20, 30)) + "\n")
+    assert [json.loads(m)["time_us"] for m in recorded_messages(str(path), cursor=20)] == [20, 30]
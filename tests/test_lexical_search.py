@@ -0,0 +1,80 @@
+"""The posts_fts index file_to_db.py keeps in sync by triggers, and lexical search over it."""
+import sqlite3
+
+import pytest
+
+from bluesky_pipeline.posts_db import fts_match_expr
+from bluesky_pipeline.search import lexical_search
+
+from helpers import DAY0, DAY0_US, HOUR_US, day_db, import_posts, post, run_import, spool
+
+TEXTS = [
+    "learning #python on a rainy weekend",
+    "rust and python both compile today",
+    "coffee first, then code",
+    "thanks @alice.bsky.social for the photo",
+    "Café opening in the city",
+]
+
+
+@pytest.fixture
+def fts_db(tmp_path):
+    posts = [post(i, DAY0_US + i * HOUR_US, text) for i, text in enumerate(TEXTS)]
+    dbdir = import_posts(tmp_path, posts, fts=True)
+    return tmp_path, posts, day_db(dbdir, DAY0)
+
+
+def uris(hits):
+    return {uri for uri, _, _ in hits}
+
+
+def integrity_check(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("INSERT INTO posts_fts(posts_fts, rank) VALUES ('integrity-check', 1)")
+    finally:
+        conn.close()
+
+
+def test_match_expr_quotes_each_token():
+    assert fts_match_expr("#python  rust") == '"python" "rust"'
+    assert fts_match_expr("@alice.bsky.social") == '"alice bsky social"'
+    assert fts_match_expr("!!! ...") == ""
+
+
+def test_lexical_search_ranks_matches(fts_db):
+    _, posts, db_path = fts_db
+    assert uris(lexical_search([db_path], "#python", {}, 10)) == {posts[0]["uri"], posts[1]["uri"]}
+    assert uris(lexical_search([db_path], "@alice.bsky.social", {}, 10)) == {posts[3]["uri"]}
+    assert uris(lexical_search([db_path], "cafe", {}, 10)) == {posts[4]["uri"]}  # diacritics folded
+    hits = lexical_search([db_path], "python", {"until_us": DAY0_US + HOUR_US}, 10)
+    assert uris(hits) == {posts[0]["uri"]}
+    assert lexical_search([db_path], "python", {}, 1)[0][2] <= 0  # bm25: lower is better
+
+
+def test_triggers_follow_updates_and_deletes(fts_db):
+    tmp_path, posts, db_path = fts_db
+    edited = dict(posts[2], text="tea first, then code")
+    spool(str(tmp_path / "spool"), [edited])
+    run_import(tmp_path, fts=True)  # the UPSERT rewrites the text
+
+    assert uris(lexical_search([db_path], "coffee", {}, 10)) == set()
+    assert uris(lexical_search([db_path], "tea", {}, 10)) == {posts[2]["uri"]}
+
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("DELETE FROM posts WHERE uri = ?", (posts[0]["uri"],))
+    conn.close()
+    assert uris(lexical_search([db_path], "python", {}, 10)) == {posts[1]["uri"]}
+    integrity_check(db_path)
+
+
+def test_enabling_fts_later_indexes_existing_rows(tmp_path):
+    posts = [post(i, DAY0_US + i * HOUR_US, text) for i, text in enumerate(TEXTS)]
+    dbdir = import_posts(tmp_path, posts)
+    db_path = day_db(dbdir, DAY0)
+    assert lexical_search([db_path], "python", {}, 10) == []  # no posts_fts yet: skipped
+
+    run_import(tmp_path, fts=True)
+    assert uris(lexical_search([db_path], "python", {}, 10)) == {posts[0]["uri"], posts[1]["uri"]}
+    integrity_check(db_path)
@@ -0,0 +1,77 @@
+"""Prometheus text rendering and the windowed rate gauge."""
+import urllib.request
+
+import pytest
+
+from bluesky_pipeline.metrics import Registry, RateGauge
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def sample(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[1])
+    raise KeyError(name)
+
+
+def test_render_exposition_format():
+    registry = Registry()
+    registry.counter("rows_total", "Rows").inc(3)
+    hist = registry.histogram("batch_seconds", "Batch time", buckets=(0.1, 1.0))
+    hist.observe(0.05)
+    hist.observe(0.5)
+    text = registry.render()
+    assert "# TYPE rows_total counter\nrows_total 3\n" in text
+    assert 'batch_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'batch_seconds_bucket{le="1.0"} 2\n' in text
+    assert 'batch_seconds_bucket{le="+Inf"} 2\n' in text
+
+
+def test_rate_is_the_same_for_interleaved_readers():
+    clock = FakeClock()
+    registry = Registry()
+    events = registry.counter("events_total", "Events")
+    rate = registry._add(RateGauge("events_per_second", "Events/s", events, window=10.0, clock=clock))
+
+    readings = []
+    for tick in range(1, 41):  # 100 events/s, read twice per second by two consumers
+        clock.now = tick * 0.5
+        events.inc(50)
+        readings.append(sample(registry.render(), "events_per_second"))
+    assert readings[-20:] == [pytest.approx(100.0)] * 20
+    assert len(rate._samples) <= 12  # bounded by window / min_interval
+
+
+def test_rate_drops_to_zero_after_a_quiet_window():
+    clock = FakeClock()
+    counter = Registry().counter("events_total", "Events")
+    rate = RateGauge("events_per_second", "Events/s", counter, window=10.0, clock=clock)
+    clock.now = 5.0
+    counter.inc(500)
+    rate.update()
+    assert rate.value == pytest.approx(100.0)
+    clock.now = 30.0
+    rate.update()
+    clock.now = 31.0
+    rate.update()
+    assert rate.value == 0.0
+
+
+def test_serve_and_textfile_agree(tmp_path):
+    registry = Registry()
+    registry.counter("rows_total", "Rows").inc(7)
+    server = registry.serve(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as resp:
+            served = resp.read().decode()
+    finally:
+        server.shutdown()
+    registry.write_textfile(str(tmp_path / "m.prom"))
+    assert sample(served, "rows_total") == sample((tmp_path / "m.prom").read_text(), "rows_total") == 7
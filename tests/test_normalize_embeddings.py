@@ -0,0 +1,113 @@
+"""Unit-length stored vectors: the emb_norm migration and the inner-product index over them."""
+import os
+import sqlite3
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from bluesky_pipeline import normalize_embeddings
+from bluesky_pipeline.build_faiss import build_index
+from bluesky_pipeline.normalize_embeddings import normalize_db
+from bluesky_pipeline.posts_db import table_columns
+from bluesky_pipeline.store_embeddings import store_batch
+from bluesky_pipeline.vectors import EMBEDDING_DIM
+
+from helpers import DAY0, DAY1, day_db, import_posts, mixed_posts
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def raw_vectors(n, seed=0):
+    """MiniLM-like outputs: random directions at lengths well away from 1."""
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal((n, EMBEDDING_DIM)) * rng.uniform(0.5, 4.0, (n, 1))).astype(np.float32)
+
+
+def stored(db_path, column="emb_vec"):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(f"SELECT uri, {column}, emb_norm FROM posts ORDER BY uri").fetchall()
+    finally:
+        conn.close()
+    return {uri: (blob and np.frombuffer(blob, dtype=np.float32), flag) for uri, blob, flag in rows}
+
+
+@pytest.fixture
+def unnormalised_days(tmp_path):
+    """Two day DBs whose vectors were stored raw, before emb_norm existed: {db_path: {uri: vector}}."""
+    dbdir = import_posts(tmp_path, mixed_posts(60))
+    raw = {}
+    for seed, day in enumerate((DAY0, DAY1)):
+        conn = sqlite3.connect(day_db(dbdir, day))
+        try:
+            uris = [uri for (uri,) in conn.execute("SELECT uri FROM posts")]
+            vectors = raw_vectors(len(uris), seed)
+            store_batch(conn, uris, vectors)
+            conn.execute("UPDATE posts SET emb_norm = 0")
+            conn.commit()
+        finally:
+            conn.close()
+        raw[day_db(dbdir, day)] = dict(zip(uris, vectors))
+    return dbdir, raw
+
+
+def test_migration_normalises_in_place_and_reruns_as_a_no_op(unnormalised_days):
+    dbdir, raw = unnormalised_days
+    normalize_embeddings.main(["--dbdir", dbdir, "--batch", "7"])  # several batches per DB
+
+    for db_path, vectors in raw.items():
+        rows = stored(db_path)
+        assert rows.keys() == vectors.keys()
+        for uri, (vec, flag) in rows.items():
+            assert flag == 1
+            assert np.linalg.norm(vec) == pytest.approx(1.0, abs=1e-6)
+            expected = vectors[uri] / np.linalg.norm(vectors[uri])
+            np.testing.assert_allclose(vec, expected, atol=1e-6)
+
+    before = {db_path: stored(db_path) for db_path in raw}
+    assert [normalize_db(db_path) for db_path in raw] == [0, 0]
+    for db_path, rows in before.items():
+        assert {uri: vec.tobytes() for uri, (vec, _) in stored(db_path).items()} == \
+               {uri: vec.tobytes() for uri, (vec, _) in rows.items()}
+
+
+def test_legacy_db_gains_the_flag_and_skips_unusable_blobs(tmp_path):
+    db_path = str(tmp_path / "bluesky_posts.db")
+    vectors = raw_vectors(5)
+    conn = sqlite3.connect(db_path)
+    with conn:  # the legacy schema as it was before emb_norm
+        conn.execute("CREATE TABLE posts (uri TEXT PRIMARY KEY, text TEXT, embedding TEXT, embedding_blob BLOB)")
+        conn.executemany("INSERT INTO posts (uri, embedding_blob) VALUES (?, ?)",
+                         [(f"at://p{i}", v.tobytes()) for i, v in enumerate(vectors)]
+                         + [("at://none", None), ("at://short", vectors[0][:10].tobytes())])
+    assert "emb_norm" not in table_columns(conn)
+    conn.close()
+
+    assert normalize_db(db_path, batch_rows=2) == 5
+    rows = stored(db_path, "embedding_blob")
+    for i in range(5):
+        vec, flag = rows[f"at://p{i}"]
+        assert flag == 1 and np.linalg.norm(vec) == pytest.approx(1.0, abs=1e-6)
+    assert rows["at://none"] == (None, 0)
+    assert rows["at://short"][1] == 0  # wrong dimension: left for a human to look at
+
+
+def test_ip_index_scores_are_cosine_similarities():
+    vectors = raw_vectors(20)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = build_index(vectors)  # unnormalised input, as before the migration
+    scores, ids = index.search(unit[:3], 4)  # search.py normalises the query the same way
+    assert ids[:, 0].tolist() == [0, 1, 2]
+    assert scores[:, 0] == pytest.approx(1.0, abs=1e-5)
+    np.testing.assert_allclose(scores, np.take_along_axis(unit[:3] @ unit.T, ids, axis=1), atol=1e-5)
+    assert np.all(scores[:, 1:] < 1.0)
+
+
+def test_vector_helpers_do_not_import_pyarrow():
+    code = ("import sys\n"
+            "import bluesky_pipeline.search, bluesky_pipeline.build_faiss, bluesky_pipeline.normalize_embeddings\n"
+            "print('pyarrow' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True)
+    assert out.stdout.strip() == "False"
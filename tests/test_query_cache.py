@@ -0,0 +1,51 @@
+"""The search path's embedding and result caches, and when cached results go stale."""
+from bluesky_pipeline.query_cache import LRUCache, TTLCache, normalize_query
+from bluesky_pipeline.search import Searcher
+
+from helpers import DAY0, DAY0_US, HOUR_US, day_db, import_posts, post
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query_folds_case_and_whitespace():
+    assert normalize_query("  Rust\tAND  python ") == "rust and python"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # "b" is now least recent
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 2}
+
+
+def test_ttl_entries_expire():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10.0, clock=clock)
+    cache.put("q", ["hit"])
+    clock.now = 9.9
+    assert cache.get("q") == ["hit"]
+    clock.now = 10.0
+    assert cache.get("q") is None
+    assert len(cache) == 0
+
+
+def test_lexical_results_see_new_imports_within_ttl(tmp_path):
+    dbdir = import_posts(tmp_path, [post(0, DAY0_US, "python on mondays")], fts=True)
+    searcher = Searcher(tmp_path / "no_index", [day_db(dbdir, DAY0)], {}, result_ttl=3600)
+
+    first, _ = searcher.search("python", mode="lexical")
+    assert searcher.search("Python ", mode="lexical")[0] == first  # cached
+    assert searcher.results.hits == 1
+
+    import_posts(tmp_path, [post(1, DAY0_US + HOUR_US, "python on tuesdays")], fts=True)
+    hits, _ = searcher.search("python", mode="lexical")
+    assert len(first) == 1 and len(hits) == 2
@@ -0,0 +1,68 @@
+"""Federated queries over the per-day DBs: pruning, ordering and aggregation."""
+import json
+import os
+
+import pytest
+
+from bluesky_pipeline import query_days
+from bluesky_pipeline.query_days import build_sql, count_by, iter_rows, select_db_paths
+
+from helpers import DAY0, DAY0_US, DAY1, DAY_US, HOUR_US, import_posts, mixed_posts
+
+
+@pytest.fixture
+def three_days(tmp_path):
+    posts = mixed_posts(144)  # 72 hours
+    return posts, import_posts(tmp_path, posts)
+
+
+def days(paths):
+    return [os.path.basename(p) for p in paths]
+
+
+def test_pruning_opens_only_overlapping_days(three_days):
+    _, dbdir = three_days
+    assert days(select_db_paths(dbdir, {})) == [f"posts_{d}.db" for d in (DAY0, DAY1, "2025-08-03")]
+    filters = {"since_us": DAY0_US + 30 * HOUR_US, "until_us": DAY0_US + 2 * DAY_US}
+    assert days(select_db_paths(dbdir, filters)) == [f"posts_{DAY1}.db"]
+    assert days(select_db_paths(dbdir, {}, days=[DAY0, "2025-08-03"])) == [
+        f"posts_{DAY0}.db", "posts_2025-08-03.db"]
+
+
+def test_main_streams_filtered_rows_in_time_order(three_days, capsys):
+    posts, dbdir = three_days
+    query_days.main(["--dbdir", dbdir, "--since", "2025-08-01T20", "--until", "2025-08-03T04",
+                     "--lang-en", "--no-replies", "--columns", "uri,time_us"])
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    expected = [p for p in posts
+                if DAY0_US + 20 * HOUR_US <= p["time_us"] < DAY0_US + 52 * HOUR_US
+                and "en" in p["langs"] and p["reply_parent"] is None]
+    assert [r["uri"] for r in rows] == [p["uri"] for p in expected]
+    assert [r["time_us"] for r in rows] == sorted(r["time_us"] for r in rows)
+
+
+def test_count_by_sums_across_days(three_days):
+    posts, dbdir = three_days
+    totals = count_by(select_db_paths(dbdir, {}), ["lang_en", "is_reply"], {})
+    expected = {}
+    for p in posts:
+        key = (int("en" in p["langs"]), int(p["reply_parent"] is not None))
+        expected[key] = expected.get(key, 0) + 1
+    assert totals == expected
+
+
+def test_early_stop_releases_workers(three_days, monkeypatch):
+    _, dbdir = three_days
+    monkeypatch.setattr(query_days, "FETCH_ROWS", 2)
+    monkeypatch.setattr(query_days, "PREFETCH_CHUNKS", 1)
+    sql, params = build_sql("uri", {}, order_by="time_us")
+    rows = iter_rows(select_db_paths(dbdir, {}), sql, params, workers=3)
+    assert len([next(rows) for _ in range(5)]) == 5
+    rows.close()  # would hang if a producer stayed blocked on its full queue
+
+
+def test_worker_errors_name_the_day(three_days):
+    _, dbdir = three_days
+    sql, params = build_sql("no_such_column", {})
+    with pytest.raises(RuntimeError, match=f"posts_{DAY0}.db"):
+        list(iter_rows(select_db_paths(dbdir, {}), sql, params))
@@ -0,0 +1,107 @@
+"""Retiring day DBs to cold Parquet, and reading them back through the cold catalog."""
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+from bluesky_pipeline import retire_days
+from bluesky_pipeline.cluster_day import cluster_day
+from bluesky_pipeline.embedding_snapshots import as_matrix
+from bluesky_pipeline.posts_db import (EDGE_QUOTE, EDGE_REPLY, KEY_POST, keys_sidecar,
+                                       load_cold_catalog, partition_paths, resolve_partitions)
+from bluesky_pipeline.query_days import build_sql, iter_rows
+
+from helpers import DAY0, DAY1, day_db, embed, import_posts, mixed_posts
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """Two imported, embedded days; DAY0 also clustered."""
+    posts = mixed_posts(80)
+    dbdir = import_posts(tmp_path, posts, fts=True)
+    vectors = {}
+    for day in (DAY0, DAY1):
+        uris, vecs = embed(day_db(dbdir, day), seed=len(vectors))
+        vectors.update(zip(uris, vecs))
+    cluster_day(day_db(dbdir, DAY0), k=3, batch=16)
+    return posts, vectors, dbdir, str(tmp_path / "cold")
+
+
+def retire(dbdir, cold_dir, *extra):
+    retire_days.main(["--dbdir", dbdir, "--cold-dir", cold_dir, "--quiet-minutes", "0", *extra])
+
+
+def all_rows(dbdir):
+    sql, params = build_sql("uri, time_us, text", {}, order_by="time_us")
+    return list(iter_rows(partition_paths(dbdir), sql, params))
+
+
+def test_retired_days_read_back_through_the_catalog(archive):
+    posts, vectors, dbdir, cold_dir = archive
+    before = all_rows(dbdir)
+    retire(dbdir, cold_dir)
+
+    catalog = load_cold_catalog(dbdir)
+    assert sorted(catalog) == [DAY0, DAY1]
+    assert not os.path.exists(day_db(dbdir, DAY0))
+    assert [os.path.basename(p) for p in partition_paths(dbdir)] == [
+        f"posts_{DAY0}.parquet", f"posts_{DAY1}.parquet"]
+    paths, missing = resolve_partitions([day_db(dbdir, DAY0), day_db(dbdir, "2025-07-01")])
+    assert paths == [catalog[DAY0]["path"]] and missing == [day_db(dbdir, "2025-07-01")]
+    assert all_rows(dbdir) == before
+
+    table = pq.read_table(catalog[DAY0]["path"])
+    assert table.num_rows == catalog[DAY0]["rows"] == 48
+    assert table.column("time_us").to_pylist() == sorted(table.column("time_us").to_pylist())
+    matrix = as_matrix(table.column("embedding"))
+    for uri, vec in zip(table.column("uri").to_pylist(), matrix):
+        np.testing.assert_array_equal(vec, vectors[uri].astype(np.float32))
+
+
+def test_sidecars_hold_keys_and_clusters(archive):
+    posts, _, dbdir, cold_dir = archive
+    retire(dbdir, cold_dir)
+    parquet_path = load_cold_catalog(dbdir)[DAY0]["path"]
+    uris = pq.read_table(parquet_path, columns=["uri"]).column("uri").to_pylist()
+
+    keys = pq.read_table(keys_sidecar(parquet_path)).to_pylist()
+    assert [k["key"] for k in keys] == sorted(k["key"] for k in keys)
+    by_kind = {}
+    for k in keys:
+        by_kind.setdefault(k["kind"], []).append((k["key"], uris[k["row"]]))
+    assert sorted(by_kind[KEY_POST]) == sorted((u, u) for u in uris)
+    day_posts = [p for p in posts if p["uri"] in set(uris)]
+    assert sorted(by_kind[EDGE_REPLY]) == sorted((p["reply_parent"], p["uri"]) for p in day_posts
+                                                 if p["reply_parent"])
+    assert sorted(by_kind[EDGE_QUOTE]) == sorted((p["quote_uri"], p["uri"]) for p in day_posts
+                                                 if p["quote_uri"])
+
+    base = parquet_path[:-len(".parquet")]
+    clusters = pq.read_table(base + ".clusters.parquet")
+    assert sorted(clusters.column("uri").to_pylist()) == sorted(uris)
+    assert np.load(base + ".centroids.npy").shape[0] == 3
+    assert not os.path.exists(base.replace(DAY0, DAY1) + ".clusters.parquet")  # DAY1 never clustered
+
+
+def test_keep_sqlite_reruns_skip_retired_days(archive):
+    posts, _, dbdir, cold_dir = archive
+    retire(dbdir, cold_dir, "--keep-sqlite")
+    parquet_path = load_cold_catalog(dbdir)[DAY0]["path"]
+    stamp = os.stat(parquet_path).st_mtime_ns
+
+    conn = sqlite3.connect(day_db(dbdir, DAY0))
+    try:
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        assert conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] == 48
+    finally:
+        conn.close()
+    assert not tables & {"posts_fts", "edges", "uri_ids", "post_clusters", "topic_clusters"}
+
+    with open(os.path.join(dbdir, "cold_catalog.json")) as f:
+        catalog = json.load(f)
+    retire(dbdir, cold_dir, "--keep-sqlite")  # used to fail in export_clusters and rewrite every day
+    assert os.stat(parquet_path).st_mtime_ns == stamp
+    assert load_cold_catalog(dbdir) == catalog
@@ -0,0 +1,89 @@
+"""hourly_counts / hourly_authors kept by file_to_db.py, and query_days.py reading them."""
+import shutil
+import sqlite3
+
+import pytest
+
+from bluesky_pipeline import retire_days
+from bluesky_pipeline.query_days import count_by, rollup, select_db_paths
+
+from helpers import DAY0, DAY0_US, HOUR_US, day_db, import_posts, iso, mixed_posts, post, run_import, spool
+
+GROUP = ["created_hour", "lang_en", "is_reply", "is_quote"]
+
+
+def scanned(dbdir, filters=None):
+    """The rollup recomputed by scanning posts."""
+    return count_by(select_db_paths(dbdir, filters or {}), GROUP, filters or {})
+
+
+def rolled_up(dbdir, filters=None, **kwargs):
+    return rollup(select_db_paths(dbdir, filters or {}), filters or {}, **kwargs)
+
+
+@pytest.fixture
+def imported(tmp_path):
+    posts = mixed_posts(80)
+    return tmp_path, posts, import_posts(tmp_path, posts)
+
+
+def test_counts_match_a_posts_scan(imported):
+    _, posts, dbdir = imported
+    assert rolled_up(dbdir) == scanned(dbdir)
+    assert sum(rolled_up(dbdir).values()) == len(posts)
+    filters = {"since_us": DAY0_US + 10 * HOUR_US, "until_us": DAY0_US + 30 * HOUR_US, "lang_en": True}
+    assert rolled_up(dbdir, filters) == scanned(dbdir, filters)
+    by_day = rolled_up(dbdir, by="day")
+    assert {key[0] for key in by_day} == {"2025-08-01", "2025-08-02"}
+
+
+def test_counts_follow_upserts_and_deletes(imported):
+    tmp_path, posts, dbdir = imported
+    before = rolled_up(dbdir)
+    moved = iso(posts[0]["time_us"] + 3 * HOUR_US)  # client clock: created_hour moves, partition doesn't
+    spool(str(tmp_path / "spool"), [dict(posts[0], langs=["ja"], created_at=moved)])
+    run_import(tmp_path)
+    shutil.rmtree(tmp_path / "state")  # every line upserted again: no double counting
+    run_import(tmp_path)
+
+    conn = sqlite3.connect(day_db(dbdir, DAY0))
+    with conn:
+        conn.execute("DELETE FROM posts WHERE uri = ?", (posts[5]["uri"],))
+    conn.close()
+
+    after = rolled_up(dbdir)
+    assert after == scanned(dbdir)
+    assert after.get(("2025-08-01T00", 1, 0, 0), 0) == before[("2025-08-01T00", 1, 0, 0)] - 1
+    assert after[("2025-08-01T03", 0, 0, 0)] == before.get(("2025-08-01T03", 0, 0, 0), 0) + 1
+    assert sum(after.values()) == len(posts) - 1
+
+
+def test_distinct_authors_merge_across_hours(tmp_path):
+    posts = [post(i, DAY0_US + (i % 12) * HOUR_US, author=f"did:plc:a{i % 400}") for i in range(1200)]
+    dbdir = import_posts(tmp_path, posts)
+    per_hour = rolled_up(dbdir, kind="authors")
+    assert len(per_hour) == 12
+    assert all(abs(n - 100) <= 3 for n in per_hour.values())  # 400 authors over 12 hours: 100 each
+    assert abs(rolled_up(dbdir, kind="authors", by="day")[(DAY0,)] - 400) <= 0.05 * 400
+    with pytest.raises(ValueError):
+        rolled_up(dbdir, {"lang_en": True}, kind="authors")
+
+
+def test_existing_db_is_seeded(imported):
+    tmp_path, _, dbdir = imported
+    expected = rolled_up(dbdir), rolled_up(dbdir, kind="authors")
+    conn = sqlite3.connect(day_db(dbdir, DAY0))
+    conn.executescript("""
+        DROP TRIGGER posts_rollup_ai; DROP TRIGGER posts_rollup_ad; DROP TRIGGER posts_rollup_au;
+        DROP TABLE hourly_counts; DROP TABLE hourly_authors;""")
+    conn.close()
+    run_import(tmp_path)  # nothing new to import; ensure_rollups rebuilds from posts
+    assert (rolled_up(dbdir), rolled_up(dbdir, kind="authors")) == expected
+
+
+def test_retired_days_aggregate_from_parquet(imported):
+    tmp_path, _, dbdir = imported
+    expected = rolled_up(dbdir), rolled_up(dbdir, kind="authors", by="day")
+    retire_days.main(["--dbdir", dbdir, "--cold-dir", str(tmp_path / "cold"), "--quiet-minutes", "0"])
+    assert all(p.endswith(".parquet") for p in select_db_paths(dbdir, {}))
+    assert (rolled_up(dbdir), rolled_up(dbdir, kind="authors", by="day")) == expected
@@ -0,0 +1,77 @@
+"""Metadata filters: argument parsing, SQL, and the index mask search.py builds from them."""
+import argparse
+import shutil
+import sqlite3
+
+import pytest
+
+from bluesky_pipeline.posts_db import add_filter_args, filters_from_args
+from bluesky_pipeline.search import filter_mask, uri_positions
+
+from helpers import DAY0, DAY0_US, DAY1, DAY_US, HOUR_US, day_db, embed, import_posts, mixed_posts, run_import
+
+
+def parse_filters(*argv):
+    parser = argparse.ArgumentParser()
+    add_filter_args(parser)
+    return filters_from_args(parser.parse_args(list(argv)), now_us=DAY0_US + 40 * HOUR_US)
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    """Two imported, embedded days: (posts, index metadata over both, day DB paths)."""
+    posts = mixed_posts(80)  # 40 hours: both days
+    dbdir = import_posts(tmp_path, posts)
+    metadata = []
+    for day in (DAY0, DAY1):
+        uris, _ = embed(day_db(dbdir, day))
+        metadata += [{"uri": uri, "text": ""} for uri in uris]
+    return posts, metadata, [day_db(dbdir, DAY0), day_db(dbdir, DAY1)]
+
+
+@pytest.mark.parametrize("argv, keep", [
+    ((), lambda p: True),
+    (("--lang-en",), lambda p: "en" in p["langs"]),
+    (("--no-replies",), lambda p: p["reply_parent"] is None),
+    (("--replies-only", "--lang-en"), lambda p: p["reply_parent"] is not None and "en" in p["langs"]),
+    (("--quotes-only",), lambda p: p["quote_uri"] is not None),
+    (("--author", "did:plc:author1", "--author", "did:plc:author3"),
+     lambda p: p["did"] in ("did:plc:author1", "did:plc:author3")),
+    (("--since", "2025-08-02"), lambda p: p["time_us"] >= DAY0_US + DAY_US),
+    (("--since", "2025-08-01T10", "--until", "2025-08-02T02"),
+     lambda p: DAY0_US + 10 * HOUR_US <= p["time_us"] < DAY0_US + 26 * HOUR_US),
+    (("--since-hours", "6", "--no-quotes"),
+     lambda p: p["time_us"] >= DAY0_US + 34 * HOUR_US and p["quote_uri"] is None),
+])
+def test_filter_mask_matches_predicate(indexed, argv, keep):
+    posts, metadata, db_paths = indexed
+    mask = filter_mask(metadata, uri_positions(metadata), db_paths, parse_filters(*argv))
+    expected = {p["uri"] for p in posts if keep(p)}
+    assert {m["uri"] for m, hit in zip(metadata, mask) if hit} == expected
+
+
+def test_unindexed_posts_stay_out_of_the_mask(indexed):
+    posts, metadata, db_paths = indexed
+    half = metadata[::2]
+    mask = filter_mask(half, uri_positions(half), db_paths, parse_filters("--lang-en"))
+    assert len(mask) == len(half)
+    assert all(m["uri"] in {p["uri"] for p in posts if "en" in p["langs"]}
+               for m, hit in zip(half, mask) if hit)
+
+
+def test_reimport_keeps_embedding_metadata(tmp_path):
+    dbdir = import_posts(tmp_path, mixed_posts(20))
+    db_path = day_db(dbdir, DAY0)
+    embed(db_path)
+
+    shutil.rmtree(tmp_path / "state")  # forget the checkpoints: every line is upserted again
+    run_import(tmp_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        counts = conn.execute("""
+            SELECT COUNT(*), SUM(has_embedding), COUNT(emb_vec), COUNT(emb_model), COUNT(emb_dims)
+            FROM posts""").fetchone()
+    finally:
+        conn.close()
+    assert counts == (20, 20, 20, 20, 20)
@@ -0,0 +1,28 @@
+"""HyperLogLog sketches as stored in hourly_authors."""
+import pytest
+
+from bluesky_pipeline.sketches import HyperLogLog
+
+
+def test_merged_sketch_matches_union_within_error_bound():
+    hours = [HyperLogLog().update(f"did:plc:{i % 50_000}" for i in range(h * 12_000, (h + 2) * 12_000))
+             for h in range(4)]
+    merged = HyperLogLog()
+    for sketch in hours:
+        merged.merge(HyperLogLog.from_bytes(sketch.to_bytes()))
+
+    union = HyperLogLog().update(f"did:plc:{i}" for i in range(50_000))
+    assert merged.registers == union.registers  # merging is lossless
+    std_error = 1.04 / (merged.m ** 0.5)
+    assert abs(merged.estimate() - 50_000) <= 4 * std_error * 50_000
+
+
+def test_merge_rejects_mismatched_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(p=12).merge(HyperLogLog(p=10))
+
+
+def test_small_sets_are_counted_almost_exactly():
+    sketch = HyperLogLog().update(f"did:plc:{i}" for i in range(300))
+    restored = HyperLogLog.from_bytes(sketch.to_bytes())
+    assert restored.p == sketch.p and abs(len(restored) - 300) <= 3
@@ -0,0 +1,184 @@
+"""Segment rolling and replay dedup in the stream spooler."""
+import json
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from bluesky_pipeline import stream_to_file
+from bluesky_pipeline.bench_pipeline import child_env, command, free_port, wait_for_port
+from bluesky_pipeline.stream_to_file import RecentURIs, SegmentWriter, hour_key_from_timeus, seed_recent_uris
+
+NOW_HOUR = "2026-01-01T05"
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(stream_to_file, "current_hour_key", lambda: NOW_HOUR)
+    segments = SegmentWriter(str(tmp_path), max_open=2)
+    yield segments
+    for hour in list(segments.handles):
+        segments.close(hour, roll=False)
+
+
+def read(tmp_path, name):
+    path = tmp_path / name
+    return path.read_text().splitlines() if path.exists() else None
+
+# ---- hour keys -------------------------------------------------------------
+
+@pytest.mark.parametrize("time_us", [0, 1_754_006_400_000_000, 1_754_009_999_999_999, 1_767_243_600_123_456])
+def test_hour_key_matches_strftime(time_us):
+    expected = datetime.fromtimestamp(time_us / 1_000_000, tz=timezone.utc).strftime("%Y-%m-%dT%H")
+    assert hour_key_from_timeus(time_us) == expected
+
+# ---- SegmentWriter ---------------------------------------------------------
+
+def test_evicts_least_recently_written_hour(writer, tmp_path):
+    writer.write("2026-01-01T01", "a1\n")
+    writer.write("2026-01-01T02", "b1\n")
+    writer.write("2026-01-01T01", "a2\n")
+    writer.write("2026-01-01T03", "c1\n")  # T02 is now least recent
+
+    assert list(writer.handles) == ["2026-01-01T01", "2026-01-01T03"]
+    assert read(tmp_path, "2026-01-01T02.ndjson") == ["b1"]
+    assert not (tmp_path / "2026-01-01T02.ndjson.part").exists()
+
+
+def test_reopened_past_hour_appends_in_order(writer, tmp_path):
+    writer.write("2026-01-01T01", "a1\n")
+    writer.write("2026-01-01T02", "b1\n")
+    writer.write("2026-01-01T03", "c1\n")  # rolls T01
+    writer.write("2026-01-01T01", "a2\n")  # late event: reopens T01, rolls T02
+    writer.flush(roll=True)
+
+    assert read(tmp_path, "2026-01-01T01.ndjson") == ["a1", "a2"]
+    assert read(tmp_path, "2026-01-01T02.ndjson") == ["b1"]
+    assert len(writer) == 0
+
+
+def test_current_hour_is_closed_not_rolled(tmp_path, monkeypatch):
+    monkeypatch.setattr(stream_to_file, "current_hour_key", lambda: NOW_HOUR)
+    writer = SegmentWriter(str(tmp_path), max_open=1)
+    writer.write(NOW_HOUR, "n1\n")
+    writer.write("2026-01-01T04", "p1\n")  # evicts the current hour
+    writer.write(NOW_HOUR, "n2\n")         # evicts and rolls T04
+
+    assert read(tmp_path, f"{NOW_HOUR}.ndjson") is None
+    assert read(tmp_path, "2026-01-01T04.ndjson") == ["p1"]
+    writer.close(NOW_HOUR, roll=False)
+    assert read(tmp_path, f"{NOW_HOUR}.ndjson.part") == ["n1", "n2"]
+
+
+def test_flush_rolls_only_when_an_hour_mark_moves(tmp_path, monkeypatch):
+    monkeypatch.setattr(stream_to_file, "current_hour_key", lambda: NOW_HOUR)
+    writer = SegmentWriter(str(tmp_path), max_open=8)
+    for hour in ("2026-01-01T01", "2026-01-01T02", "2026-01-01T03"):
+        writer.write(hour, f"{hour}\n")
+
+    writer.flush()  # first flush: keep the wall-clock and newest event hours
+    assert list(writer.handles) == ["2026-01-01T03"]
+
+    writer.write("2026-01-01T02", "late\n")
+    writer.flush()  # neither mark moved: nothing rolled
+    assert set(writer.handles) == {"2026-01-01T02", "2026-01-01T03"}
+
+    writer.write("2026-01-01T04", "next\n")
+    writer.flush()  # newest event hour moved on
+    assert list(writer.handles) == ["2026-01-01T04"]
+    assert read(tmp_path, "2026-01-01T02.ndjson") == ["2026-01-01T02", "late"]
+    writer.close("2026-01-01T04", roll=False)
+
+
+def test_catchup_buffering_rolls_past_hours(writer, tmp_path):
+    writer.write("2026-01-01T03", "a1\n")
+    writer.write(NOW_HOUR, "n1\n")
+    writer.set_buffering(1 << 20)  # catch-up mode: reopened on demand, buffered
+    assert len(writer) == 0
+    assert read(tmp_path, "2026-01-01T03.ndjson") == ["a1"]
+    assert read(tmp_path, f"{NOW_HOUR}.ndjson.part") == ["n1"]
+
+    writer.write(NOW_HOUR, "n2\n")
+    assert writer.handles[NOW_HOUR].line_buffering is False
+    writer.flush()
+    assert read(tmp_path, f"{NOW_HOUR}.ndjson.part") == ["n1", "n2"]
+
+# ---- replay dedup ----------------------------------------------------------
+
+def test_recent_uris_expire_after_window():
+    recent = RecentURIs(window_seconds=120, bucket_seconds=60)
+    t0 = 1_000 * 60_000_000
+    assert recent.add("at://a", t0)
+    assert not recent.add("at://a", t0 + 30_000_000)
+    recent.add("at://b", t0 + 180_000_000)  # two buckets later: t0's bucket drops
+    assert recent.add("at://a", t0 + 180_000_000)
+
+
+def test_seed_recent_uris_dedups_across_restart(tmp_path):
+    now_us = int(time.time()) * 1_000_000
+    since_us = now_us - 60_000_000  # inside the dedup window
+    records = [
+        {"uri": "at://old", "time_us": since_us - 1},  # before the cursor: not seeded
+        {"uri": "at://done", "time_us": since_us},
+        {"uri": "at://spooled", "time_us": now_us},
+    ]
+    with open(tmp_path / f"{hour_key_from_timeus(since_us)}.ndjson", "w") as f:
+        for rec in records[:2]:
+            f.write(json.dumps(rec) + "\n")
+    with open(tmp_path / f"{hour_key_from_timeus(now_us)}.ndjson.part", "w") as f:
+        f.write(json.dumps(records[2]) + "\n")
+        f.write('{"uri": "at://torn", "ti')  # crash mid-write
+
+    recent = RecentURIs()
+    assert seed_recent_uris(recent, str(tmp_path), since_us) == 2
+    # the replay from the cursor re-delivers what was already spooled
+    assert not recent.add("at://done", since_us)
+    assert not recent.add("at://spooled", now_us)
+    assert recent.add("at://old", since_us)
+    assert recent.add("at://torn", now_us)
+
+
+def stream_once(outdir, capture, count):
+    """Serve ``count`` messages of ``capture`` (0 = all) to one stream_to_file.py run."""
+    port = free_port()
+    replay = subprocess.Popen(
+        [sys.executable, *command("replay"), "--port", str(port), "--replay", str(capture),
+         "--rate", "0", "--count", str(count), "--once"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=child_env())
+    try:
+        wait_for_port(port)
+        out = subprocess.run(
+            [sys.executable, *command("stream"), "--outdir", str(outdir),
+             "--url", f"ws://127.0.0.1:{port}/subscribe"],
+            check=True, capture_output=True, text=True, env=child_env(), timeout=60).stdout
+        replay.wait(timeout=30)
+    finally:
+        if replay.poll() is None:
+            replay.kill()
+    return out
+
+
+def test_restart_replays_from_cursor_without_duplicates(tmp_path):
+    start_us = (int(time.time()) - 7200) * 1_000_000  # two hours behind: catch-up mode
+    capture = tmp_path / "capture.ndjson"
+    with open(capture, "w") as f:
+        for i in range(300):
+            rkey = f"3k{i:011d}"
+            f.write(json.dumps({
+                "did": "did:plc:replay", "time_us": start_us + i * 100_000, "kind": "commit",
+                "commit": {"rev": rkey, "operation": "create", "collection": "app.bsky.feed.post",
+                           "rkey": rkey, "cid": f"bafy{rkey}",
+                           "record": {"text": f"post {i}", "createdAt": "", "langs": ["en"]}},
+            }) + "\n")
+
+    outdir = tmp_path / "spool"
+    first = stream_once(outdir, capture, 200)
+    assert "[catchup] lag" in first
+    second = stream_once(outdir, capture, 0)  # rewinds 5s before the cursor: 50 replayed
+    assert "[dedup] seeded 200 recent URIs" in second
+
+    uris = [json.loads(line)["uri"] for path in outdir.glob("*.ndjson*")
+            for line in path.read_text().splitlines()]
+    assert len(uris) == len(set(uris)) == 300
@@ -0,0 +1,98 @@
+"""Thread trees and quotes from the reply/quote graph, hot and cold."""
+import json
+import os
+
+import pytest
+
+from bluesky_pipeline import retire_days, threads
+from bluesky_pipeline.posts_db import keys_sidecar, load_cold_catalog
+
+from helpers import DAY0_US, HOUR_US, import_posts, post, run_import, spool
+
+
+def reply(n, time_us, parent, root, **kwargs):
+    return post(n, time_us, reply_parent=parent["uri"], reply_root=root["uri"], **kwargs)
+
+
+@pytest.fixture
+def conversation(tmp_path):
+    """
+    root (day 0) <- a <- b, root <- c (day 1), a <- d;  q quotes root;
+    e replies to a post that was never ingested.
+    """
+    t = DAY0_US + HOUR_US
+    root = post(0, t, "root post")
+    missing = post(99, t, "never ingested")
+    a = reply(1, t + 1, root, root)
+    b = reply(2, t + 2, a, root)
+    c = reply(3, t + 30 * HOUR_US, root, root)
+    d = reply(4, t + 31 * HOUR_US, a, root)
+    e = reply(5, t + 32 * HOUR_US, missing, root)
+    q = post(6, t + 33 * HOUR_US, "quoting", quote_uri=root["uri"])
+    other = post(7, t + 3, "unrelated")
+    posts = [root, a, b, c, d, e, q, other]
+    names = ("root", "a", "b", "c", "d", "e", "q", "other")
+    return tmp_path, dict(zip(names, posts)), import_posts(tmp_path, posts)
+
+
+def shape(tree):
+    """{uri: [child uris]} of a thread tree."""
+    return {node["uri"]: [c["uri"] for c in node["replies"]] for node, _, _ in threads.walk(tree)}
+
+
+def expected_shape(p):
+    root = p["root"]
+    return {root["uri"]: [p["a"]["uri"], p["c"]["uri"], p["e"]["uri"]],
+            p["a"]["uri"]: [p["b"]["uri"], p["d"]["uri"]],
+            p["b"]["uri"]: [], p["c"]["uri"]: [], p["d"]["uri"]: [], p["e"]["uri"]: []}
+
+
+def test_thread_from_any_member(conversation):
+    _, p, dbdir = conversation
+    for member in ("root", "b", "d"):
+        tree = threads.thread(dbdir, p[member]["uri"])
+        assert shape(tree) == expected_shape(p)
+    assert [n["orphan"] for n in tree["replies"] if n.get("orphan")] == [True]
+    assert [q["uri"] for q in threads.quotes(dbdir, p["root"]["uri"])] == [p["q"]["uri"]]
+
+
+@pytest.mark.parametrize("keys", [True, False])
+def test_cold_days_answer_the_same(conversation, keys):
+    tmp_path, p, dbdir = conversation
+    hot = threads.flatten(threads.thread(dbdir, p["b"]["uri"]))
+    retire_days.main(["--dbdir", dbdir, "--cold-dir", str(tmp_path / "cold"), "--quiet-minutes", "0"])
+    if not keys:  # retired before the sidecars existed: DuckDB scan
+        for entry in load_cold_catalog(dbdir).values():
+            os.unlink(keys_sidecar(entry["path"]))
+    assert threads.flatten(threads.thread(dbdir, p["b"]["uri"])) == hot
+    assert [q["uri"] for q in threads.quotes(dbdir, p["root"]["uri"])] == [p["q"]["uri"]]
+
+
+def test_reimported_reply_moves_in_the_graph(conversation):
+    tmp_path, p, dbdir = conversation
+    moved = dict(p["d"], reply_parent=p["c"]["uri"])  # edited parent, same uri
+    spool(str(tmp_path / "spool"), [moved])
+    run_import(tmp_path)
+    tree = shape(threads.thread(dbdir, p["root"]["uri"]))
+    assert tree[p["a"]["uri"]] == [p["b"]["uri"]]
+    assert tree[p["c"]["uri"]] == [p["d"]["uri"]]
+
+
+def test_deep_chain_prints_without_recursion(tmp_path, capsys):
+    # 3000 levels: past the default recursion limit of 1000
+    root = post(0, DAY0_US, "root")
+    chain = [root]
+    for n in range(1, 3001):
+        chain.append(reply(n, DAY0_US + n * 1_000_000, chain[-1], root))
+    dbdir = import_posts(tmp_path, chain)
+    capsys.readouterr()
+
+    threads.main(["--dbdir", dbdir, "--uri", chain[1500]["uri"]])
+    flat = json.loads(capsys.readouterr().out)
+    assert [n["uri"] for n in flat] == [p["uri"] for p in chain]
+    assert flat[-1]["depth"] == 3000 and flat[-1]["parent"] == chain[-2]["uri"]
+    assert "replies" not in flat[0] and flat[0]["parent"] is None
+
+    threads.main(["--dbdir", dbdir, "--uri", root["uri"], "--format", "text"])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3001 and lines[-1].startswith("  " * 3000 + "- ")